@@ -0,0 +1,264 @@
+import argparse
+import os
+import random
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as csv
+
+from machine_log import ALARM, CLEAR, STATE, LogAlarmMatcher, simulated_lines
+
+# Alarm history analytics over machine logs (the format of machine_log.py).
+#
+# A log is parsed by Arrow's multi-threaded CSV reader and compute kernels
+# (one column per line, split into timestamp / machine / kind / text) and
+# turned into NumPy arrays: ALARM records get their machine's state from
+# the last STATE record before them and their time to resolution from the
+# next CLEAR of the same alarm, both by sorting and accumulating over the
+# whole array. Statistics per (machine, state, alarm) are then bincounts
+# and segment reductions over the sorted rows; Python only ever loops over
+# distinct alarm texts, never over rows.
+#
+#   python alarm_analytics.py simulate logs/machine_history.log --machines 20 --days 90
+#   python alarm_analytics.py report logs/machine_history.log
+
+# Under the machine log directory, the only one the apps read logs from
+DEFAULT_HISTORY = os.path.join("logs", "machine_history.log")
+# Width of the bins of rolling_rates(), and bins per rolling window
+RATE_BIN = pd.Timedelta(hours=1)
+RATE_WINDOW = 24
+MS_PER_HOUR = 3_600_000
+MS_PER_DAY = 24 * MS_PER_HOUR
+
+# Timestamps as machine_log.py writes them, to nanoseconds at most
+_TIMESTAMP = r"^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(\.\d{1,9})?$"
+
+# One entry per ALARM record, sorted by machine then time:
+#   time     int64 ms since the epoch
+#   machine  index into machines
+#   key      index into keys, the (state, alarm) pairs; the workbook's when
+#            an alarm index was given and the alarm matched, else as logged
+#   ttr      seconds until the alarm was cleared, NaN if it never was
+# span_days is the time each machine was observed, first to last record.
+AlarmHistory = namedtuple("AlarmHistory", ["time", "machine", "key", "ttr", "machines", "keys", "span_days"])
+
+# (time, machine, kind, text, machines, texts) of a log without records
+_NO_RECORDS = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int8),
+               np.zeros(0, dtype=np.int64), np.zeros(0, dtype=object), np.zeros(0, dtype=object))
+
+
+def _read_records(path):
+    if os.path.getsize(path) == 0:
+        # Arrow's reader refuses an empty file
+        return _NO_RECORDS
+    table = csv.read_csv(
+        path,
+        read_options=csv.ReadOptions(column_names=["line"]),
+        # A delimiter that never occurs: every line is a single value
+        parse_options=csv.ParseOptions(delimiter="\x1f", quote_char=False, escape_char=False),
+        convert_options=csv.ConvertOptions(column_types={"line": pa.string()}),
+    )
+    parts = pc.split_pattern(table.column("line"), " ", max_splits=3)
+    parts = parts.filter(pc.equal(pc.list_value_length(parts), 4))
+    # Kind first: it drops the INFO records before the costlier timestamp check
+    parts = parts.filter(pc.is_in(pc.utf8_upper(pc.list_element(parts, 2)), pa.array([STATE, ALARM, CLEAR])))
+    parts = parts.filter(pc.match_substring_regex(pc.list_element(parts, 0), _TIMESTAMP))
+    kind = pc.utf8_upper(pc.list_element(parts, 2))
+
+    # Parsed at full precision (a cast to ms fails on finer timestamps), then cut to ms
+    time = pc.cast(pc.list_element(parts, 0), pa.timestamp("ns")).to_numpy().astype(np.int64) // 1_000_000
+    machine = pc.dictionary_encode(pc.list_element(parts, 1)).combine_chunks()
+    text = pc.dictionary_encode(pc.utf8_trim_whitespace(pc.list_element(parts, 3))).combine_chunks()
+    kind = np.select(
+        [pc.equal(kind, STATE).to_numpy(zero_copy_only=False), pc.equal(kind, ALARM).to_numpy(zero_copy_only=False)],
+        [0, 1], 2,
+    ).astype(np.int8)
+    return (time, machine.indices.to_numpy(), kind, text.indices.to_numpy(),
+            np.asarray(machine.dictionary.to_pylist(), dtype=object),
+            np.asarray(text.dictionary.to_pylist(), dtype=object))
+
+
+# Load a machine log. With an alarm index (and optionally a fuzzy matcher),
+# alarms are named by the workbook's (state, alarm) keys where they match.
+def load_history(path, alarm_index=None, fuzzy_matcher=None):
+    time, machine, kind, text, machines, texts = _read_records(path)
+    if not len(time):
+        # An empty log, or one without STATE / ALARM / CLEAR records
+        return AlarmHistory(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                            np.zeros(0), machines, [], np.zeros(len(machines)))
+    is_state, is_alarm, is_clear = kind == 0, kind == 1, kind == 2
+
+    # Rows by machine, then time (stable, so log order breaks ties)
+    order = np.lexsort((time, machine))
+    time, machine, kind, text = time[order], machine[order], kind[order], text[order]
+    is_state, is_alarm, is_clear = is_state[order], is_alarm[order], is_clear[order]
+    rows = np.arange(len(time))
+
+    # First and last record of each machine
+    starts = np.flatnonzero(np.r_[True, machine[1:] != machine[:-1]])
+    ends = np.r_[starts[1:], len(time)] - 1
+    span_days = np.zeros(len(machines))
+    span_days[machine[starts]] = (time[ends] - time[starts]) / MS_PER_DAY
+
+    # State of each row: text of the last STATE row of the same machine
+    last_state = np.maximum.accumulate(np.where(is_state, rows, -1))
+    has_state = (last_state >= 0) & (machine[np.maximum(last_state, 0)] == machine)
+    state = np.where(has_state, text[np.maximum(last_state, 0)], -1)
+
+    # Time to resolution: the next CLEAR row of the same machine and text
+    by_alarm = np.lexsort((rows, time, text, machine))
+    clear_rows = np.where(is_clear[by_alarm], np.arange(len(time)), len(time))
+    next_clear = np.minimum.accumulate(clear_rows[::-1])[::-1]
+    found = next_clear < len(time)
+    target = by_alarm[np.minimum(next_clear, len(time) - 1)]
+    found &= (machine[target] == machine[by_alarm]) & (text[target] == text[by_alarm])
+    ttr = np.full(len(time), np.nan)
+    ttr[by_alarm[found]] = (time[target[found]] - time[by_alarm[found]]) / 1000
+
+    # Alarm keys: one lookup per distinct (state, text), not per row
+    pairs = state[is_alarm].astype(np.int64) * len(texts) + text[is_alarm]
+    distinct, inverse = np.unique(pairs, return_inverse=True)
+    matcher = LogAlarmMatcher(alarm_index, fuzzy_matcher) if alarm_index is not None else None
+    # key -> index; different logged texts can match one workbook alarm
+    key_ids = {}
+    pair_key = np.empty(len(distinct), dtype=np.int64)
+    for i, pair in enumerate(distinct.tolist()):
+        state_name = texts[pair // len(texts)] if pair >= 0 else None
+        text_name = texts[pair % len(texts)]
+        key = None
+        if matcher is not None and state_name is not None:
+            workbook_state = matcher.state(state_name)
+            if workbook_state is not None:
+                key = matcher.match(workbook_state, text_name)
+        pair_key[i] = key_ids.setdefault(key or (state_name, text_name), len(key_ids))
+
+    return AlarmHistory(
+        time[is_alarm], machine[is_alarm], pair_key[inverse], ttr[is_alarm],
+        machines, list(key_ids), span_days,
+    )
+
+
+# Value at quantile q of each segment of values (sorted within segments)
+def _segment_quantile(values, starts, counts, q):
+    result = np.full(len(counts), np.nan)
+    present = counts > 0
+    result[present] = values[starts[present] + np.floor(q * (counts[present] - 1)).astype(np.int64)]
+    return result
+
+
+# One row per (machine, state, alarm): how often it occurred, the mean time
+# between occurrences and its time to resolution, most frequent first
+def alarm_stats(history):
+    n_keys = max(len(history.keys), 1)
+    group = history.machine.astype(np.int64) * n_keys + history.key
+    groups, group_of, counts = np.unique(group, return_inverse=True, return_counts=True)
+
+    # Mean gap between consecutive occurrences on the same machine
+    order = np.lexsort((history.time, group_of))
+    g, t = group_of[order], history.time[order]
+    same = g[1:] == g[:-1]
+    gap_sum = np.bincount(g[1:][same], weights=np.diff(t)[same], minlength=len(groups))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mtbf_hours = gap_sum / (counts - 1) / MS_PER_HOUR
+    mtbf_hours[counts < 2] = np.nan
+
+    # Time to resolution quantiles over the resolved occurrences
+    resolved = ~np.isnan(history.ttr)
+    order = np.lexsort((history.ttr[resolved], group_of[resolved]))
+    ttr_sorted = history.ttr[resolved][order] / 60
+    resolved_counts = np.bincount(group_of[resolved], minlength=len(groups))
+    ttr_starts = np.r_[0, np.cumsum(resolved_counts)[:-1]]
+
+    machine_ids = groups // n_keys
+    key_ids = groups % n_keys
+    states = np.asarray([key[0] for key in history.keys] or [None], dtype=object)
+    alarms = np.asarray([key[1] for key in history.keys] or [None], dtype=object)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        per_day = counts / history.span_days[machine_ids]
+    stats = pd.DataFrame({
+        "machine": history.machines[machine_ids],
+        "state": states[key_ids],
+        "alarm": alarms[key_ids],
+        "alarms": counts,
+        "per_day": np.where(np.isfinite(per_day), per_day, np.nan),
+        "mtbf_hours": mtbf_hours,
+        "resolved": resolved_counts,
+        "ttr_median_min": _segment_quantile(ttr_sorted, ttr_starts, resolved_counts, 0.5),
+        "ttr_p90_min": _segment_quantile(ttr_sorted, ttr_starts, resolved_counts, 0.9),
+    })
+    return stats.sort_values("alarms", ascending=False, kind="stable").reset_index(drop=True)
+
+
+# Alarms per hour of each machine (columns), averaged over a rolling window
+# of RATE_WINDOW bins ending at each bin (rows)
+def rolling_rates(history, bin_width=RATE_BIN, window=RATE_WINDOW):
+    if not len(history.time):
+        return pd.DataFrame(columns=history.machines)
+    bin_ms = int(bin_width / pd.Timedelta(milliseconds=1))
+    start = history.time.min() // bin_ms * bin_ms
+    bins = (history.time - start) // bin_ms
+    n_bins = int(bins.max()) + 1
+    n_machines = len(history.machines)
+    counts = np.bincount(history.machine.astype(np.int64) * n_bins + bins,
+                         minlength=n_machines * n_bins).reshape(n_machines, n_bins)
+    cumulative = np.cumsum(counts, axis=1)
+    windowed = cumulative - np.pad(cumulative, ((0, 0), (window, 0)))[:, :n_bins]
+    per_hour = windowed / (window * bin_ms / MS_PER_HOUR)
+    index = pd.to_datetime(start + np.arange(n_bins) * bin_ms, unit="ms")
+    return pd.DataFrame(per_hour.T, index=index, columns=history.machines)
+
+
+# Histogram of the times to resolution in minutes: (counts, bin edges)
+def ttr_histogram(history, bins=50):
+    ttr = history.ttr[~np.isnan(history.ttr)] / 60
+    if not len(ttr):
+        return np.zeros(0, dtype=np.int64), np.zeros(1)
+    upper = np.percentile(ttr, 99)
+    return np.histogram(np.minimum(ttr, upper), bins=bins, range=(0, upper or 1))
+
+
+# ===== SIMULATED HISTORY =====
+# A history of machines days long: the lines of machine_log.simulated_lines
+# with a clock that advances mean_gap seconds per record on average
+def simulate_history(path, alarm_index, machines=20, days=90, mean_gap=60.0, seed=0):
+    rng = random.Random(seed)
+    start = pd.Timestamp.now().normalize().timestamp() - days * 86400
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(1, machines + 1):
+            now = [start]
+
+            def clock():
+                now[0] += rng.expovariate(1 / mean_gap)
+                return now[0]
+
+            for line in simulated_lines(alarm_index, f"HD-{i:02d}", seed=seed + i, clock=clock):
+                if now[0] >= start + days * 86400:
+                    break
+                f.write(line + "\n")
+
+
+if __name__ == "__main__":
+    from alarm_index import AlarmIndex
+    from fuzzy_match import build_fuzzy_matcher
+    from knowledge_base import load_knowledge_base
+
+    parser = argparse.ArgumentParser(description="Alarm frequency, MTBF and time-to-resolution from machine logs")
+    parser.add_argument("command", choices=["simulate", "report"])
+    parser.add_argument("log", nargs="?", default=DEFAULT_HISTORY)
+    parser.add_argument("--workbook", default="MachineDataAnalytics.xlsx")
+    parser.add_argument("--machines", type=int, default=20, help="machines written by simulate")
+    parser.add_argument("--days", type=int, default=90, help="days of history written by simulate")
+    args = parser.parse_args()
+
+    data_dict, _ = load_knowledge_base(args.workbook)
+    alarm_index = AlarmIndex(data_dict)
+    if args.command == "simulate":
+        simulate_history(args.log, alarm_index, args.machines, args.days)
+    else:
+        history = load_history(args.log, alarm_index, build_fuzzy_matcher(alarm_index))
+        with pd.option_context("display.width", 200, "display.max_columns", 20):
+            print(alarm_stats(history).head(20).to_string(index=False))
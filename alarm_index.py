@@ -0,0 +1,79 @@
+import pandas as pd
+
+ALARM_COLUMN = "Alarms / Reasons"
+REASON_COLUMNS = tuple(f"Reason {i}" for i in range(1, 11))
+
+# Marker row that separates the alarm table from the free-text issues below it
+ISSUES_MARKER = "Issues"
+
+
+# Frames to index: a shared knowledge base's frames themselves rather than
+# the copies its lookups return (see knowledge_base.SharedFrames)
+def _frames(data_dict):
+    return getattr(data_dict, "frames", data_dict)
+
+
+# Precomputed lookup of troubleshooting steps for every (state, alarm).
+#
+# Built once per workbook load so that a selection in the UI is a dictionary
+# hit instead of boolean masks over the sheet plus a rescan of the "Issues"
+# section and a walk over the ten reason columns.
+class AlarmIndex:
+    def __init__(self, data_dict):
+        self._alarms = {}
+        self._steps = {}
+        for state, df in _frames(data_dict).items():
+            self._add_state(state, df)
+
+    def _add_state(self, state, df):
+        alarms = []
+        if ALARM_COLUMN in df.columns:
+            reason_columns = [col for col in REASON_COLUMNS if col in df.columns]
+            rows = df[[ALARM_COLUMN] + reason_columns].itertuples(index=False, name=None)
+            for alarm, *reasons in rows:
+                if pd.isna(alarm) or alarm == ISSUES_MARKER:
+                    continue
+                key = (state, alarm)
+                # The first row wins, as with df[df[ALARM_COLUMN] == alarm]
+                if key in self._steps:
+                    continue
+                self._steps[key] = tuple(
+                    reason for reason in reasons
+                    if pd.notna(reason) and str(reason).strip()
+                )
+                alarms.append(alarm)
+        self._alarms[state] = tuple(alarms)
+
+    # Index of a reloaded workbook: states not in changed keep their entries
+    # from this index, only the changed ones are walked again
+    def updated(self, data_dict, changed):
+        index = AlarmIndex({})
+        for state, df in _frames(data_dict).items():
+            if state in changed or state not in self._alarms:
+                index._add_state(state, df)
+                continue
+            alarms = self._alarms[state]
+            index._alarms[state] = alarms
+            for alarm in alarms:
+                index._steps[(state, alarm)] = self._steps[(state, alarm)]
+        return index
+
+    # Alarms of a state in sheet order, the "Issues" section included
+    def alarms(self, state):
+        return self._alarms.get(state, ())
+
+    # Steps for an alarm, or None when the alarm is unknown for that state
+    def steps(self, state, alarm):
+        return self._steps.get((state, alarm))
+
+    def states(self):
+        return tuple(self._alarms)
+
+    def __contains__(self, key):
+        return key in self._steps
+
+    def __len__(self):
+        return len(self._steps)
+
+    def items(self):
+        return self._steps.items()
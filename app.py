@@ -1,15 +1,31 @@
 import streamlit as st
 import pandas as pd
 from openpyxl import load_workbook
-import time
+from kb_reload import LiveKnowledgeBase
+from kb_store import open_store, store_path_for
+from kb_search import build_search_index
+from fuzzy_match import build_fuzzy_matcher
+from procedure_plan import ProcedurePlan
+from static_assets import inject_stylesheet
+from step_list import render_step_list
+from checklist_progress import checklist_progress
+from event_log import ask_fixing_step, log_event, log_resolution, log_selection
+from resolution_stats import get_resolution_stats
+from machine_log import MACHINE_LOG_DIR, LogAlarmMatcher, MachineLogFeed, resolve_log_path
 
-# Custom CSS for styling
-def local_css(file_name):
-    with open(file_name) as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+# Seconds between successive step reveals (CSS animation delay, no server-side wait)
+STEP_REVEAL_DELAY = 0.3
 
-# Load custom CSS
-local_css("style.css")
+# Hits listed under the search box
+SEARCH_RESULTS = 8
+
+# Seconds between checks of a followed machine log, and logs followed at once
+MACHINE_LOG_REFRESH = 1.0
+MACHINE_LOGS = 8
+
+# Load custom CSS (minified, content-hashed and served as a static file;
+# only a one-line @import is sent per rerun)
+inject_stylesheet("style.css")
 
 # App title and header
 st.markdown("""
@@ -50,33 +66,56 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
 # Function to load Excel data
-@st.cache_data
-def load_data(file_path):
-    xls = pd.ExcelFile(file_path)
-    sheet_names = xls.sheet_names
-    data_dict = {}
-    
-    for sheet in sheet_names:
-        if sheet == "States":  # Skip the States sheet
-            continue
-        df = pd.read_excel(xls, sheet_name=sheet, header=0)
-        # Clean up column names
-        df.columns = [col.strip() if isinstance(col, str) else col for col in df.columns]
-        # Drop empty rows
-        df = df.dropna(how='all')
-        data_dict[sheet] = df
-    
-    return data_dict, sheet_names
+# (served from the compiled snapshot, then swapped in place whenever the
+# workbook is edited, so publishing an update needs no server restart;
+# edits are written through to the SQLite knowledge store as well)
+@st.cache_resource
+def load_live_knowledge_base(file_path):
+    knowledge_base = LiveKnowledgeBase(file_path, store_path=store_path_for(file_path))
+    knowledge_base.start_watching()
+    return knowledge_base
+
+# Function to open the SQLite knowledge store the pages query alarms from
+@st.cache_resource
+def load_knowledge_store(file_path):
+    return open_store(file_path)
+
+# Function to build the alarm search index once per version of the store's
+# workbook states, from the same store the selectboxes query
+@st.cache_resource(max_entries=1)
+def load_search_index(_alarm_index, version):
+    return build_search_index(_alarm_index)
 
-# Function to get all alarms from a sheet
-def get_alarms_for_sheet(df):
-    alarms = df['Alarms / Reasons'].dropna().unique().tolist()
-    issues = df[df['Alarms / Reasons'] == 'Issues'].index
-    if len(issues) > 0:
-        issue_start = issues[0] + 1
-        additional_issues = df.iloc[issue_start:]['Alarms / Reasons'].dropna().unique().tolist()
-        alarms.extend(additional_issues)
-    return [a for a in alarms if a != 'Issues' and str(a) != 'nan']
+# Function to build the typo-tolerant alarm matcher once per version of the store's workbook states
+@st.cache_resource(max_entries=1)
+def load_fuzzy_matcher(_alarm_index, version):
+    return build_fuzzy_matcher(_alarm_index)
+
+# Function to jump the state and alarm selectboxes to a search hit
+def select_alarm(state, alarm):
+    st.session_state.sheet_select = state
+    st.session_state.alarm_select = alarm
+
+# Function to follow a machine log on a background thread, once per log
+# whichever sessions watch it (stopped when evicted)
+@st.cache_resource(max_entries=MACHINE_LOGS, on_release=MachineLogFeed.stop)
+def load_machine_log_feed(log_path, _alarm_index, _version):
+    matcher = LogAlarmMatcher(_alarm_index, load_fuzzy_matcher(_alarm_index, _version))
+    return MachineLogFeed(log_path, matcher, _version).start()
+
+# Selects each new alarm matched in a followed machine log
+@st.fragment(run_every=MACHINE_LOG_REFRESH)
+def follow_machine_log(feed):
+    latest = feed.latest
+    if latest is None:
+        st.caption(f"Waiting for alarms ({feed.lines} lines read)")
+        return
+    seq, alarm = latest
+    st.caption(f"Last alarm from {alarm.machine} at {alarm.timestamp}: {alarm.alarm} ({alarm.state})")
+    if st.session_state.get("machine_log_seen") != (feed.path, seq):
+        st.session_state.machine_log_seen = (feed.path, seq)
+        select_alarm(alarm.state, alarm.alarm)
+        st.rerun(scope="app")
 
 # Common troubleshooting procedures dictionary
 common_procedures = {
@@ -126,82 +165,92 @@ common_procedures = {
     }
 }
 
-# Interactive troubleshooting guide
-def show_interactive_troubleshooting(alarm_name):
-    st.markdown(f"""
-    <div class="interactive-header">
-        <h3>🔍 Interactive Troubleshooting for: {alarm_name}</h3>
-        <p>Follow this step-by-step guide to resolve the issue</p>
-    </div>
-    """, unsafe_allow_html=True)
-    
+# Procedure plan for an alarm, built once and shared across reruns and sessions
+@st.cache_resource
+def get_procedure_plan(alarm_name):
     # Determine which procedures to show based on alarm name (simplified logic)
     related_procedures = []
-    
+
     if any(word in alarm_name.lower() for word in ["pressure", "flow", "leak"]):
         related_procedures.append("pressure_test")
         related_procedures.append("fluid_system")
-    
+
     if any(word in alarm_name.lower() for word in ["power", "electrical", "display", "system"]):
         related_procedures.append("power_cycle")
-    
+
     if any(word in alarm_name.lower() for word in ["alarm", "safety", "detector", "temp"]):
         related_procedures.append("safety_systems")
-    
+
     # If no specific procedures matched, show all common ones
     if not related_procedures:
         related_procedures = ["power_cycle", "fluid_system", "pressure_test", "safety_systems"]
     
-    # Progress tracking
-    current_step = st.session_state.get("troubleshoot_step", 0)
-    max_steps = sum([len(common_procedures[p]["steps"]) for p in related_procedures])
+    return ProcedurePlan(related_procedures, common_procedures)
+
+# Interactive troubleshooting guide
+def show_interactive_troubleshooting(state, alarm_name, steps):
+    st.markdown(f"""
+    <div class="interactive-header">
+        <h3>🔍 Interactive Troubleshooting for: {alarm_name}</h3>
+        <p>Follow this step-by-step guide to resolve the issue</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Procedures and their step offsets are computed once per selection
+    plan = get_procedure_plan(alarm_name)
+    
+    # Progress tracking (one bitset per machine, alarm and plan)
+    progress = checklist_progress()
+    plan_key = ("workbook", (state, alarm_name), plan.procedure_keys)
+    max_steps = plan.total_steps
     
     # Progress bar
-    progress_bar = st.progress(current_step / max_steps if max_steps > 0 else 0)
+    progress_bar = st.progress(plan.progress(progress.completed(plan_key)))
     
     # Show procedure steps with checkboxes
-    overall_step_counter = 0
-    for procedure_key in related_procedures:
-        procedure = common_procedures[procedure_key]
-        
+    for section in plan.sections:
         st.markdown(f"""
         <div class="procedure-header">
-            <h4>{procedure["title"]}</h4>
+            <h4>{section.title}</h4>
         </div>
         """, unsafe_allow_html=True)
         
-        for i, step in enumerate(procedure["steps"]):
-            step_key = f"{procedure_key}_step_{i}"
+        for i, step in enumerate(section.steps):
+            step_index = section.offset + i
+            step_done = progress.is_done(plan_key, step_index)
             step_complete = st.checkbox(
                 f"{step}",
-                key=step_key,
-                value=overall_step_counter < current_step
+                key=progress.widget_key(plan_key, step_index),
+                value=step_done
             )
             
-            # If this checkbox was just checked, increment the step counter
-            if step_complete and overall_step_counter >= current_step:
-                st.session_state.troubleshoot_step = overall_step_counter + 1
-                progress_bar.progress((overall_step_counter + 1) / max_steps)
+            # If this checkbox was just checked or unchecked, record it
+            if step_complete != step_done:
+                progress.mark(plan_key, step_index, step_complete)
+                log_event("step", "workbook", state, alarm_name, step=step_index, text=step, done=step_complete)
+                progress_bar.progress(plan.progress(progress.completed(plan_key)))
                 
                 # Show a success message for completing a procedure
-                if overall_step_counter + 1 == sum([len(common_procedures[p]["steps"]) for p in related_procedures[:related_procedures.index(procedure_key)+1]]):
-                    st.success(f"✅ {procedure['title']} completed!")
-            
-            overall_step_counter += 1
+                if step_complete and progress.all_done(plan_key, section.offset, section.end):
+                    st.success(f"✅ {section.title} completed!")
     
     # Final resolution options
-    if current_step >= max_steps:
+    if progress.completed(plan_key) >= max_steps:
         st.markdown("### 🎯 Issue Resolution")
         resolution = st.radio(
             "Did these steps resolve the issue?",
-            ["Yes, issue resolved", "No, issue persists"],
-            key="resolution"
+            ["Select an option", "Yes, issue resolved", "No, issue persists"],
+            index=0,
+            key="resolution",
+            on_change=log_resolution,
+            args=("resolution", "workbook", state, alarm_name)
         )
         
         if resolution == "Yes, issue resolved":
             st.balloons()
             st.success("Great job! Please document this repair in the maintenance log.")
-        else:
+            ask_fixing_step("workbook", state, alarm_name, steps)
+        elif resolution == "No, issue persists":
             st.warning("If the issue persists, consider:")
             st.markdown("""
             1. Escalating to senior biomedical engineer
@@ -211,24 +260,70 @@ def show_interactive_troubleshooting(alarm_name):
     
     # Reset button
     if st.button("Reset Troubleshooting Progress"):
-        st.session_state.troubleshoot_step = 0
-        st.experimental_rerun()
+        progress.reset(plan_key)
+        log_event("reset", "workbook", state, alarm_name)
+        st.rerun()
 
 # Main app function
 def main():
-    # Initialize session state for troubleshooting
-    if 'troubleshoot_step' not in st.session_state:
-        st.session_state.troubleshoot_step = 0
-        
     # Default Excel file path
     file_path = "MachineDataAnalytics.xlsx"
     
     try:
-        data_dict, sheet_names = load_data(file_path)
+        # The live knowledge base watches the workbook and writes its edits
+        # through to the store. Everything below reads the store: states,
+        # alarms and steps directly, search, fuzzy matching and the log feed
+        # through indexes built once per version of its workbook states
+        load_live_knowledge_base(file_path)
+        store = load_knowledge_store(file_path)
+        version = store.workbook_version()
+        alarm_index = store.index()
+        sheet_names = alarm_index.states()
         
         # Remove 'States' from sheet names if present
         sheet_names = [s for s in sheet_names if s != "States"]
         
+        # Alarms read off a machine log are selected automatically
+        with st.sidebar:
+            log_path = st.text_input(
+                "📟 Follow a machine log:",
+                key="machine_log_path",
+                placeholder="e.g. logs/HD-07.log"
+            )
+            log_file = resolve_log_path(log_path) if log_path else None
+            if log_path and log_file is None:
+                st.error(f"Machine logs can only be read from {MACHINE_LOG_DIR}")
+            elif log_file:
+                feed = load_machine_log_feed(log_file, alarm_index, version)
+                # Match against the current workbook after a reload
+                feed.use_index(alarm_index, load_fuzzy_matcher(alarm_index, version), version)
+                follow_machine_log(feed)
+        
+        # Symptom search across every state
+        query = st.text_input(
+            "🔎 Search alarms by name or symptom:",
+            key="alarm_search",
+            placeholder="e.g. venous pressure, conductivity, connector"
+        )
+        if query:
+            search_index = load_search_index(alarm_index, version)
+            hits = search_index.search(query, limit=SEARCH_RESULTS, sources=["workbook"])
+            if not hits:
+                # Nothing matches word for word: offer the closest alarm names
+                matcher = load_fuzzy_matcher(alarm_index, version)
+                hits = matcher.match(query, limit=SEARCH_RESULTS, sources=["workbook"])
+                if hits:
+                    st.caption("No exact matches. Did you mean:")
+                else:
+                    st.info("No alarms match this search.")
+            for hit in hits:
+                st.button(
+                    f"{hit.name} ({hit.group})",
+                    key=f"search_hit_{hit.group}_{hit.name}",
+                    on_click=select_alarm,
+                    args=(hit.group, hit.name)
+                )
+        
         # State selection
         st.markdown("### 1️⃣ Select Machine State")
         selected_sheet = st.selectbox(
@@ -239,8 +334,7 @@ def main():
         )
         
         # Get alarms for selected sheet
-        df = data_dict[selected_sheet]
-        alarms = get_alarms_for_sheet(df)
+        alarms = alarm_index.alarms(selected_sheet)
         
         if not alarms:
             st.warning("No alarm data found for this state.")
@@ -255,18 +349,13 @@ def main():
             key="alarm_select"
         )
         
-        # Find the row with the selected alarm
-        alarm_row = df[df['Alarms / Reasons'] == selected_alarm]
+        # Record the selected alarm in the event log
+        log_selection("workbook", selected_sheet, selected_alarm)
         
-        if alarm_row.empty:
-            # Check if it's in the issues section
-            issues_section = df[df['Alarms / Reasons'] == 'Issues']
-            if not issues_section.empty:
-                issue_start = issues_section.index[0] + 1
-                issue_rows = df.iloc[issue_start:]
-                alarm_row = issue_rows[issue_rows['Alarms / Reasons'] == selected_alarm]
+        # Find the steps for the selected alarm (the Issues section is already folded in)
+        reasons = alarm_index.steps(selected_sheet, selected_alarm)
         
-        if alarm_row.empty:
+        if reasons is None:
             st.error("No troubleshooting information found for this alarm.")
             return
             
@@ -283,28 +372,15 @@ def main():
         </div>
         """, unsafe_allow_html=True)
         
-        # Get all reasons (steps)
-        reasons = []
-        for i in range(1, 11):
-            reason_col = f"Reason {i}"
-            if reason_col in alarm_row.columns:
-                reason = alarm_row[reason_col].values[0]
-                if pd.notna(reason):
-                    reasons.append(reason)
-        
         if not reasons:
             st.info("No specific troubleshooting steps documented for this alarm.")
         else:
-            for i, reason in enumerate(reasons, 1):
-                # Animate the appearance of each step
-                with st.empty():
-                    time.sleep(0.3)  # Small delay for animation effect
-                    st.markdown(f"""
-                    <div class="step-box animated-step">
-                        <div class="step-number">Step {i}</div>
-                        <div class="step-content">{reason}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
+            # Optionally put the steps that most often fixed this alarm first
+            steps = reasons
+            if st.toggle("Most likely fix first", key="fix_first", help="Order the steps by how often each one was reported as the fix"):
+                steps = get_resolution_stats().ordered_steps("workbook", selected_sheet, selected_alarm, steps)
+            # Steps are revealed one after another by the CSS animation delay
+            render_step_list("Hemodialysis", (selected_sheet, selected_alarm), steps, STEP_REVEAL_DELAY)
             
             # Add some spacing
             st.markdown("<br><br>", unsafe_allow_html=True)
@@ -327,14 +403,22 @@ def main():
         show_detailed = st.checkbox("Show detailed interactive troubleshooting guide", value=False)
         
         if show_detailed:
-            show_interactive_troubleshooting(selected_alarm)
+            show_interactive_troubleshooting(selected_sheet, selected_alarm, reasons)
         else:
             # Add a completion check (original code)
             st.markdown("---")
-            resolved = st.radio("Did this resolve your issue?", ("Still troubleshooting", "Issue resolved"), index=0)
+            resolved = st.radio(
+                "Did this resolve your issue?",
+                ("Still troubleshooting", "Issue resolved"),
+                index=0,
+                key="resolved",
+                on_change=log_resolution,
+                args=("resolved", "workbook", selected_sheet, selected_alarm)
+            )
             if resolved == "Issue resolved":
                 st.balloons()
                 st.success("Great job! Issue resolved successfully.")
+                ask_fixing_step("workbook", selected_sheet, selected_alarm, reasons)
         
         # NEW FEATURE: Technical diagrams and resources
         st.markdown("---")
@@ -0,0 +1,62 @@
+import logging
+import os
+import sys
+import tempfile
+import time
+
+# Throughput budget of the alarm history analytics: a simulated history of
+# MACHINES machines over DAYS days (some millions of log lines) is loaded,
+# matched to the workbook and summarised (alarm_stats, rolling_rates,
+# ttr_histogram), which together must keep up with MIN_LINES_PER_SECOND.
+# Exits non-zero when the budget is missed.
+#
+#   python benchmarks/analytics_bench.py
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from alarm_analytics import alarm_stats, load_history, rolling_rates, simulate_history, ttr_histogram  # noqa: E402
+from alarm_index import AlarmIndex  # noqa: E402
+from fuzzy_match import build_fuzzy_matcher  # noqa: E402
+from knowledge_base import parse_workbook  # noqa: E402
+
+MIN_LINES_PER_SECOND = 300_000
+MACHINES = 50
+DAYS = 30
+MEAN_GAP = 45.0
+
+
+# (load seconds, summary seconds, history, stats)
+def analyse(path, alarm_index, fuzzy_matcher):
+    start = time.perf_counter()
+    history = load_history(path, alarm_index, fuzzy_matcher)
+    loaded = time.perf_counter()
+    stats = alarm_stats(history)
+    rolling_rates(history)
+    ttr_histogram(history)
+    return loaded - start, time.perf_counter() - loaded, history, stats
+
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    data_dict, _ = parse_workbook(os.path.join(REPO_ROOT, "MachineDataAnalytics.xlsx"), workers=0)
+    alarm_index = AlarmIndex(data_dict)
+    fuzzy_matcher = build_fuzzy_matcher(alarm_index)
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "history.log")
+        simulate_history(path, alarm_index, MACHINES, DAYS, MEAN_GAP)
+        with open(path, "rb") as f:
+            lines = sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+        load, summary, history, stats = min(
+            (analyse(path, alarm_index, fuzzy_matcher) for _ in range(3)), key=lambda run: run[0] + run[1]
+        )
+
+    rate = lines / (load + summary)
+    print(f"load    {load:8.2f} s  ({lines:,} lines, {len(history.time):,} alarms, "
+          f"{len(history.keys)} distinct alarms)")
+    print(f"summary {summary:8.2f} s  ({len(stats):,} machine/alarm rows, "
+          f"{DAYS * 24} hourly bins x {MACHINES} machines)")
+    print(f"throughput {rate:,.0f} lines/s (budget {MIN_LINES_PER_SECOND:,})")
+    ok = rate >= MIN_LINES_PER_SECOND
+    print("OK" if ok else "OVER BUDGET")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+
+# Throughput budget of the fleet gateway on one core: DEVICES simulated
+# devices per machine type send LINES records each as fast as the gateway
+# takes them, over loopback TCP, to a gateway with one lossless in-loop
+# consumer and SESSIONS session subscriptions; the devices run on the same
+# event loop, so their cost counts against the budget too. A second run with
+# a consumer capped at SLOW_RATE events/s shows backpressure: the devices
+# slow down to it while the gateway's queues stay within their bounds.
+# Exits non-zero when the budget is missed.
+#
+#   python benchmarks/fleet_bench.py
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from fleet_gateway import (  # noqa: E402
+    MACHINE_TYPES,
+    QUEUE_SIZE,
+    build_gateway,
+    catalogue_errors,
+    simulate_device,
+)
+from fuzzy_match import build_fuzzy_matcher  # noqa: E402
+
+MIN_EVENTS_PER_SECOND = 5_000
+DEVICES = 20
+LINES = 2_000
+SESSIONS = 20
+SLOW_RATE = 2_000
+SLOW_LINES = 500
+
+
+# (seconds, gateway, events consumed, largest queue backlog seen)
+async def run(fuzzy_matcher, lines, consumer_rate=None):
+    gateway = await build_gateway(port=0, fuzzy_matcher=fuzzy_matcher).start()
+    subscriptions = [gateway.subscribe() for _ in range(SESSIONS)]
+    consumed = 0
+    backlog = 0
+
+    async def consume():
+        nonlocal consumed, backlog
+        async for _ in gateway.events():
+            consumed += 1
+            backlog = max(backlog, gateway._queue.qsize())
+            if consumer_rate is not None:
+                await asyncio.sleep(1 / consumer_rate)
+
+    consumer = asyncio.create_task(consume())
+    errors = catalogue_errors(fuzzy_matcher)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        simulate_device("127.0.0.1", gateway.port, f"{machine}-{i}", machine, errors[machine], count=lines, seed=i)
+        for machine in MACHINE_TYPES
+        for i in range(DEVICES)
+    ))
+    # Wait for the dispatcher and the consumer to catch up
+    while gateway._queue.qsize() or consumed < gateway.dispatched:
+        await asyncio.sleep(0.001)
+    seconds = time.perf_counter() - start
+    consumer.cancel()
+    for subscription in subscriptions:
+        subscription.close()
+    await gateway.close()
+    return seconds, gateway, consumed, backlog
+
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    fuzzy_matcher = build_fuzzy_matcher()
+    devices = DEVICES * len(MACHINE_TYPES)
+
+    seconds, gateway, consumed, _ = asyncio.run(run(fuzzy_matcher, LINES))
+    rate = gateway.received / seconds
+    print(f"{devices} devices   {rate:10,.0f} records/s, {gateway.dispatched / seconds:,.0f} alarms/s "
+          f"to {SESSIONS} sessions + 1 stream ({gateway.received} records, {gateway.unmatched} unmatched; "
+          f"budget {MIN_EVENTS_PER_SECOND:,} records/s)")
+
+    seconds, gateway, consumed, backlog = asyncio.run(run(fuzzy_matcher, SLOW_LINES, SLOW_RATE))
+    print(f"slow consumer {gateway.received / seconds:10,.0f} records/s, {consumed / seconds:,.0f} alarms/s consumed "
+          f"(capped at {SLOW_RATE:,}/s), dispatcher backlog at most {backlog} (bound {QUEUE_SIZE})")
+
+    ok = rate >= MIN_EVENTS_PER_SECOND and backlog <= QUEUE_SIZE
+    print("OK" if ok else "OVER BUDGET")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,80 @@
+import itertools
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Throughput and memory budgets for machine log ingestion: simulated logs
+# of MACHINES interleaved machines are run through the parse/match
+# pipeline, which must keep up with MIN_LINES_PER_SECOND, and its peak
+# memory must not grow with the log (LINES and 4 * LINES lines compared).
+# Exits non-zero when a budget is exceeded.
+#
+#   python benchmarks/log_ingest_bench.py
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from alarm_index import AlarmIndex  # noqa: E402
+from fuzzy_match import build_fuzzy_matcher  # noqa: E402
+from knowledge_base import parse_workbook  # noqa: E402
+from machine_log import LogAlarmMatcher, iter_lines, match_alarms, parse_records, simulated_lines  # noqa: E402
+
+MIN_LINES_PER_SECOND = 20_000
+MAX_PEAK_GROWTH = 1.5
+MACHINES = 8
+LINES = 100_000
+
+
+def write_log(path, alarm_index, count):
+    machines = [simulated_lines(alarm_index, f"HD-{i:02d}", seed=i) for i in range(MACHINES)]
+    with open(path, "w", encoding="utf-8") as f:
+        for line in itertools.islice(itertools.chain.from_iterable(zip(*machines)), count):
+            f.write(line + "\n")
+
+
+# (seconds, matched alarms) for one pass over a log
+def ingest(path, alarm_index, fuzzy_matcher):
+    matcher = LogAlarmMatcher(alarm_index, fuzzy_matcher)
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        matched = sum(1 for _ in match_alarms(parse_records(iter_lines(f)), matcher))
+    return time.perf_counter() - start, matched
+
+
+def peak_memory(path, alarm_index, fuzzy_matcher):
+    tracemalloc.start()
+    ingest(path, alarm_index, fuzzy_matcher)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    data_dict, _ = parse_workbook(os.path.join(REPO_ROOT, "MachineDataAnalytics.xlsx"), workers=0)
+    alarm_index = AlarmIndex(data_dict)
+    fuzzy_matcher = build_fuzzy_matcher(alarm_index)
+    ok = True
+    with tempfile.TemporaryDirectory() as workdir:
+        small = os.path.join(workdir, "small.log")
+        large = os.path.join(workdir, "large.log")
+        write_log(small, alarm_index, LINES)
+        write_log(large, alarm_index, 4 * LINES)
+
+        seconds, matched = min(ingest(large, alarm_index, fuzzy_matcher) for _ in range(3))
+        rate = 4 * LINES / seconds
+        print(f"throughput  {rate:10,.0f} lines/s  ({4 * LINES} lines of {MACHINES} machines, "
+              f"{matched} alarms matched; budget {MIN_LINES_PER_SECOND:,})")
+        ok &= rate >= MIN_LINES_PER_SECOND
+
+        small_peak = peak_memory(small, alarm_index, fuzzy_matcher)
+        large_peak = peak_memory(large, alarm_index, fuzzy_matcher)
+        print(f"peak memory {small_peak / 1024:10.0f} KiB for {LINES} lines, "
+              f"{large_peak / 1024:.0f} KiB for {4 * LINES} (budget x{MAX_PEAK_GROWTH})")
+        ok &= large_peak <= small_peak * MAX_PEAK_GROWTH
+
+    print("OK" if ok else "OVER BUDGET")
+    sys.exit(0 if ok else 1)
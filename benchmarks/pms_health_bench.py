@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+from datetime import datetime
+
+# Real-time budget of PMS predictive scoring on one core: UNITS simulated
+# units report TELEMETRY records once a second for SECONDS seconds (past
+# the scorer's warm-up, so every record is scored), and each second's
+# records must be parsed and scored in under MAX_CORE_SHARE of a second,
+# leaving the rest of the core to the gateway. Generating the records is
+# not timed. Exits non-zero when the budget is missed.
+#
+#   python benchmarks/pms_health_bench.py
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from fleet_gateway import TELEMETRY  # noqa: E402
+from machine_log import parse_record  # noqa: E402
+from pms_health import WARMUP, PmsHealthScorer, format_telemetry, parse_telemetry, simulated_fleet  # noqa: E402
+
+UNITS = 1_000
+SECONDS = int(WARMUP) + 300
+MAX_CORE_SHARE = 0.25
+
+
+if __name__ == "__main__":
+    scorer = PmsHealthScorer()
+    start = time.time()
+    ticks = []
+    alerts = 0
+    for second, samples in enumerate(simulated_fleet(UNITS, start=start)):
+        if second >= SECONDS:
+            break
+        stamp = datetime.fromtimestamp(start + second).isoformat(timespec="milliseconds")
+        lines = [f"{stamp} {unit} {TELEMETRY} {format_telemetry(readings)}" for unit, _, readings in samples]
+
+        tick = time.perf_counter()
+        for line in lines:
+            record = parse_record(line)
+            t = datetime.fromisoformat(record.timestamp).timestamp()
+            alerts += len(scorer.update(record.machine, t, parse_telemetry(record.text), record.timestamp))
+        ticks.append(time.perf_counter() - tick)
+
+    scored = sorted(ticks[int(WARMUP):])
+    mean = sum(scored) / len(scored)
+    worst = scored[-1]
+    print(f"{UNITS} units at 1 Hz: {mean * 1000:.1f} ms per second of telemetry on average, "
+          f"{scored[len(scored) * 99 // 100] * 1000:.1f} ms p99, {worst * 1000:.1f} ms max "
+          f"(budget {MAX_CORE_SHARE * 1000:.0f} ms); {alerts} alerts raised")
+    ok = worst <= MAX_CORE_SHARE
+    print("OK" if ok else "OVER BUDGET")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,110 @@
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+from collections import Counter
+from xml.sax.saxutils import escape
+
+# Hot-reload cost of a single-sheet edit. The workbook is edited in place
+# the way Excel saves it, and LiveKnowledgeBase.reload() is timed:
+#
+#   sheet part     one cell of one state sheet points at another string
+#   shared string  the text of a step used by one sheet only is changed,
+#                  which rewrites xl/sharedStrings.xml (every text edit does)
+#
+# Each edit is reloaded twice: with the per-sheet shared string references
+# known (learned at startup), and without them, where any change to the
+# string table re-parses every sheet. The full parse is printed alongside.
+#
+#   python benchmarks/reload_bench.py
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from kb_reload import SHARED_STRINGS_PART, LiveKnowledgeBase  # noqa: E402
+from knowledge_base import parse_workbook  # noqa: E402
+from xlsx_reader import XlsxReader  # noqa: E402
+
+WORKBOOK = "MachineDataAnalytics.xlsx"
+SHEET = "Rinse"
+ROUNDS = 10
+
+
+# Copy of the workbook with some of its parts replaced
+def rewrite_workbook(source, target, replacements):
+    with zipfile.ZipFile(source) as src, zipfile.ZipFile(target + ".tmp", "w", zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            dst.writestr(info, replacements.get(info.filename, src.read(info)))
+    os.replace(target + ".tmp", target)
+
+
+# (part, edited bytes) for both kinds of edit of SHEET
+def make_edits(path):
+    with XlsxReader(path) as reader:
+        for sheet in reader.sheet_names:
+            for _ in reader.iter_rows(sheet):
+                pass
+        uses = Counter(i for refs in reader.string_refs.values() for i in refs)
+        own = sorted(i for i in reader.string_refs[SHEET] if uses[i] == 1)
+        strings = reader.shared_strings
+        part = reader.sheet_parts[SHEET]
+        sheet_xml = reader._zip.read(part).decode("utf-8")
+        strings_xml = reader._zip.read(SHARED_STRINGS_PART).decode("utf-8")
+
+    text = escape(strings[own[0]])
+    assert strings_xml.count(">" + text + "<") == 1
+    edited_strings = strings_xml.replace(">" + text + "<", ">" + text + " (edited)<")
+    cell = f"<v>{own[0]}</v>"
+    edited_sheet = sheet_xml.replace(cell, f"<v>{own[1]}</v>", 1)
+    return {
+        "sheet part": {part: edited_sheet.encode("utf-8")},
+        "shared string": {SHARED_STRINGS_PART: edited_strings.encode("utf-8")},
+    }
+
+
+# Median reload time and re-parsed sheet count, toggling the edit on and off
+def time_reloads(path, original, replacements, learn):
+    shutil.copy(original, path)
+    kb = LiveKnowledgeBase(path)
+    if learn:
+        kb.learn_sheet_strings()
+    timings = []
+    reparsed = []
+    for round_no in range(ROUNDS):
+        if round_no % 2 == 0:
+            rewrite_workbook(original, path, replacements)
+        else:
+            shutil.copy(original, path)
+        start = time.perf_counter()
+        changed = kb.reload()
+        timings.append((time.perf_counter() - start) * 1000)
+        reparsed.append(len(changed))
+        if not learn:
+            # Forget again what this reload learned
+            kb._current = kb.current._replace(sheet_strings={})
+    return statistics.median(timings), max(reparsed)
+
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as workdir:
+        original = os.path.join(workdir, "original.xlsx")
+        path = os.path.join(workdir, WORKBOOK)
+        shutil.copy(os.path.join(REPO_ROOT, WORKBOOK), original)
+
+        timings = []
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            data_dict, _ = parse_workbook(original, workers=0)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"{'full parse':14} {statistics.median(timings):8.1f} ms  ({len(data_dict)} sheets)")
+
+        for name, replacements in make_edits(original).items():
+            known_ms, known_sheets = time_reloads(path, original, replacements, learn=True)
+            unknown_ms, unknown_sheets = time_reloads(path, original, replacements, learn=False)
+            print(f"{name:14} {known_ms:8.1f} ms  ({known_sheets} sheet re-parsed)   "
+                  f"without string references {unknown_ms:8.1f} ms  ({unknown_sheets} sheets re-parsed)")
@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import streamlit
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+# Headless rerun benchmark for every path through the troubleshooting pages.
+#
+# final.py is driven for each machine (PMS, Hemodialysis, UP7000) over every
+# category/error pair of its catalogue, app.py over every state/alarm of the
+# workbook. For each path the selection is applied once (warm-up), then the
+# script is rerun --reruns times; p50/p95/p99 of those reruns are recorded,
+# together with the peak Python allocation of one extra rerun traced with
+# tracemalloc and the number and serialized size of the delta messages that
+# rerun sends to the browser. Results are written as JSON so two commits can
+# be compared:
+#
+#   python benchmarks/render_bench.py -o before.json
+#   python benchmarks/render_bench.py -o after.json --compare before.json
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKBOOK = "MachineDataAnalytics.xlsx"
+DEFAULT_RERUNS = 5
+DEFAULT_OUTPUT = "render_bench.json"
+FINAL_MACHINES = ("PMS", "Hemodialysis", "UP7000")
+
+# Forward messages of the latest script run. AppTest does not expose its
+# script runner, so its run() is wrapped to keep a copy of the queue.
+_last_run_messages = []
+_script_runner_run = LocalScriptRunner.run
+
+
+def _recording_run(self, *args, **kwargs):
+    tree = _script_runner_run(self, *args, **kwargs)
+    _last_run_messages[:] = self.forward_msgs()
+    return tree
+
+
+LocalScriptRunner.run = _recording_run
+
+
+# Nearest-rank percentile, defined for any non-empty sample
+def percentile(timings, pct):
+    ordered = sorted(timings)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(timings, peak_bytes, deltas, delta_bytes):
+    return {
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "peak_kib": round(peak_bytes / 1024, 1),
+        "deltas": round(deltas, 1),
+        "delta_kib": round(delta_bytes / 1024, 2),
+        "samples": len(timings),
+    }
+
+
+def run_checked(at):
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+
+
+# Delta messages sent by the latest run and their serialized size
+def delta_traffic():
+    deltas = [msg for msg in _last_run_messages if msg.WhichOneof("type") == "delta"]
+    return len(deltas), sum(msg.ByteSize() for msg in deltas)
+
+
+# Time warm reruns of the current selection, then trace one more for memory
+def measure(at, reruns):
+    run_checked(at)
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        run_checked(at)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    try:
+        run_checked(at)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return timings, peak, delta_traffic()
+
+
+# Drive a page through two dependent selectboxes (category -> error,
+# state -> alarm) and measure every leaf
+def bench_selections(at, outer_key, inner_key, reruns, progress):
+    paths = {}
+    all_timings = []
+    peak = 0
+    traffic = []
+    run_checked(at)
+    for outer in list(at.selectbox(key=outer_key).options):
+        at.selectbox(key=outer_key).set_value(outer)
+        run_checked(at)
+        for inner in list(at.selectbox(key=inner_key).options):
+            at.selectbox(key=inner_key).set_value(inner)
+            timings, path_peak, (deltas, delta_bytes) = measure(at, reruns)
+            paths[f"{outer} / {inner}"] = summarize(timings, path_peak, deltas, delta_bytes)
+            all_timings.extend(timings)
+            peak = max(peak, path_peak)
+            traffic.append((deltas, delta_bytes))
+            progress()
+    # Delta counts and sizes are averaged over the paths of the flow
+    mean_deltas = sum(deltas for deltas, _ in traffic) / len(traffic)
+    mean_bytes = sum(delta_bytes for _, delta_bytes in traffic) / len(traffic)
+    return {"summary": summarize(all_timings, peak, mean_deltas, mean_bytes), "paths": paths}
+
+
+def bench_final(machine, reruns, progress):
+    at = AppTest.from_file(os.path.join(REPO_ROOT, "final.py"), default_timeout=60)
+    at.session_state["machine_selected"] = machine
+    return bench_selections(at, "category_select", "error_select", reruns, progress)
+
+
+def bench_app(reruns, progress):
+    at = AppTest.from_file(os.path.join(REPO_ROOT, "app.py"), default_timeout=60)
+    return bench_selections(at, "sheet_select", "alarm_select", reruns, progress)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_bench(reruns, flows):
+    results = {}
+    done = [0]
+
+    def progress():
+        done[0] += 1
+        if done[0] % 25 == 0:
+            print(f"  {done[0]} paths measured", file=sys.stderr)
+
+    # Run from a scratch directory holding copies of the assets so the
+    # workbook snapshot written by app.py does not land in the checkout
+    with tempfile.TemporaryDirectory() as workdir:
+        shutil.copy(os.path.join(REPO_ROOT, "style.css"), workdir)
+        shutil.copy(os.path.join(REPO_ROOT, WORKBOOK), workdir)
+
+        # Keep the events and counters of the fake sessions out of the real log
+        os.environ["EVENT_LOG_PATH"] = os.path.join(workdir, "troubleshooting_events.jsonl")
+        os.environ["RESOLUTION_STATS_PATH"] = os.path.join(workdir, "resolution_stats.json")
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        sys.path.insert(0, REPO_ROOT)
+        try:
+            for machine in FINAL_MACHINES:
+                name = f"final.py:{machine}"
+                if name in flows:
+                    print(f"{name} ...", file=sys.stderr)
+                    results[name] = bench_final(machine, reruns, progress)
+            if "app.py" in flows:
+                print("app.py ...", file=sys.stderr)
+                results["app.py"] = bench_app(reruns, progress)
+        finally:
+            # Write the queued events before the scratch directory goes
+            streamlit.cache_resource.clear()
+            os.chdir(cwd)
+            sys.path.remove(REPO_ROOT)
+
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "streamlit": streamlit.__version__,
+        "reruns": reruns,
+        "flows": results,
+    }
+
+
+# Print the per-flow summary, with deltas against an earlier result file
+def report(report_data, baseline=None):
+    for name, flow in report_data["flows"].items():
+        summary = flow["summary"]
+        line = (f"{name:22} p50 {summary['p50_ms']:8.1f} ms  p95 {summary['p95_ms']:8.1f} ms  "
+                f"p99 {summary['p99_ms']:8.1f} ms  peak {summary['peak_kib']:9.1f} KiB  "
+                f"{summary['deltas']:6.1f} deltas / {summary['delta_kib']:6.2f} KiB per rerun  "
+                f"({len(flow['paths'])} paths)")
+        if baseline and name in baseline["flows"]:
+            before = baseline["flows"][name]["summary"]
+            deltas = [
+                f"{key.rsplit('_', 1)[0]} {summary[key] - before.get(key, 0):+.1f}"
+                for key in ("p50_ms", "p95_ms", "p99_ms", "deltas", "delta_kib")
+            ]
+            line += "  vs " + (baseline.get("revision") or "baseline") + ": " + ", ".join(deltas)
+        print(line)
+
+
+if __name__ == "__main__":
+    all_flows = [f"final.py:{machine}" for machine in FINAL_MACHINES] + ["app.py"]
+    parser = argparse.ArgumentParser(description="Benchmark rerun latency of every troubleshooting path")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help="JSON result file")
+    parser.add_argument("--reruns", type=int, default=DEFAULT_RERUNS, help="timed reruns per path")
+    parser.add_argument("--flow", action="append", choices=all_flows,
+                        help="only benchmark this flow (repeatable, default: all)")
+    parser.add_argument("--compare", help="earlier result file to report deltas against")
+    args = parser.parse_args()
+
+    data = run_bench(args.reruns, args.flow or all_flows)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    report(data, baseline)
+    print(f"Wrote {args.output}")
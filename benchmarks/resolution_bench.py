@@ -0,0 +1,82 @@
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Cost of the resolution statistics on a synthetic event log of EVENTS
+# resolutions and fixes over ALARMS alarms of STEPS steps each: the full
+# replay on a cold start, the replay of the last TAIL events after a
+# checkpoint, and the most-likely-fix-first read of one alarm's steps.
+#
+#   python benchmarks/resolution_bench.py
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from resolution_stats import ResolutionStats  # noqa: E402
+
+EVENTS = 200_000
+TAIL = 2_000
+ALARMS = 500
+STEPS = 10
+READS = 10_000
+
+
+def alarm_key(i):
+    return ("PMS", f"Category {i % 10}", f"Alarm {i}")
+
+
+def step_text(i):
+    return f"Check component {i} and its connections"
+
+
+def write_log(path, count):
+    rng = random.Random(0)
+    with open(path, "a", encoding="utf-8") as f:
+        for _ in range(count):
+            machine, category, alarm = alarm_key(rng.randrange(ALARMS))
+            event = {"ts": time.time(), "session": "bench", "machine": machine, "category": category, "alarm": alarm}
+            if rng.random() < 0.5:
+                event.update(event="resolution", outcome=rng.choice(("Yes, issue resolved", "No, issue persists")))
+            else:
+                # Skewed so that each alarm has a clear favourite
+                event.update(event="fix", text=step_text(min(int(rng.expovariate(0.5)), STEPS - 1)))
+            f.write(json.dumps(event) + "\n")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as workdir:
+        log_path = os.path.join(workdir, "events.jsonl")
+        checkpoint_path = os.path.join(workdir, "stats.json")
+        write_log(log_path, EVENTS - TAIL)
+
+        stats = ResolutionStats(log_path, checkpoint_path)
+        start = time.perf_counter()
+        stats.refresh()
+        full_ms = (time.perf_counter() - start) * 1000
+        print(f"full replay      {full_ms:8.1f} ms  ({EVENTS - TAIL} events, "
+              f"{full_ms * 1000 / (EVENTS - TAIL):.2f} us/event)")
+
+        start = time.perf_counter()
+        stats.checkpoint()
+        print(f"checkpoint       {(time.perf_counter() - start) * 1000:8.1f} ms  "
+              f"({os.path.getsize(checkpoint_path) // 1024} KiB)")
+
+        write_log(log_path, TAIL)
+        restarted = ResolutionStats(log_path, checkpoint_path)
+        start = time.perf_counter()
+        restarted.load_checkpoint()
+        restarted.refresh()
+        print(f"restart          {(time.perf_counter() - start) * 1000:8.1f} ms  (checkpoint + {TAIL} events)")
+
+        steps = tuple(step_text(i) for i in range(STEPS))
+        timings = []
+        for i in range(READS):
+            machine, category, alarm = alarm_key(i % ALARMS)
+            start = time.perf_counter()
+            restarted.ordered_steps(machine, category, alarm, steps)
+            timings.append((time.perf_counter() - start) * 1e6)
+        print(f"ordered steps    {statistics.median(timings):8.2f} us  median ({READS} reads)")
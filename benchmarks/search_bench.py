@@ -0,0 +1,86 @@
+import os
+import statistics
+import sys
+import time
+
+# Query-latency budgets for alarm search: the full-text index at SCALE times
+# today's knowledge base (workbook + machine catalogues) must answer within
+# BUDGET_MS at p99, the fuzzy matcher over today's entries within
+# FUZZY_BUDGET_MS. Exits non-zero when either budget is exceeded.
+#
+#   python benchmarks/search_bench.py
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from alarm_index import AlarmIndex  # noqa: E402
+from fuzzy_match import build_fuzzy_matcher  # noqa: E402
+from kb_search import SearchIndex, catalogue_corpus, workbook_documents  # noqa: E402
+from knowledge_base import parse_workbook  # noqa: E402
+
+BUDGET_MS = 5.0
+FUZZY_BUDGET_MS = 1.0
+SCALE = 100
+ROUNDS = 20
+QUERIES = [
+    "pressure", "low venous pressure", "pres", "co", "conductivity high",
+    "battery", "E05", "comm err", "screen black", "connector issue",
+    "check", "main cpu issue", "blood leak detector", "temp", "power supply failure",
+]
+# What technicians type off the screen: typos and partial codes
+FUZZY_QUERIES = [
+    "E05", "e5", "comm err", "venus presure", "conductivty", "screen blank",
+    "batery", "mcu crash", "blod leak", "air detectr",
+]
+
+
+def time_queries(run, queries):
+    timings = []
+    for _ in range(ROUNDS):
+        for query in queries:
+            start = time.perf_counter()
+            run(query)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings
+
+
+def p99(timings):
+    return timings[int(len(timings) * 0.99) - 1]
+
+
+# Today's corpus repeated SCALE times, each copy under its own group name
+def scaled_documents(alarm_index, scale):
+    base = list(catalogue_corpus()) + list(workbook_documents(alarm_index))
+    for copy in range(scale):
+        for doc in base:
+            yield doc._replace(group=f"{doc.group} #{copy}")
+
+
+if __name__ == "__main__":
+    data_dict, _ = parse_workbook(os.path.join(REPO_ROOT, "MachineDataAnalytics.xlsx"))
+    alarm_index = AlarmIndex(data_dict)
+
+    start = time.perf_counter()
+    index = SearchIndex(scaled_documents(alarm_index, SCALE))
+    build_s = time.perf_counter() - start
+    timings = time_queries(index.search, QUERIES)
+    print(f"full-text: {len(index)} documents indexed in {build_s:.2f} s; query p50 "
+          f"{statistics.median(timings):.2f} ms, p99 {p99(timings):.2f} ms, max {timings[-1]:.2f} ms "
+          f"(budget {BUDGET_MS:.0f} ms)")
+
+    matcher = build_fuzzy_matcher(alarm_index)
+    fuzzy_timings = time_queries(matcher.match, FUZZY_QUERIES)
+    print(f"fuzzy: {len(matcher)} entries; match p50 {statistics.median(fuzzy_timings):.3f} ms, "
+          f"p99 {p99(fuzzy_timings):.3f} ms (budget {FUZZY_BUDGET_MS:.0f} ms)")
+
+    failed = False
+    if p99(timings) > BUDGET_MS:
+        print("FAIL: search latency budget exceeded")
+        failed = True
+    if p99(fuzzy_timings) > FUZZY_BUDGET_MS:
+        print("FAIL: fuzzy match latency budget exceeded")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("OK")
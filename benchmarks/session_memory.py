@@ -0,0 +1,137 @@
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+# Per-session memory budget for the shared knowledge base: after the first
+# session has loaded it, every further session showing the hemodialysis
+# pages may only add BUDGET_KIB of live Python allocations (its widget state
+# and rendered elements), not another copy of the workbook data.
+#
+# A session browsing alarms with the interactive guide open (ticking a step
+# on each) must also keep a constant number of session_state entries: the
+# count after WARM_ALARMS alarms may not grow by the time every alarm of
+# the workbook has been visited. Exits non-zero when either check fails.
+#
+#   python benchmarks/session_memory.py
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKBOOK = "MachineDataAnalytics.xlsx"
+BUDGET_KIB = 128
+SESSIONS = 10
+WARM_ALARMS = 20
+
+# (script, machine page) pairs that read the workbook-backed knowledge base
+PAGES = [
+    ("app.py", None),
+    ("main.py", "Hemodialysis"),
+]
+
+
+def open_session(script, machine):
+    at = AppTest.from_file(os.path.join(REPO_ROOT, script), default_timeout=60)
+    if machine is not None:
+        at.session_state["machine_selected"] = machine
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return at
+
+
+def run_checked(at):
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+
+
+def session_entries(at):
+    # Widget values and user keys alike
+    return len(at.session_state._state._state._keys())
+
+
+# session_state entries after WARM_ALARMS alarms and after every alarm of
+# app.py, each visited with the guide open and its first step ticked
+def browsing_entries():
+    at = open_session("app.py", None)
+    for checkbox in at.checkbox:
+        if "interactive" in checkbox.label:
+            checkbox.check()
+    run_checked(at)
+
+    visited = 0
+    warm = None
+    for state in list(at.selectbox(key="sheet_select").options):
+        at.selectbox(key="sheet_select").set_value(state)
+        run_checked(at)
+        for alarm in list(at.selectbox(key="alarm_select").options):
+            at.selectbox(key="alarm_select").set_value(alarm)
+            run_checked(at)
+            steps = [checkbox for checkbox in at.checkbox if checkbox.key and checkbox.key.startswith("step_")]
+            if steps:
+                steps[0].check()
+                run_checked(at)
+            visited += 1
+            if visited == WARM_ALARMS:
+                warm = session_entries(at)
+    return warm, session_entries(at), visited
+
+
+def traced_kib():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0] / 1024
+
+
+# Live memory added per session once the shared resources exist
+def per_session_kib(script, machine, sessions):
+    # The first session pays for loading and caching the knowledge base
+    first = open_session(script, machine)
+    tracemalloc.start()
+    try:
+        baseline = traced_kib()
+        kept = [open_session(script, machine) for _ in range(sessions)]
+        grown = traced_kib() - baseline
+    finally:
+        tracemalloc.stop()
+    del first, kept
+    return grown / sessions
+
+
+if __name__ == "__main__":
+    failed = False
+    with tempfile.TemporaryDirectory() as workdir:
+        shutil.copy(os.path.join(REPO_ROOT, "style.css"), workdir)
+        shutil.copy(os.path.join(REPO_ROOT, WORKBOOK), workdir)
+
+        # Keep the events and counters of the fake sessions out of the real log
+        os.environ["EVENT_LOG_PATH"] = os.path.join(workdir, "troubleshooting_events.jsonl")
+        os.environ["RESOLUTION_STATS_PATH"] = os.path.join(workdir, "resolution_stats.json")
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        sys.path.insert(0, REPO_ROOT)
+        try:
+            for script, machine in PAGES:
+                kib = per_session_kib(script, machine, SESSIONS)
+                name = script if machine is None else f"{script}:{machine}"
+                print(f"{name:22} {kib:8.1f} KiB per additional session "
+                      f"(budget {BUDGET_KIB} KiB, {SESSIONS} sessions)")
+                failed = failed or kib > BUDGET_KIB
+
+            warm, browsed, visited = browsing_entries()
+            print(f"{'app.py browsing':22} {warm} session_state entries after {WARM_ALARMS} alarms, "
+                  f"{browsed} after {visited}")
+            failed = failed or browsed > warm
+        finally:
+            # Write the queued events before the scratch directory goes
+            st.cache_resource.clear()
+            os.chdir(cwd)
+            sys.path.remove(REPO_ROOT)
+
+    if failed:
+        print("FAIL: per-session memory budget exceeded or session state grows while browsing")
+        sys.exit(1)
+    print("OK")
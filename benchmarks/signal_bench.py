@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+
+# Real-time budget of the UP-7000 waveform triage on one core: a simulated
+# monitor with a 12-lead ECG plus PLETH and NIBP channels at SAMPLE_RATE Hz
+# is fed in CHUNK-second packets, as from a device, for SECONDS seconds
+# with a fault injected every 20 s. Analysing must run at least
+# MIN_REALTIME_FACTOR times faster than the signal. Generating the signal
+# is not timed. Exits non-zero when the budget is missed.
+#
+#   python benchmarks/signal_bench.py
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from up7000_signals import SAMPLE_RATE, WaveformMonitor, simulated_monitor  # noqa: E402
+
+LEADS = ("I", "II", "III", "aVR", "aVL", "aVF", "V1", "V2", "V3", "V4", "V5", "V6")
+CHANNELS = tuple(f"ECG {lead}" for lead in LEADS) + ("PLETH", "NIBP")
+SECONDS = 300
+CHUNK = 0.04
+MIN_REALTIME_FACTOR = 20
+
+
+if __name__ == "__main__":
+    monitor = WaveformMonitor(CHANNELS, SAMPLE_RATE)
+    chunks = simulated_monitor(CHANNELS, SAMPLE_RATE, chunk=CHUNK, seed=0)
+    busy = 0.0
+    findings = 0
+    for _ in range(int(SECONDS / CHUNK)):
+        chunk = next(chunks)
+        start = time.perf_counter()
+        findings += len(monitor.feed(chunk))
+        busy += time.perf_counter() - start
+
+    factor = SECONDS / busy
+    print(f"{len(CHANNELS)} channels at {SAMPLE_RATE} Hz in {CHUNK * 1000:.0f} ms packets: "
+          f"{SECONDS} s of signal analysed in {busy:.2f} s, {factor:,.0f}x real time "
+          f"(budget {MIN_REALTIME_FACTOR}x); {findings} findings")
+    ok = factor >= MIN_REALTIME_FACTOR
+    print("OK" if ok else "OVER BUDGET")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,969 @@
+from types import MappingProxyType
+
+# Static troubleshooting catalogues for the PMS, Hemodialysis and UP-7000 flows.
+#
+# Streamlit re-executes the page script on every interaction, so catalogues
+# written as literals inside the loaders were rebuilt on every rerun of every
+# session. Defined here they are built once when the module is first imported
+# and shared by all sessions of the server process. They are frozen
+# (read-only mappings, tuples instead of lists) so no session can modify the
+# shared copy.
+
+
+# Function to turn nested dicts/lists into read-only mappings and tuples
+def freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+# ===== PMS MACHINE =====
+PMS_CATEGORIES = freeze({
+    "Power Supply Errors": [
+        "Low Battery Voltage",
+        "AC Power Failure",
+        "Overvoltage / Undervoltage"
+    ],
+    "Temperature-Related Errors": [
+        "Over Temperature Warning",
+        "Temperature Sensor Failure"
+    ],
+    "Current & Load-Related Errors": [
+        "Overload Detection",
+        "Short Circuit at Output",
+        "Current Imbalance"
+    ],
+    "System Control & Communication Errors": [
+        "Microcontroller Failure",
+        "Communication Loss (CAN/RS485)"
+    ],
+    "Network/Remote Monitoring Errors": [
+        "Modbus/SCADA Link Down",
+        "Sensor Data Missing"
+    ],
+    "Maintenance & Predictive Alerts": [
+        "Battery Health Warning",
+        "Maintenance Due Reminder"
+    ]
+})
+
+# Create a mapping of error codes to descriptions
+PMS_ERROR_CODES = freeze({
+    "E01": "Low Battery",
+    "E02": "AC Power Failure",
+    "E03": "Over Temperature",
+    "E04": "Short Circuit Output",
+    "E05": "Comm Error (CAN/RS485)",
+    "E06": "MCU Crash"
+})
+
+# Entry of PMS_ERROR_DETAILS that each error code is reported as
+PMS_ERROR_CODE_ERRORS = freeze({
+    "E01": "Low Battery Voltage",
+    "E02": "AC Power Failure",
+    "E03": "Over Temperature Warning",
+    "E04": "Short Circuit at Output",
+    "E05": "Communication Loss (CAN/RS485)",
+    "E06": "Microcontroller Failure"
+})
+
+# Create a detailed error information dictionary
+PMS_ERROR_DETAILS = freeze({
+    "Low Battery Voltage": {
+        "indication": "Red LED indicator, audible intermittent beeps, display message: 'Low Battery Voltage'",
+        "causes": [
+            "Aging or degraded battery",
+            "Incomplete charging cycles",
+            "Loose or corroded battery terminals"
+        ],
+        "impact": "Risk of system shutdown during AC power failure",
+        "steps": [
+            "Test voltage with multimeter",
+            "Replace battery if below threshold",
+            "Ensure tight and clean terminal connections"
+        ]
+    },
+    "AC Power Failure": {
+        "indication": "Blinking red LED, continuous alarm tone, display message: 'AC Mains Failure'",
+        "causes": [
+            "Power grid failure",
+            "Damaged or disconnected AC input",
+            "Blown AC input fuse"
+        ],
+        "impact": "Triggers battery backup; system shutdown if battery fails",
+        "steps": [
+            "Verify AC input source",
+            "Inspect fuse and AC cord integrity",
+            "Restore mains power supply"
+        ]
+    },
+    "Overvoltage / Undervoltage": {
+        "indication": "Beep + message: 'Voltage Out of Range'",
+        "causes": [
+            "Surge or sag in input power",
+            "Faulty voltage regulator"
+        ],
+        "impact": "Internal component damage or malfunction",
+        "steps": [
+            "Monitor input voltage",
+            "Stabilize source voltage using AVR or UPS"
+        ]
+    },
+    "Over Temperature Warning": {
+        "indication": "Continuous high-pitched alarm, red LED, message: 'System Overheat'",
+        "causes": [
+            "Blocked air vents",
+            "Faulty cooling fan",
+            "High ambient temperature"
+        ],
+        "impact": "Thermal shutdown or component damage",
+        "steps": [
+            "Clear obstructions",
+            "Replace malfunctioning fans",
+            "Improve cooling/ventilation"
+        ]
+    },
+    "Temperature Sensor Failure": {
+        "indication": "Amber LED, screen: 'Sensor Fault'",
+        "causes": [
+            "Broken or disconnected sensor",
+            "Open/short circuit in sensor line"
+        ],
+        "impact": "Incorrect temperature regulation",
+        "steps": [
+            "Inspect sensor wiring",
+            "Replace damaged sensors"
+        ]
+    },
+    "Overload Detection": {
+        "indication": "Red LED, beeping, display: 'Load Exceeded Limit'",
+        "causes": [
+            "Excessive connected load",
+            "Faulty devices drawing high current"
+        ],
+        "impact": "Auto shutdown to prevent damage",
+        "steps": [
+            "Reduce load to within rated capacity",
+            "Test individual connected devices"
+        ]
+    },
+    "Short Circuit at Output": {
+        "indication": "Loud alarm, system shutdown, screen: 'Output Short Detected'",
+        "causes": [
+            "Direct short in connected equipment",
+            "Crossed wiring"
+        ],
+        "impact": "Damage to switching components (MOSFETs, IGBTs)",
+        "steps": [
+            "Isolate and test output branches",
+            "Repair damaged circuits"
+        ]
+    },
+    "Current Imbalance": {
+        "indication": "Warning message, irregular load readings",
+        "causes": [
+            "Uneven load across phases",
+            "Faulty sensor"
+        ],
+        "impact": "Reduced efficiency, potential overheating",
+        "steps": [
+            "Balance loads",
+            "Check CT sensors"
+        ]
+    },
+    "Microcontroller Failure": {
+        "indication": "Frozen or blank screen, error code (e.g., E01)",
+        "causes": [
+            "Firmware crash",
+            "Clock failure"
+        ],
+        "impact": "Full system halt",
+        "steps": [
+            "Reset system",
+            "Reprogram controller or replace MCU"
+        ]
+    },
+    "Communication Loss (CAN/RS485)": {
+        "indication": "'Comm Error' message, yellow LED",
+        "causes": [
+            "Faulty communication cable",
+            "Incorrect baud rate"
+        ],
+        "impact": "Module syncing fails",
+        "steps": [
+            "Verify cable connections",
+            "Match communication settings"
+        ]
+    },
+    "Modbus/SCADA Link Down": {
+        "indication": "Icon with red cross, 'Network Lost'",
+        "causes": [
+            "Disconnected network cable",
+            "Transceiver failure"
+        ],
+        "impact": "Remote monitoring inoperative",
+        "steps": [
+            "Replace or reconfigure communication module",
+            "Restart SCADA/PLC systems"
+        ]
+    },
+    "Sensor Data Missing": {
+        "indication": "'No Signal from Sensor' alert",
+        "causes": [
+            "Broken sensor cable",
+            "Sensor powered off"
+        ],
+        "impact": "Incorrect readings and control behavior",
+        "steps": [
+            "Replace or reconnect sensors"
+        ]
+    },
+    "Battery Health Warning": {
+        "indication": "'Battery Health Degraded' or 'Replace Battery Soon'",
+        "causes": [
+            "High internal resistance",
+            "Battery age exceeds threshold"
+        ],
+        "impact": "Reduced backup time",
+        "steps": [
+            "Replace battery"
+        ]
+    },
+    "Maintenance Due Reminder": {
+        "indication": "Wrench icon, message: 'Service Due'",
+        "causes": [
+            "Predefined service interval reached"
+        ],
+        "impact": "Potential for future failures",
+        "steps": [
+            "Perform full system check",
+            "Log service activity and reset maintenance timer"
+        ]
+    }
+})
+
+
+# ===== HEMODIALYSIS MACHINE =====
+# Categories of errors for hemodialysis machines
+HEMO_CATEGORIES = freeze({
+    "Water System Errors": [
+        "Water Pressure Low",
+        "Water Temperature Error",
+        "Conductivity Error"
+    ],
+    "Blood Circuit Errors": [
+        "Air Detector Alarm",
+        "Venous Pressure Alarm",
+        "Arterial Pressure Alarm",
+        "Blood Leak Detector Alarm"
+    ],
+    "Dialysate Circuit Issues": [
+        "Dialysate Flow Error",
+        "Dialysate Temperature Alarm",
+        "Ultrafiltration Error"
+    ],
+    "Pump and Motor Errors": [
+        "Blood Pump Error",
+        "Dialysate Pump Error",
+        "UF Pump Error"
+    ],
+    "Sensor and Detector Issues": [
+        "Level Detector Error",
+        "Bubbles Detected",
+        "Conductivity Sensor Error"
+    ],
+    "System Control Errors": [
+        "Power Failure",
+        "Battery Error",
+        "Software Error"
+    ]
+})
+
+# Detailed error information
+HEMO_ERROR_DETAILS = freeze({
+    "Water Pressure Low": {
+        "indication": "Audible alarm, 'Water Pressure Low' message on screen",
+        "causes": [
+            "Water supply disruption",
+            "Clogged pre-filters",
+            "Faulty pressure regulator"
+        ],
+        "impact": "Inability to produce dialysate properly",
+        "steps": [
+            "Check water supply to the machine",
+            "Verify pre-filters are clean and not clogged",
+            "Check pressure gauge readings against acceptable range",
+            "Ensure pressure regulator is functioning correctly"
+        ]
+    },
+    "Water Temperature Error": {
+        "indication": "Alarm and error message indicating water temperature out of range",
+        "causes": [
+            "Heater malfunction",
+            "Incoming water temperature too low",
+            "Temperature sensor failure"
+        ],
+        "impact": "Incorrect dialysate temperature may cause patient discomfort or harm",
+        "steps": [
+            "Check temperature sensor readings",
+            "Verify heater operation",
+            "Ensure incoming water temperature meets specifications",
+            "Calibrate temperature sensors if possible"
+        ]
+    },
+    "Conductivity Error": {
+        "indication": "Alarm indicating conductivity out of range",
+        "causes": [
+            "Incorrect concentrate ratio",
+            "Malfunctioning conductivity sensor",
+            "Air in the hydraulic system"
+        ],
+        "impact": "Improper dialysate concentration may cause electrolyte imbalance",
+        "steps": [
+            "Check concentrate containers for proper solutions",
+            "Verify concentrate pump operation",
+            "Calibrate conductivity cells",
+            "Perform rinse cycle to remove air"
+        ]
+    },
+    "Air Detector Alarm": {
+        "indication": "Air detector alarm, machine stops blood pump",
+        "causes": [
+            "Air bubbles in blood line",
+            "Improper tubing placement in detector",
+            "Faulty air detector"
+        ],
+        "impact": "Risk of air embolism if ignored",
+        "steps": [
+            "Check for air bubbles in venous line",
+            "Ensure tubing is properly positioned in air detector",
+            "Verify connections are secure",
+            "Reset alarm only after confirming air is removed"
+        ]
+    },
+    "Venous Pressure Alarm": {
+        "indication": "Alarm indicating abnormal venous pressure (high or low)",
+        "causes": [
+            "Patient's venous access issues",
+            "Kinked blood tubing",
+            "Clotting in the venous chamber",
+            "Incorrect pressure transducer connection"
+        ],
+        "impact": "Improper blood return to patient",
+        "steps": [
+            "Check venous access and cannula position",
+            "Inspect blood tubing for kinks or obstruction",
+            "Verify venous chamber level",
+            "Ensure pressure transducer protector is dry and properly connected"
+        ]
+    },
+    "Arterial Pressure Alarm": {
+        "indication": "Alarm indicating abnormal arterial pressure (usually low)",
+        "causes": [
+            "Access needle position issues",
+            "Occlusion in arterial line",
+            "Blood pump speed too high",
+            "Pressure transducer issue"
+        ],
+        "impact": "Inadequate blood flow to the dialyzer",
+        "steps": [
+            "Check arterial access and needle position",
+            "Inspect arterial line for kinks",
+            "Adjust blood pump speed if necessary",
+            "Verify arterial transducer connection"
+        ]
+    },
+    "Blood Leak Detector Alarm": {
+        "indication": "Blood leak alarm, machine may stop",
+        "causes": [
+            "Actual blood leak in dialyzer",
+            "Air bubbles in dialysate line",
+            "Detector malfunction",
+            "Contamination in optical system"
+        ],
+        "impact": "Blood loss into dialysate",
+        "steps": [
+            "Check dialysate line for visible blood",
+            "Inspect dialyzer for potential rupture",
+            "Verify detector function with test",
+            "Clean optical detector if necessary"
+        ]
+    },
+    "Dialysate Flow Error": {
+        "indication": "Dialysate flow rate error message",
+        "causes": [
+            "Restricted flow path",
+            "Pump malfunction",
+            "Flow meter inaccuracy"
+        ],
+        "impact": "Suboptimal dialysis efficiency",
+        "steps": [
+            "Check for restrictions in dialysate pathway",
+            "Verify pump operation",
+            "Calibrate flow meter",
+            "Ensure proper drain function"
+        ]
+    },
+    "Dialysate Temperature Alarm": {
+        "indication": "Temperature out of range alarm for dialysate",
+        "causes": [
+            "Heater malfunction",
+            "Temperature sensor failure",
+            "Control board issue"
+        ],
+        "impact": "Patient discomfort, potential hemolysis if too high",
+        "steps": [
+            "Allow system to stabilize",
+            "Verify temperature sensor readings",
+            "Check heater function",
+            "Calibrate temperature sensors"
+        ]
+    },
+    "Ultrafiltration Error": {
+        "indication": "UF rate or volume error message",
+        "causes": [
+            "UF pump malfunction",
+            "Flow balancing system issue",
+            "Pressure transducer problem",
+            "Valve leakage"
+        ],
+        "impact": "Incorrect fluid removal from patient",
+        "steps": [
+            "Verify UF settings",
+            "Check UF pump operation",
+            "Test balancing chamber function",
+            "Calibrate pressure transducers"
+        ]
+    },
+    "Blood Pump Error": {
+        "indication": "Blood pump not running or error message",
+        "causes": [
+            "Pump rotor obstruction",
+            "Motor failure",
+            "Control board issue",
+            "Pump segment improperly loaded"
+        ],
+        "impact": "Unable to circulate blood",
+        "steps": [
+            "Check pump segment loading",
+            "Inspect rotor for free movement",
+            "Test pump motor function",
+            "Verify control signals to pump"
+        ]
+    },
+    "Dialysate Pump Error": {
+        "indication": "Dialysate flow issues or pump error message",
+        "causes": [
+            "Pump mechanism failure",
+            "Control issue",
+            "Obstruction in flow path"
+        ],
+        "impact": "Inadequate dialysate flow",
+        "steps": [
+            "Check for restrictions in dialysate pathway",
+            "Verify pump operation",
+            "Test motor and control circuits",
+            "Inspect for leaks or air in system"
+        ]
+    },
+    "UF Pump Error": {
+        "indication": "UF pump error or UF goal not achievable",
+        "causes": [
+            "UF pump malfunction",
+            "Control system issue",
+            "Calibration error"
+        ],
+        "impact": "Inability to achieve ultrafiltration goals",
+        "steps": [
+            "Verify UF pump operation",
+            "Check control signals to pump",
+            "Run pump calibration test",
+            "Inspect for mechanical issues"
+        ]
+    },
+    "Level Detector Error": {
+        "indication": "Level detector alarm or error",
+        "causes": [
+            "Incorrect level in chambers",
+            "Detector malfunction",
+            "Contamination on optical sensors"
+        ],
+        "impact": "Improper fluid management",
+        "steps": [
+            "Check fluid levels in chambers",
+            "Clean optical detectors if applicable",
+            "Verify detector operation with test",
+            "Adjust levels manually if necessary"
+        ]
+    },
+    "Bubbles Detected": {
+        "indication": "Bubble detector alarm",
+        "causes": [
+            "Actual air in blood circuit",
+            "Sensor misalignment",
+            "Ultrasonic coupling issue"
+        ],
+        "impact": "Risk of air embolism",
+        "steps": [
+            "Check for visible air bubbles",
+            "Verify sensor position and coupling",
+            "Check for proper priming of circuit",
+            "Ensure venous chamber level is appropriate"
+        ]
+    },
+    "Conductivity Sensor Error": {
+        "indication": "Conductivity sensor failure message",
+        "causes": [
+            "Sensor malfunction",
+            "Calibration drift",
+            "Contaminants on sensor"
+        ],
+        "impact": "Unable to verify dialysate composition",
+        "steps": [
+            "Clean sensors according to manufacturer guidance",
+            "Calibrate sensors if possible",
+            "Check reference values with external meter",
+            "Verify sensor connections"
+        ]
+    },
+    "Power Failure": {
+        "indication": "Machine shuts down or switches to battery",
+        "causes": [
+            "Power supply interruption",
+            "Internal power supply failure",
+            "Circuit breaker trip"
+        ],
+        "impact": "Interruption of treatment",
+        "steps": [
+            "Check power source and connections",
+            "Verify circuit breakers",
+            "Switch to battery operation if available",
+            "Follow emergency procedures for returning blood"
+        ]
+    },
+    "Battery Error": {
+        "indication": "Battery warning or failure message",
+        "causes": [
+            "Battery charge depleted",
+            "Battery failing to hold charge",
+            "Charging circuit issue"
+        ],
+        "impact": "No backup power during outages",
+        "steps": [
+            "Check battery charge status",
+            "Ensure proper charging",
+            "Test battery under load",
+            "Replace battery if necessary"
+        ]
+    },
+    "Software Error": {
+        "indication": "Software crash, freeze, or error code",
+        "causes": [
+            "Software bug",
+            "Memory corruption",
+            "Processing overload"
+        ],
+        "impact": "Machine malfunction or shutdown",
+        "steps": [
+            "Record error code",
+            "Perform controlled shutdown",
+            "Restart system",
+            "Contact technical support if persistent"
+        ]
+    }
+})
+
+
+# ===== UP-7000 PATIENT MONITORING SYSTEM =====
+# Categories of errors for the UP-7000
+UP7000_CATEGORIES = freeze({
+    "Display Issues": [
+        "No Display on Screen"
+    ],
+    "ECG Issues": [
+        "Lead Off Message",
+        "Thick Baseline / Interference",
+        "Pacemaker Signal Miscount"
+    ],
+    "NIBP (Blood Pressure) Issues": [
+        "No Reading",
+        "Overpressure or Inflation Error",
+        "Motion Artifact or Signal Weak"
+    ],
+    "SpO₂ (Oxygen Saturation) Issues": [
+        "No Reading or Low Readings",
+        "Probe Off Alarm",
+        "Sensor Temperature High"
+    ],
+    "CO₂ Monitoring Issues": [
+        "Sensor Over Temperature",
+        "Sensor Faulty or EEPROM Error",
+        "Check Sampling Line or Airway Adapter",
+        "Zero Required Warning"
+    ],
+    "Temperature Monitoring Errors": [
+        "Temperature Probe Issues"
+    ],
+    "System Alarms": [
+        "High Priority Alarms",
+        "Medium Priority Alarms",
+        "Low Priority Alarms"
+    ],
+    "Arrhythmia Detection Issues": [
+        "Arrhythmia Detection Problems"
+    ],
+    "Waveform Problems": [
+        "Freezing or No Movement"
+    ],
+    "Printer Issues": [
+        "Paper Not Feeding",
+        "Printing Blank"
+    ]
+})
+
+# Create a detailed error information dictionary
+UP7000_ERROR_DETAILS = freeze({
+    "No Display on Screen": {
+        "indication": "Screen remains black or blank when powered on",
+        "causes": [
+            "Monitor not receiving power",
+            "Faulty AC cable or fuse blown",
+            "Internal fault in the display"
+        ],
+        "impact": "Unable to view patient data or use the monitor",
+        "steps": [
+            "Check that the AC plug is properly connected to a grounded outlet",
+            "Try turning on the monitor using its power button",
+            "If AC power fails, try using the built-in battery (ensure it's charged)",
+            "Check the fuse on the back panel. Replace if necessary",
+            "If none of these work, contact service for internal board or LCD replacement"
+        ]
+    },
+    "Lead Off Message": {
+        "indication": "ECG trace missing with 'Lead Off' message",
+        "causes": [
+            "ECG electrodes are not connected or are loose"
+        ],
+        "impact": "Unable to monitor heart activity",
+        "steps": [
+            "Ensure skin is clean and dry (avoid using alcohol as it leaves a film)",
+            "Reposition the ECG electrodes on correct anatomical locations",
+            "Use high-quality silver/silver chloride electrodes",
+            "Make sure cables are properly snapped into the electrodes"
+        ]
+    },
+    "Thick Baseline / Interference": {
+        "indication": "ECG waveform with significant noise or distortion",
+        "causes": [
+            "Patient movement",
+            "Dry skin",
+            "Electrical interference"
+        ],
+        "impact": "Difficulty accurately reading ECG",
+        "steps": [
+            "Re-prepare the skin and reapply electrodes",
+            "Keep ECG cables away from power cables or ESU",
+            "Verify that the monitor is properly grounded"
+        ]
+    },
+    "Pacemaker Signal Miscount": {
+        "indication": "Incorrect heart rate displayed for patients with pacemakers",
+        "causes": [
+            "Some pacemaker pulses may be miscounted as heartbeats"
+        ],
+        "impact": "Inaccurate heart rate monitoring",
+        "steps": [
+            "Use 5-lead ECG and observe the waveform closely",
+            "Never rely solely on heart rate alarms; always visually confirm ECG",
+            "Adjust pacemaker rejection settings if available"
+        ]
+    },
+    "No Reading": {
+        "indication": "NIBP displays no values or error message",
+        "causes": [
+            "Loose cuff",
+            "Tubing kinked",
+            "Leak in the system"
+        ],
+        "impact": "Unable to measure blood pressure",
+        "steps": [
+            "Re-wrap the cuff snugly on the upper arm",
+            "Ensure the cuff is the correct size for the patient (too small or large affects accuracy)",
+            "Check for leaks by manually inflating and listening for hissing"
+        ]
+    },
+    "Overpressure or Inflation Error": {
+        "indication": "NIBP displays error message or over-pressure alarm",
+        "causes": [
+            "Incorrect patient type selected",
+            "Faulty pressure valve"
+        ],
+        "impact": "Risk of patient discomfort or injury",
+        "steps": [
+            "Switch mode to correct patient type (Adult, Pediatric, Neonate)",
+            "Avoid continuous NIBP mode unless under supervision",
+            "Perform pressure accuracy verification or leak test"
+        ]
+    },
+    "Motion Artifact or Signal Weak": {
+        "indication": "NIBP displays 'Motion Artifact' or 'Signal Weak' message",
+        "causes": [
+            "Patient movement during measurement"
+        ],
+        "impact": "Inaccurate or failed BP readings",
+        "steps": [
+            "Ask patient to stay still and avoid talking",
+            "Do not place cuff on limb with IV lines or wounds",
+            "Monitor the color and temperature of the limb to ensure circulation isn't blocked"
+        ]
+    },
+    "No Reading or Low Readings": {
+        "indication": "SpO₂ values missing or suspiciously low",
+        "causes": [
+            "Loose probe",
+            "Low perfusion",
+            "Ambient light interference"
+        ],
+        "impact": "Inaccurate oxygen monitoring",
+        "steps": [
+            "Ensure probe fits snugly on the finger and the nail is clean and not painted",
+            "Avoid placing on edematous or injured fingers",
+            "Cover the sensor with opaque tape or cloth to block bright light",
+            "Switch fingers if readings are unstable"
+        ]
+    },
+    "Probe Off Alarm": {
+        "indication": "SpO₂ displays 'Probe Off' message",
+        "causes": [
+            "Sensor disconnected",
+            "Sensor damaged"
+        ],
+        "impact": "No SpO₂ monitoring",
+        "steps": [
+            "Disconnect and reconnect the SpO₂ cable",
+            "Replace the sensor if damaged or old"
+        ]
+    },
+    "Sensor Temperature High": {
+        "indication": "SpO₂ alarm for high sensor temperature",
+        "causes": [
+            "Sensor overheating",
+            "Sensor left in same position too long"
+        ],
+        "impact": "Risk of skin burns",
+        "steps": [
+            "Remove the sensor and replace with a new one",
+            "Do not leave the same site monitored for more than 2 hours continuously"
+        ]
+    },
+    "Sensor Over Temperature": {
+        "indication": "CO₂ module displays temperature warning",
+        "causes": [
+            "Overheating CO₂ sensor",
+            "External heat source"
+        ],
+        "impact": "Inaccurate CO₂ readings",
+        "steps": [
+            "Turn off the unit, allow cooling, and restart",
+            "Move away from external heat sources (sunlight, heaters)",
+            "Replace the CO₂ sensor if repeated"
+        ]
+    },
+    "Sensor Faulty or EEPROM Error": {
+        "indication": "CO₂ displays 'Sensor Faulty' or 'EEPROM Error'",
+        "causes": [
+            "Sensor memory error",
+            "Hardware failure"
+        ],
+        "impact": "Unable to monitor CO₂",
+        "steps": [
+            "Restart the monitor",
+            "If error persists, replace the CO₂ module"
+        ]
+    },
+    "Check Sampling Line or Airway Adapter": {
+        "indication": "CO₂ displays 'Check Sampling Line' or 'Check Airway Adapter'",
+        "causes": [
+            "Blocked tubing",
+            "Dirty or damaged adapter"
+        ],
+        "impact": "Inaccurate CO₂ readings",
+        "steps": [
+            "Ensure tubing is not blocked or kinked",
+            "Replace the airway adapter if dirty or damaged",
+            "Never reuse single-use CO₂ adapters"
+        ]
+    },
+    "Zero Required Warning": {
+        "indication": "CO₂ displays 'Zero Required' message",
+        "causes": [
+            "Calibration drift",
+            "New sensor installed"
+        ],
+        "impact": "Inaccurate CO₂ readings",
+        "steps": [
+            "Disconnect the sampling line",
+            "Select 'Zero' in the monitor menu",
+            "Wait until the system completes the process"
+        ]
+    },
+    "Temperature Probe Issues": {
+        "indication": "Erratic or missing temperature readings",
+        "causes": [
+            "Loose probe connection",
+            "Damaged probe",
+            "Incorrect placement"
+        ],
+        "impact": "Inaccurate temperature monitoring",
+        "steps": [
+            "Ensure temperature probes are firmly attached and connected to correct ports",
+            "Avoid attaching to exposed skin; probe should be covered or taped down",
+            "If temperature values are erratic, clean or replace the probe"
+        ]
+    },
+    "High Priority Alarms": {
+        "indication": "Red flashing lights and urgent alarm tone",
+        "causes": [
+            "Cardiac arrest",
+            "Pulse stop",
+            "Apnea",
+            "Dangerous vital sign values"
+        ],
+        "impact": "Indicates life-threatening condition",
+        "steps": [
+            "Attend to patient immediately",
+            "Verify the patient's condition",
+            "Resolve underlying clinical issue",
+            "Only silence alarm when actively addressing the problem"
+        ]
+    },
+    "Medium Priority Alarms": {
+        "indication": "Orange flashing lights and medium urgency tone",
+        "causes": [
+            "Probe off",
+            "Lead off",
+            "Sensor error"
+        ],
+        "impact": "Technical issue affecting monitoring",
+        "steps": [
+            "Check connections and equipment",
+            "Replace or reposition sensors as needed",
+            "Address technical issues promptly"
+        ]
+    },
+    "Low Priority Alarms": {
+        "indication": "Orange solid light (not flashing) and low urgency tone",
+        "causes": [
+            "Arrhythmia detection",
+            "Parameter approaching limit"
+        ],
+        "impact": "Potential developing issue",
+        "steps": [
+            "Monitor the situation",
+            "Check patient condition",
+            "Prepare for intervention if condition worsens"
+        ]
+    },
+    "Arrhythmia Detection Problems": {
+        "indication": "False arrhythmia alarms or missed arrhythmias",
+        "causes": [
+            "Poor signal quality",
+            "Learning function not activated",
+            "ECG leads positioned incorrectly"
+        ],
+        "impact": "Missed cardiac events or false alarms",
+        "steps": [
+            "Start 'Learn' function when new patient is connected",
+            "Make sure ECG waveform is stable before enabling ARR detection",
+            "If wrong arrhythmia is triggered, perform ARR relearning"
+        ]
+    },
+    "Freezing or No Movement": {
+        "indication": "Waveforms not moving on screen",
+        "causes": [
+            "System in Freeze mode",
+            "Printer in active mode"
+        ],
+        "impact": "Not seeing real-time patient data",
+        "steps": [
+            "Press 'Freeze' again to return to live monitoring",
+            "Check if printer is actively printing; printing may pause waveforms"
+        ]
+    },
+    "Paper Not Feeding": {
+        "indication": "Printer not producing paper output",
+        "causes": [
+            "Improper paper loading",
+            "Door not closed",
+            "Paper jam"
+        ],
+        "impact": "Unable to print patient data",
+        "steps": [
+            "Reload paper following the guide (cut end into triangle, insert under roller)",
+            "Ensure printer door is closed tightly",
+            "Clear any paper jams"
+        ]
+    },
+    "Printing Blank": {
+        "indication": "Paper feeds but no printing appears",
+        "causes": [
+            "Paper inserted backwards",
+            "Wrong paper type",
+            "Printhead failure"
+        ],
+        "impact": "No record of patient data",
+        "steps": [
+            "Check paper orientation",
+            "Use only manufacturer-recommended paper",
+            "If persists, service required for printhead"
+        ]
+    }
+})
+
+
+# ===== COMMON PROCEDURES =====
+# Common troubleshooting procedures dictionary
+COMMON_PROCEDURES = freeze({
+    "power_cycle": {
+        "title": "Power Cycling Procedure",
+        "steps": [
+            "Ensure the machine is safe to restart",
+            "Power off the machine using the main power switch",
+            "Wait 30 seconds for capacitors to discharge",
+            "Turn the machine back on and observe the boot sequence",
+            "Check if the alarm persists after restart"
+        ]
+    },
+    "system_check": {
+        "title": "System Diagnostic Check",
+        "steps": [
+            "Enter diagnostic mode (if applicable)",
+            "Run system self-test",
+            "Check for error codes or messages",
+            "Verify sensor readings against normal ranges",
+            "Document all abnormal values"
+        ]
+    },
+    "connections_check": {
+        "title": "Connection Verification",
+        "steps": [
+            "Inspect all cable connections",
+            "Check for loose or damaged connectors",
+            "Verify proper seating of all modular components",
+            "Test continuity of suspect cables with multimeter",
+            "Clean connectors if needed"
+        ]
+    },
+    "safety_systems": {
+        "title": "Safety Systems Check",
+        "steps": [
+            "Verify safety systems are functioning",
+            "Test alarm functionality",
+            "Check sensor calibration",
+            "Verify bypass mechanisms work correctly",
+            "Ensure all indicators and displays function properly"
+        ]
+    }
+})
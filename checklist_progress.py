@@ -0,0 +1,77 @@
+import hashlib
+from collections import OrderedDict
+
+import streamlit as st
+
+# Per-session progress of the interactive troubleshooting checklists.
+#
+# Each (machine, alarm, procedure plan) gets one integer used as a bitset,
+# bit i set once step i of the plan is checked, so switching between alarms
+# keeps each checklist's progress apart without a session_state entry per
+# checkbox. Only the MAX_PLANS most recently used plans are remembered; older
+# ones are evicted, so a session's footprint stays the same however many
+# alarms a technician browses.
+
+MAX_PLANS = 16
+SESSION_KEY = "checklist_progress"
+
+
+class ChecklistProgress:
+    __slots__ = ("max_plans", "_plans")
+
+    def __init__(self, max_plans=MAX_PLANS):
+        self.max_plans = max_plans
+        # plan key -> [bits, resets]; resets renews the checkbox keys
+        self._plans = OrderedDict()
+
+    def __len__(self):
+        return len(self._plans)
+
+    # Entry of a plan, marked as most recently used
+    def _entry(self, plan_key):
+        entry = self._plans.get(plan_key)
+        if entry is None:
+            entry = self._plans[plan_key] = [0, 0]
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+        else:
+            self._plans.move_to_end(plan_key)
+        return entry
+
+    def is_done(self, plan_key, step_index):
+        return bool(self._entry(plan_key)[0] >> step_index & 1)
+
+    def mark(self, plan_key, step_index, done=True):
+        entry = self._entry(plan_key)
+        if done:
+            entry[0] |= 1 << step_index
+        else:
+            entry[0] &= ~(1 << step_index)
+
+    # Number of checked steps
+    def completed(self, plan_key):
+        return bin(self._entry(plan_key)[0]).count("1")
+
+    # True if every step in start .. end - 1 is checked
+    def all_done(self, plan_key, start, end):
+        mask = ((1 << (end - start)) - 1) << start
+        return self._entry(plan_key)[0] & mask == mask
+
+    def reset(self, plan_key):
+        entry = self._entry(plan_key)
+        entry[0] = 0
+        entry[1] += 1
+
+    # Widget key of a step's checkbox. Keys differ per plan, so a checkbox
+    # never inherits the state of another alarm's checklist, and change on
+    # reset, so the checkboxes are recreated unchecked.
+    def widget_key(self, plan_key, step_index):
+        digest = hashlib.blake2b(repr(plan_key).encode("utf-8"), digest_size=6).hexdigest()
+        return f"step_{digest}_{self._entry(plan_key)[1]}_{step_index}"
+
+
+# Function to get this session's progress store
+def checklist_progress():
+    if SESSION_KEY not in st.session_state:
+        st.session_state[SESSION_KEY] = ChecklistProgress()
+    return st.session_state[SESSION_KEY]
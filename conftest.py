@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The modules are flat scripts next to this file; tests import them as the
+# benchmarks do, from the repository root.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "budget: performance budget of a benchmarks/ script (slow)")
@@ -0,0 +1,182 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+import streamlit as st
+
+# Append-only log of what technicians do in the troubleshooting pages:
+# which alarm they select, which checklist steps they check or uncheck, and
+# how they answer the resolution question (and which step fixed the issue).
+# One JSON object per line:
+#
+#   {"ts": 1760000000.0, "event": "step", "session": "3f2a...",
+#    "machine": "PMS", "category": "Power Supply", "alarm": "...", "step": 3, "done": true}
+#
+# The script thread only puts the event on a queue; a writer thread appends
+# the events in batches, once BATCH_SIZE are waiting or FLUSH_INTERVAL after
+# the first of them, so a rerun never waits on the disk.
+#
+# The path is resolved against the working directory at import, so a later
+# chdir does not move the log; EVENT_LOG_PATH in the environment overrides it.
+
+EVENT_LOG_PATH = os.path.abspath(os.environ.get("EVENT_LOG_PATH", "troubleshooting_events.jsonl"))
+BATCH_SIZE = 64
+FLUSH_INTERVAL = 1.0
+SESSION_KEY = "event_log_session"
+FIX_NOT_RECORDED = "Not recorded"
+# First option of the resolution radios, selected until the technician answers
+NO_ANSWER = "Select an option"
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class EventLog:
+    def __init__(self, path=EVENT_LOG_PATH, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = os.path.abspath(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        # Called on the writer thread after each batch written
+        self._listeners = []
+        self._thread = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # Queue an event; never blocks
+    def append(self, event, **fields):
+        self._queue.put({"ts": time.time(), "event": event, **fields})
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    # Wait until every event queued so far is written
+    def flush(self, timeout=None):
+        written = threading.Event()
+        self._queue.put(written)
+        return written.wait(timeout)
+
+    def close(self, timeout=5.0):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if isinstance(item, dict):
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+                if len(batch) < self.batch_size:
+                    continue
+            self._write(batch)
+            batch = []
+            if item is _STOP:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+
+    def _write(self, batch):
+        if not batch:
+            return
+        lines = "".join(json.dumps(event, ensure_ascii=False, default=str) + "\n" for event in batch)
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError:
+            logger.warning("Writing %d events to %s failed", len(batch), self.path, exc_info=True)
+            return
+        for listener in self._listeners:
+            try:
+                listener()
+            except Exception:
+                logger.warning("Event log listener %r failed", listener, exc_info=True)
+
+
+# Read back a log, oldest event first
+def read_events(path=EVENT_LOG_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash mid-write
+                    continue
+    except FileNotFoundError:
+        return
+
+
+# One writer shared by every session; releasing it writes what is queued
+@st.cache_resource(on_release=EventLog.close)
+def get_event_log(path=EVENT_LOG_PATH):
+    return EventLog(path)
+
+
+class _SessionEvents:
+    __slots__ = ("session_id", "selection")
+
+    def __init__(self):
+        self.session_id = uuid.uuid4().hex
+        self.selection = None
+
+
+def _session():
+    if SESSION_KEY not in st.session_state:
+        st.session_state[SESSION_KEY] = _SessionEvents()
+    return st.session_state[SESSION_KEY]
+
+
+# Function to log an event of this session
+def log_event(event, machine, category, alarm, **fields):
+    get_event_log().append(
+        event, session=_session().session_id, machine=machine, category=category, alarm=alarm, **fields
+    )
+
+
+# Function to log the selected alarm; called on every rerun, logged only when it changes
+def log_selection(machine, category, alarm):
+    session = _session()
+    selection = (machine, category, alarm)
+    if selection != session.selection:
+        session.selection = selection
+        log_event("selection", machine, category, alarm)
+
+
+# on_change callback of a resolution radio
+def log_resolution(key, machine, category, alarm):
+    outcome = st.session_state[key]
+    if outcome != NO_ANSWER:
+        log_event("resolution", machine, category, alarm, outcome=outcome)
+
+
+# Function to ask which of the steps shown fixed the issue, logged as a "fix" event
+def ask_fixing_step(machine, category, alarm, steps, key="fixing_step"):
+    st.selectbox(
+        "Which step fixed it?",
+        [FIX_NOT_RECORDED, *steps],
+        key=key,
+        on_change=_log_fix,
+        args=(key, machine, category, alarm)
+    )
+
+
+def _log_fix(key, machine, category, alarm):
+    step = st.session_state[key]
+    if step != FIX_NOT_RECORDED:
+        log_event("fix", machine, category, alarm, text=step)
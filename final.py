@@ -1,32 +1,62 @@
+import os
+from collections import deque
+
 import streamlit as st
+import numpy as np
 import pandas as pd
-import time
+from procedure_plan import ProcedurePlan
+from static_assets import inject_stylesheet
+from step_list import render_step_list
+from checklist_progress import checklist_progress
+from kb_search import build_search_index
+from fuzzy_match import build_fuzzy_matcher
+from kb_store import open_store
+from event_log import ask_fixing_step, log_event, log_resolution, log_selection
+from resolution_stats import get_resolution_stats
+from fleet_gateway import HOST, Subscription, build_gateway, start_gateway_thread
+from machine_log import MACHINE_LOG_DIR, resolve_log_path
+from alarm_analytics import DEFAULT_HISTORY, alarm_stats, load_history, rolling_rates, ttr_histogram
+from up7000_signals import WAVEFORM_DIR, WaveformFeed
+from catalogues import COMMON_PROCEDURES
+
+# Seconds between successive step reveals (CSS animation delay, no server-side wait)
+STEP_REVEAL_DELAY = 0.1
+
+# Hits listed under the search box
+SEARCH_RESULTS = 5
+
+# Workbook compiled into the knowledge store next to it (catalogues only if missing)
+WORKBOOK_PATH = "MachineDataAnalytics.xlsx"
+
+# Address ("host:port") the fleet gateway accepts device connections on;
+# the fleet alarms panel is shown only when it is set
+FLEET_GATEWAY = os.environ.get("FLEET_GATEWAY")
+# Seconds between refreshes of the fleet alarms panel, and alarms listed
+FLEET_REFRESH = 1.0
+FLEET_ALARMS = 10
+
+# Alarms in the top alarms chart of the analytics page
+TOP_ALARMS = 15
+
+# Seconds between refreshes of the signal findings, and waveform sources
+# analysed at once
+SIGNAL_REFRESH = 1.0
+WAVEFORM_FEEDS = 4
 
 # App title and header
 st.set_page_config(page_title="Medical Equipment Troubleshooter", layout="wide", initial_sidebar_state="expanded")
 
-# Custom CSS for styling
-def local_css(file_name):
-    with open(file_name) as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
-
-# Try to load custom CSS if available
-try:
-    local_css("style.css")
-except:
-    pass
+# Custom CSS for styling (minified, content-hashed and served as a static
+# file; only a one-line @import is sent per rerun)
+inject_stylesheet("style.css", "final.css")
 
 # Initialize state if not already done
 if 'machine_selected' not in st.session_state:
     st.session_state.machine_selected = None
-    
-if 'troubleshoot_step' not in st.session_state:
-    st.session_state.troubleshoot_step = 0
 
 # Function to reset session state
 def reset_state():
     st.session_state.machine_selected = None
-    st.session_state.troubleshoot_step = 0
 
 # ===== MACHINE SELECTION PAGE =====
 def show_machine_selection():
@@ -81,6 +111,11 @@ def show_machine_selection():
     
     st.markdown("</div>", unsafe_allow_html=True)
 
+    # Alarm history of the machine logs
+    if st.button("📈 Alarm Analytics"):
+        st.session_state.machine_selected = "Analytics"
+        st.rerun()
+
     # Footer
     st.markdown("""
     <div class="footer">
@@ -88,618 +123,226 @@ def show_machine_selection():
     </div>
     """, unsafe_allow_html=True)
 
-# ===== PMS MACHINE TROUBLESHOOTING =====
-def load_pms_data():
-    # In a real app, this would load from a database or file
-    # For this example, we'll create a structured dictionary
-    pms_categories = {
-        "Power Supply Errors": [
-            "Low Battery Voltage",
-            "AC Power Failure",
-            "Overvoltage / Undervoltage"
-        ],
-        "Temperature-Related Errors": [
-            "Over Temperature Warning",
-            "Temperature Sensor Failure"
-        ],
-        "Current & Load-Related Errors": [
-            "Overload Detection",
-            "Short Circuit at Output",
-            "Current Imbalance"
-        ],
-        "System Control & Communication Errors": [
-            "Microcontroller Failure",
-            "Communication Loss (CAN/RS485)"
-        ],
-        "Network/Remote Monitoring Errors": [
-            "Modbus/SCADA Link Down",
-            "Sensor Data Missing"
-        ],
-        "Maintenance & Predictive Alerts": [
-            "Battery Health Warning",
-            "Maintenance Due Reminder"
-        ]
-    }
+# ===== KNOWLEDGE STORE =====
+# Function to open the SQLite knowledge store once per server process; every
+# session queries it through the store's pool of read-only connections
+@st.cache_resource
+def get_knowledge_store():
+    return open_store(WORKBOOK_PATH)
+
+# Common troubleshooting procedures dictionary (shared, read-only)
+common_procedures = COMMON_PROCEDURES
+
+# Search index over the PMS / Hemodialysis / UP-7000 catalogues, built once per server process
+@st.cache_resource
+def get_search_index():
+    return build_search_index()
+
+# Typo-tolerant matcher over names, error codes and indications of the same catalogues
+@st.cache_resource
+def get_fuzzy_matcher():
+    return build_fuzzy_matcher()
+
+# Function to jump the category and error selectboxes to a search hit
+def select_error(category, error):
+    st.session_state.category_select = category
+    st.session_state.error_select = error
+
+# Free-text search by symptom, cause or error code within one machine's catalogue
+def show_error_search(machine):
+    query = st.text_input(
+        "🔎 Search by symptom, cause or error code:",
+        key=f"error_search_{machine}",
+        placeholder="e.g. screen black, conductivity, E05"
+    )
+    if query:
+        hits = get_search_index().search(query, limit=SEARCH_RESULTS, sources=[machine])
+        if not hits:
+            # Nothing matches word for word (typo, partial code): offer the closest errors
+            hits = get_fuzzy_matcher().match(query, limit=SEARCH_RESULTS, sources=[machine])
+            if hits:
+                st.caption("No exact matches. Did you mean:")
+            else:
+                st.info("No errors match this search.")
+        for hit in hits:
+            st.button(
+                f"{hit.name} ({hit.group})",
+                key=f"search_hit_{machine}_{hit.group}_{hit.name}",
+                on_click=select_error,
+                args=(hit.group, hit.name)
+            )
+
+# ===== FLEET ALARMS =====
+# Function to start the fleet gateway once per server process, on its own event loop
+@st.cache_resource
+def get_fleet_gateway(address):
+    host, _, port = address.rpartition(":")
+    return start_gateway_thread(build_gateway(host or HOST, int(port), get_fuzzy_matcher()))
+
+# Function to subscribe this session to the fleet's alarms (unsubscribed when the session ends)
+@st.cache_resource(scope="session", on_release=Subscription.close)
+def get_fleet_subscription(address):
+    return get_fleet_gateway(address).subscribe()
+
+# Function to open a fleet alarm in its machine's page
+def open_fleet_alarm(event):
+    st.session_state.machine_selected = event.machine
+    select_error(event.category, event.error)
+
+# Latest alarms of the fleet, newest first; each opens its machine's page
+@st.fragment(run_every=FLEET_REFRESH)
+def show_fleet_alarms(address):
+    gateway = get_fleet_gateway(address)
+    alarms = st.session_state.setdefault("fleet_alarms", deque(maxlen=FLEET_ALARMS))
+    alarms.extend(get_fleet_subscription(address).drain())
+    
+    st.markdown("### 📡 Fleet Alarms")
+    st.caption(f"{len(gateway.devices)} devices connected")
+    for event in reversed(alarms):
+        if st.button(
+            f"{event.device}: {event.error}",
+            key=f"fleet_alarm_{event.seq}",
+            help=f"{event.machine} / {event.category}, {event.timestamp}: {event.text}"
+        ):
+            open_fleet_alarm(event)
+            st.rerun(scope="app")
+
+# ===== SIGNAL TRIAGE =====
+# Function to analyse a waveform file (a simulated monitor if None) once per
+# server process, at the signal's pace; stopped when evicted
+@st.cache_resource(max_entries=WAVEFORM_FEEDS, on_release=WaveformFeed.stop)
+def get_waveform_feed(path):
+    return WaveformFeed(path).start()
+
+# Signal problems found in the waveforms, newest first; each selects its UP-7000 error
+@st.fragment(run_every=SIGNAL_REFRESH)
+def show_signal_findings(feed):
+    if feed.error:
+        st.error(f"Cannot read the waveforms: {feed.error}")
+        return
+    st.caption(f"{len(feed.channels)} channels, {feed.seconds:.0f} s analysed")
+    for seq, finding in reversed(list(feed.recent)):
+        if st.button(
+            f"{finding.channel}: {finding.error}",
+            key=f"signal_finding_{seq}",
+            help=f"{finding.text} ({finding.time:.0f} s)"
+        ):
+            select_error(finding.category, finding.error)
+            st.rerun(scope="app")
+
+# ===== ALARM ANALYTICS =====
+# Function to analyse a machine log history once per version of the file;
+# the results are shared read-only between sessions
+@st.cache_resource(max_entries=4)
+def get_alarm_analytics(path, mtime, size):
+    alarm_index = get_knowledge_store().index()
+    history = load_history(path, alarm_index, build_fuzzy_matcher(alarm_index))
+    return history, alarm_stats(history), rolling_rates(history), ttr_histogram(history)
+
+# Alarm frequency, MTBF and time to resolution over a machine log history
+def show_alarm_analytics():
+    st.markdown("""
+    <div class="header">
+        <h1>📈 Alarm Analytics</h1>
+        <p class="subheader">Alarm frequency, time between failures and time to resolution from machine logs</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    with st.sidebar:
+        path = st.text_input("Machine log history:", value=DEFAULT_HISTORY, key="analytics_path")
+        
+        # Button to go back to selection page
+        if st.button("Change Machine"):
+            reset_state()
+            st.rerun()
     
-    # Create a mapping of error codes to descriptions
-    error_codes = {
-        "E01": "Low Battery",
-        "E02": "AC Power Failure",
-        "E03": "Over Temperature",
-        "E04": "Short Circuit Output",
-        "E05": "Comm Error (CAN/RS485)",
-        "E06": "MCU Crash"
-    }
+    log_file = resolve_log_path(path)
+    if log_file is None:
+        st.error(f"Machine logs can only be read from {MACHINE_LOG_DIR}")
+        return
+    if not os.path.exists(log_file):
+        st.info(f"No machine log at {path}. A simulated history can be written with "
+                f"`python alarm_analytics.py simulate {path}`.")
+        return
+    stat = os.stat(log_file)
+    with st.spinner("Analysing alarm history..."):
+        history, stats, rates, (ttr_counts, ttr_edges) = get_alarm_analytics(log_file, stat.st_mtime, stat.st_size)
+    if not len(stats):
+        st.info("No alarms in this log.")
+        return
     
-    # Create a detailed error information dictionary
-    error_details = {
-        "Low Battery Voltage": {
-            "indication": "Red LED indicator, audible intermittent beeps, display message: 'Low Battery Voltage'",
-            "causes": [
-                "Aging or degraded battery",
-                "Incomplete charging cycles",
-                "Loose or corroded battery terminals"
-            ],
-            "impact": "Risk of system shutdown during AC power failure",
-            "steps": [
-                "Test voltage with multimeter",
-                "Replace battery if below threshold",
-                "Ensure tight and clean terminal connections"
-            ]
-        },
-        "AC Power Failure": {
-            "indication": "Blinking red LED, continuous alarm tone, display message: 'AC Mains Failure'",
-            "causes": [
-                "Power grid failure",
-                "Damaged or disconnected AC input",
-                "Blown AC input fuse"
-            ],
-            "impact": "Triggers battery backup; system shutdown if battery fails",
-            "steps": [
-                "Verify AC input source",
-                "Inspect fuse and AC cord integrity",
-                "Restore mains power supply"
-            ]
-        },
-        "Overvoltage / Undervoltage": {
-            "indication": "Beep + message: 'Voltage Out of Range'",
-            "causes": [
-                "Surge or sag in input power",
-                "Faulty voltage regulator"
-            ],
-            "impact": "Internal component damage or malfunction",
-            "steps": [
-                "Monitor input voltage",
-                "Stabilize source voltage using AVR or UPS"
-            ]
-        },
-        "Over Temperature Warning": {
-            "indication": "Continuous high-pitched alarm, red LED, message: 'System Overheat'",
-            "causes": [
-                "Blocked air vents",
-                "Faulty cooling fan",
-                "High ambient temperature"
-            ],
-            "impact": "Thermal shutdown or component damage",
-            "steps": [
-                "Clear obstructions",
-                "Replace malfunctioning fans",
-                "Improve cooling/ventilation"
-            ]
-        },
-        "Temperature Sensor Failure": {
-            "indication": "Amber LED, screen: 'Sensor Fault'",
-            "causes": [
-                "Broken or disconnected sensor",
-                "Open/short circuit in sensor line"
-            ],
-            "impact": "Incorrect temperature regulation",
-            "steps": [
-                "Inspect sensor wiring",
-                "Replace damaged sensors"
-            ]
-        },
-        "Overload Detection": {
-            "indication": "Red LED, beeping, display: 'Load Exceeded Limit'",
-            "causes": [
-                "Excessive connected load",
-                "Faulty devices drawing high current"
-            ],
-            "impact": "Auto shutdown to prevent damage",
-            "steps": [
-                "Reduce load to within rated capacity",
-                "Test individual connected devices"
-            ]
-        },
-        "Short Circuit at Output": {
-            "indication": "Loud alarm, system shutdown, screen: 'Output Short Detected'",
-            "causes": [
-                "Direct short in connected equipment",
-                "Crossed wiring"
-            ],
-            "impact": "Damage to switching components (MOSFETs, IGBTs)",
-            "steps": [
-                "Isolate and test output branches",
-                "Repair damaged circuits"
-            ]
-        },
-        "Current Imbalance": {
-            "indication": "Warning message, irregular load readings",
-            "causes": [
-                "Uneven load across phases",
-                "Faulty sensor"
-            ],
-            "impact": "Reduced efficiency, potential overheating",
-            "steps": [
-                "Balance loads",
-                "Check CT sensors"
-            ]
-        },
-        "Microcontroller Failure": {
-            "indication": "Frozen or blank screen, error code (e.g., E01)",
-            "causes": [
-                "Firmware crash",
-                "Clock failure"
-            ],
-            "impact": "Full system halt",
-            "steps": [
-                "Reset system",
-                "Reprogram controller or replace MCU"
-            ]
-        },
-        "Communication Loss (CAN/RS485)": {
-            "indication": "'Comm Error' message, yellow LED",
-            "causes": [
-                "Faulty communication cable",
-                "Incorrect baud rate"
-            ],
-            "impact": "Module syncing fails",
-            "steps": [
-                "Verify cable connections",
-                "Match communication settings"
-            ]
-        },
-        "Modbus/SCADA Link Down": {
-            "indication": "Icon with red cross, 'Network Lost'",
-            "causes": [
-                "Disconnected network cable",
-                "Transceiver failure"
-            ],
-            "impact": "Remote monitoring inoperative",
-            "steps": [
-                "Replace or reconfigure communication module",
-                "Restart SCADA/PLC systems"
-            ]
-        },
-        "Sensor Data Missing": {
-            "indication": "'No Signal from Sensor' alert",
-            "causes": [
-                "Broken sensor cable",
-                "Sensor powered off"
-            ],
-            "impact": "Incorrect readings and control behavior",
-            "steps": [
-                "Replace or reconnect sensors"
-            ]
-        },
-        "Battery Health Warning": {
-            "indication": "'Battery Health Degraded' or 'Replace Battery Soon'",
-            "causes": [
-                "High internal resistance",
-                "Battery age exceeds threshold"
-            ],
-            "impact": "Reduced backup time",
-            "steps": [
-                "Replace battery"
-            ]
-        },
-        "Maintenance Due Reminder": {
-            "indication": "Wrench icon, message: 'Service Due'",
-            "causes": [
-                "Predefined service interval reached"
-            ],
-            "impact": "Potential for future failures",
-            "steps": [
-                "Perform full system check",
-                "Log service activity and reset maintenance timer"
-            ]
-        }
-    }
+    # Machines to include (all if none are chosen)
+    machines = st.multiselect("Machines:", list(rates.columns), key="analytics_machines")
+    ttr = history.ttr
+    if machines:
+        stats = stats[stats["machine"].isin(machines)]
+        rates = rates[machines]
+        ttr = ttr[np.isin(history.machine, np.flatnonzero(np.isin(history.machines, machines)))]
     
-    return pms_categories, error_codes, error_details
-
-# ===== UP-7000 PATIENT MONITORING SYSTEM DATA =====
-def load_up7000_data():
-    # Categories of errors for the UP-7000
-    up7000_categories = {
-        "Display Issues": [
-            "No Display on Screen"
-        ],
-        "ECG Issues": [
-            "Lead Off Message",
-            "Thick Baseline / Interference",
-            "Pacemaker Signal Miscount"
-        ],
-        "NIBP (Blood Pressure) Issues": [
-            "No Reading",
-            "Overpressure or Inflation Error",
-            "Motion Artifact or Signal Weak"
-        ],
-        "SpO₂ (Oxygen Saturation) Issues": [
-            "No Reading or Low Readings",
-            "Probe Off Alarm",
-            "Sensor Temperature High"
-        ],
-        "CO₂ Monitoring Issues": [
-            "Sensor Over Temperature",
-            "Sensor Faulty or EEPROM Error",
-            "Check Sampling Line or Airway Adapter",
-            "Zero Required Warning"
-        ],
-        "Temperature Monitoring Errors": [
-            "Temperature Probe Issues"
-        ],
-        "System Alarms": [
-            "High Priority Alarms",
-            "Medium Priority Alarms",
-            "Low Priority Alarms"
-        ],
-        "Arrhythmia Detection Issues": [
-            "Arrhythmia Detection Problems"
-        ],
-        "Waveform Problems": [
-            "Freezing or No Movement"
-        ],
-        "Printer Issues": [
-            "Paper Not Feeding",
-            "Printing Blank"
-        ]
-    }
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Alarms", f"{stats['alarms'].sum():,}")
+    col2.metric("Machines", stats["machine"].nunique())
+    col3.metric("Median time to resolution", f"{np.nanmedian(ttr) / 60:.0f} min" if (~np.isnan(ttr)).any() else "-")
+    col4.metric("Resolved", f"{stats['resolved'].sum() / stats['alarms'].sum():.0%}")
     
-    # Create a detailed error information dictionary
-    error_details = {
-        "No Display on Screen": {
-            "indication": "Screen remains black or blank when powered on",
-            "causes": [
-                "Monitor not receiving power",
-                "Faulty AC cable or fuse blown",
-                "Internal fault in the display"
-            ],
-            "impact": "Unable to view patient data or use the monitor",
-            "steps": [
-                "Check that the AC plug is properly connected to a grounded outlet",
-                "Try turning on the monitor using its power button",
-                "If AC power fails, try using the built-in battery (ensure it's charged)",
-                "Check the fuse on the back panel. Replace if necessary",
-                "If none of these work, contact service for internal board or LCD replacement"
-            ]
-        },
-        "Lead Off Message": {
-            "indication": "ECG trace missing with 'Lead Off' message",
-            "causes": [
-                "ECG electrodes are not connected or are loose"
-            ],
-            "impact": "Unable to monitor heart activity",
-            "steps": [
-                "Ensure skin is clean and dry (avoid using alcohol as it leaves a film)",
-                "Reposition the ECG electrodes on correct anatomical locations",
-                "Use high-quality silver/silver chloride electrodes",
-                "Make sure cables are properly snapped into the electrodes"
-            ]
-        },
-        "Thick Baseline / Interference": {
-            "indication": "ECG waveform with significant noise or distortion",
-            "causes": [
-                "Patient movement",
-                "Dry skin",
-                "Electrical interference"
-            ],
-            "impact": "Difficulty accurately reading ECG",
-            "steps": [
-                "Re-prepare the skin and reapply electrodes",
-                "Keep ECG cables away from power cables or ESU",
-                "Verify that the monitor is properly grounded"
-            ]
-        },
-        "Pacemaker Signal Miscount": {
-            "indication": "Incorrect heart rate displayed for patients with pacemakers",
-            "causes": [
-                "Some pacemaker pulses may be miscounted as heartbeats"
-            ],
-            "impact": "Inaccurate heart rate monitoring",
-            "steps": [
-                "Use 5-lead ECG and observe the waveform closely",
-                "Never rely solely on heart rate alarms; always visually confirm ECG",
-                "Adjust pacemaker rejection settings if available"
-            ]
-        },
-        "No Reading": {
-            "indication": "NIBP displays no values or error message",
-            "causes": [
-                "Loose cuff",
-                "Tubing kinked",
-                "Leak in the system"
-            ],
-            "impact": "Unable to measure blood pressure",
-            "steps": [
-                "Re-wrap the cuff snugly on the upper arm",
-                "Ensure the cuff is the correct size for the patient (too small or large affects accuracy)",
-                "Check for leaks by manually inflating and listening for hissing"
-            ]
-        },
-        "Overpressure or Inflation Error": {
-            "indication": "NIBP displays error message or over-pressure alarm",
-            "causes": [
-                "Incorrect patient type selected",
-                "Faulty pressure valve"
-            ],
-            "impact": "Risk of patient discomfort or injury",
-            "steps": [
-                "Switch mode to correct patient type (Adult, Pediatric, Neonate)",
-                "Avoid continuous NIBP mode unless under supervision",
-                "Perform pressure accuracy verification or leak test"
-            ]
-        },
-        "Motion Artifact or Signal Weak": {
-            "indication": "NIBP displays 'Motion Artifact' or 'Signal Weak' message",
-            "causes": [
-                "Patient movement during measurement"
-            ],
-            "impact": "Inaccurate or failed BP readings",
-            "steps": [
-                "Ask patient to stay still and avoid talking",
-                "Do not place cuff on limb with IV lines or wounds",
-                "Monitor the color and temperature of the limb to ensure circulation isn't blocked"
-            ]
-        },
-        "No Reading or Low Readings": {
-            "indication": "SpO₂ values missing or suspiciously low",
-            "causes": [
-                "Loose probe",
-                "Low perfusion",
-                "Ambient light interference"
-            ],
-            "impact": "Inaccurate oxygen monitoring",
-            "steps": [
-                "Ensure probe fits snugly on the finger and the nail is clean and not painted",
-                "Avoid placing on edematous or injured fingers",
-                "Cover the sensor with opaque tape or cloth to block bright light",
-                "Switch fingers if readings are unstable"
-            ]
-        },
-        "Probe Off Alarm": {
-            "indication": "SpO₂ displays 'Probe Off' message",
-            "causes": [
-                "Sensor disconnected",
-                "Sensor damaged"
-            ],
-            "impact": "No SpO₂ monitoring",
-            "steps": [
-                "Disconnect and reconnect the SpO₂ cable",
-                "Replace the sensor if damaged or old"
-            ]
-        },
-        "Sensor Temperature High": {
-            "indication": "SpO₂ alarm for high sensor temperature",
-            "causes": [
-                "Sensor overheating",
-                "Sensor left in same position too long"
-            ],
-            "impact": "Risk of skin burns",
-            "steps": [
-                "Remove the sensor and replace with a new one",
-                "Do not leave the same site monitored for more than 2 hours continuously"
-            ]
-        },
-        "Sensor Over Temperature": {
-            "indication": "CO₂ module displays temperature warning",
-            "causes": [
-                "Overheating CO₂ sensor",
-                "External heat source"
-            ],
-            "impact": "Inaccurate CO₂ readings",
-            "steps": [
-                "Turn off the unit, allow cooling, and restart",
-                "Move away from external heat sources (sunlight, heaters)",
-                "Replace the CO₂ sensor if repeated"
-            ]
-        },
-        "Sensor Faulty or EEPROM Error": {
-            "indication": "CO₂ displays 'Sensor Faulty' or 'EEPROM Error'",
-            "causes": [
-                "Sensor memory error",
-                "Hardware failure"
-            ],
-            "impact": "Unable to monitor CO₂",
-            "steps": [
-                "Restart the monitor",
-                "If error persists, replace the CO₂ module"
-            ]
-        },
-        "Check Sampling Line or Airway Adapter": {
-            "indication": "CO₂ displays 'Check Sampling Line' or 'Check Airway Adapter'",
-            "causes": [
-                "Blocked tubing",
-                "Dirty or damaged adapter"
-            ],
-            "impact": "Inaccurate CO₂ readings",
-            "steps": [
-                "Ensure tubing is not blocked or kinked",
-                "Replace the airway adapter if dirty or damaged",
-                "Never reuse single-use CO₂ adapters"
-            ]
-        },
-        "Zero Required Warning": {
-            "indication": "CO₂ displays 'Zero Required' message",
-            "causes": [
-                "Calibration drift",
-                "New sensor installed"
-            ],
-            "impact": "Inaccurate CO₂ readings",
-            "steps": [
-                "Disconnect the sampling line",
-                "Select 'Zero' in the monitor menu",
-                "Wait until the system completes the process"
-            ]
-        },
-        "Temperature Probe Issues": {
-            "indication": "Erratic or missing temperature readings",
-            "causes": [
-                "Loose probe connection",
-                "Damaged probe",
-                "Incorrect placement"
-            ],
-            "impact": "Inaccurate temperature monitoring",
-            "steps": [
-                "Ensure temperature probes are firmly attached and connected to correct ports",
-                "Avoid attaching to exposed skin; probe should be covered or taped down",
-                "If temperature values are erratic, clean or replace the probe"
-            ]
-        },
-        "High Priority Alarms": {
-            "indication": "Red flashing lights and urgent alarm tone",
-            "causes": [
-                "Cardiac arrest",
-                "Pulse stop",
-                "Apnea",
-                "Dangerous vital sign values"
-            ],
-            "impact": "Indicates life-threatening condition",
-            "steps": [
-                "Attend to patient immediately",
-                "Verify the patient's condition",
-                "Resolve underlying clinical issue",
-                "Only silence alarm when actively addressing the problem"
-            ]
-        },
-        "Medium Priority Alarms": {
-            "indication": "Orange flashing lights and medium urgency tone",
-            "causes": [
-                "Probe off",
-                "Lead off",
-                "Sensor error"
-            ],
-            "impact": "Technical issue affecting monitoring",
-            "steps": [
-                "Check connections and equipment",
-                "Replace or reposition sensors as needed",
-                "Address technical issues promptly"
-            ]
-        },
-        "Low Priority Alarms": {
-            "indication": "Orange solid light (not flashing) and low urgency tone",
-            "causes": [
-                "Arrhythmia detection",
-                "Parameter approaching limit"
-            ],
-            "impact": "Potential developing issue",
-            "steps": [
-                "Monitor the situation",
-                "Check patient condition",
-                "Prepare for intervention if condition worsens"
-            ]
-        },
-        "Arrhythmia Detection Problems": {
-            "indication": "False arrhythmia alarms or missed arrhythmias",
-            "causes": [
-                "Poor signal quality",
-                "Learning function not activated",
-                "ECG leads positioned incorrectly"
-            ],
-            "impact": "Missed cardiac events or false alarms",
-            "steps": [
-                "Start 'Learn' function when new patient is connected",
-                "Make sure ECG waveform is stable before enabling ARR detection",
-                "If wrong arrhythmia is triggered, perform ARR relearning"
-            ]
-        },
-        "Freezing or No Movement": {
-            "indication": "Waveforms not moving on screen",
-            "causes": [
-                "System in Freeze mode",
-                "Printer in active mode"
-            ],
-            "impact": "Not seeing real-time patient data",
-            "steps": [
-                "Press 'Freeze' again to return to live monitoring",
-                "Check if printer is actively printing; printing may pause waveforms"
-            ]
-        },
-        "Paper Not Feeding": {
-            "indication": "Printer not producing paper output",
-            "causes": [
-                "Improper paper loading",
-                "Door not closed",
-                "Paper jam"
-            ],
-            "impact": "Unable to print patient data",
-            "steps": [
-                "Reload paper following the guide (cut end into triangle, insert under roller)",
-                "Ensure printer door is closed tightly",
-                "Clear any paper jams"
-            ]
-        },
-        "Printing Blank": {
-            "indication": "Paper feeds but no printing appears",
-            "causes": [
-                "Paper inserted backwards",
-                "Wrong paper type",
-                "Printhead failure"
-            ],
-            "impact": "No record of patient data",
-            "steps": [
-                "Check paper orientation",
-                "Use only manufacturer-recommended paper",
-                "If persists, service required for printhead"
-            ]
-        }
-    }
+    st.markdown("### Most frequent alarms")
+    top = stats.groupby(["state", "alarm"], sort=False)["alarms"].sum().nlargest(TOP_ALARMS)
+    top.index = [f"{alarm} ({state})" for state, alarm in top.index]
+    st.bar_chart(top, horizontal=True)
+    
+    st.markdown("### Alarm rate (alarms per hour, rolling 24 h)")
+    st.line_chart(rates)
+    
+    st.markdown("### Time to resolution (minutes, all machines)")
+    st.bar_chart(pd.Series(ttr_counts, index=((ttr_edges[:-1] + ttr_edges[1:]) / 2).round(1)))
     
-    return up7000_categories, error_details
+    st.markdown("### Per machine and alarm")
+    st.dataframe(
+        stats,
+        hide_index=True,
+        column_config={
+            "per_day": st.column_config.NumberColumn("per day", format="%.2f"),
+            "mtbf_hours": st.column_config.NumberColumn("MTBF (h)", format="%.1f"),
+            "ttr_median_min": st.column_config.NumberColumn("TTR median (min)", format="%.1f"),
+            "ttr_p90_min": st.column_config.NumberColumn("TTR p90 (min)", format="%.1f"),
+        }
+    )
+
+# Procedure plan for a PMS error category, built once and shared across reruns and sessions
+@st.cache_resource
+def get_pms_plan(selected_category):
+    # Determine which procedures to show based on selected error
+    related_procedures = []
+
+    if selected_category == "Power Supply Errors":
+        related_procedures.append("power_cycle")
+        related_procedures.append("connections_check")
+
+    elif selected_category == "Temperature-Related Errors":
+        related_procedures.append("system_check")
+        related_procedures.append("connections_check")
+
+    elif selected_category == "Current & Load-Related Errors":
+        related_procedures.append("power_cycle")
+        related_procedures.append("system_check")
+
+    elif selected_category == "System Control & Communication Errors":
+        related_procedures.append("power_cycle")
+        related_procedures.append("connections_check")
 
-# Common troubleshooting procedures dictionary
-common_procedures = {
-    "power_cycle": {
-        "title": "Power Cycling Procedure",
-        "steps": [
-            "Ensure the machine is safe to restart",
-            "Power off the machine using the main power switch",
-            "Wait 30 seconds for capacitors to discharge",
-            "Turn the machine back on and observe the boot sequence",
-            "Check if the alarm persists after restart"
-        ]
-    },
-    "system_check": {
-        "title": "System Diagnostic Check",
-        "steps": [
-            "Enter diagnostic mode (if applicable)",
-            "Run system self-test",
-            "Check for error codes or messages",
-            "Verify sensor readings against normal ranges",
-            "Document all abnormal values"
-        ]
-    },
-    "connections_check": {
-        "title": "Connection Verification",
-        "steps": [
-            "Inspect all cable connections",
-            "Check for loose or damaged connectors",
-            "Verify proper seating of all modular components",
-            "Test continuity of suspect cables with multimeter",
-            "Clean connectors if needed"
-        ]
-    },
-    "safety_systems": {
-        "title": "Safety Systems Check",
-        "steps": [
-            "Verify safety systems are functioning",
-            "Test alarm functionality",
-            "Check sensor calibration",
-            "Verify bypass mechanisms work correctly",
-            "Ensure all indicators and displays function properly"
-        ]
-    }
-}
+    elif selected_category == "Network/Remote Monitoring Errors":
+        related_procedures.append("connections_check")
+        related_procedures.append("system_check")
+
+    else:
+        related_procedures.append("system_check")
+        related_procedures.append("safety_systems")
+
+    # Add safety check for all procedures
+    if "safety_systems" not in related_procedures:
+        related_procedures.append("safety_systems")
+    
+    return ProcedurePlan(related_procedures, common_procedures)
 
 def show_pms_troubleshooting():
     st.markdown("""
@@ -709,8 +352,8 @@ def show_pms_troubleshooting():
     </div>
     """, unsafe_allow_html=True)
     
-    # Load PMS data
-    pms_categories, error_codes, error_details = load_pms_data()
+    # PMS catalogue, queried from the knowledge store as needed
+    store = get_knowledge_store()
     
     # Sidebar for navigation
     with st.sidebar:
@@ -740,11 +383,14 @@ def show_pms_troubleshooting():
             st.rerun()
 
     
+    # Symptom / error-code search
+    show_error_search("PMS")
+    
     # Error category selection
     st.markdown("### 1️⃣ Select Error Category")
     selected_category = st.selectbox(
         "Choose the error category:",
-        list(pms_categories.keys()),
+        store.categories("PMS"),
         index=0,
         key="category_select"
     )
@@ -753,13 +399,17 @@ def show_pms_troubleshooting():
     st.markdown("### 2️⃣ Select Specific Error")
     selected_error = st.selectbox(
         "Choose the specific error:",
-        pms_categories[selected_category],
+        store.alarms("PMS", selected_category),
         index=0,
         key="error_select"
     )
     
+    # Record the selected alarm in the event log
+    log_selection("PMS", selected_category, selected_error)
+    
     # Display error details
-    if selected_error in error_details:
+    details = store.details("PMS", selected_category, selected_error)
+    if details is not None:
         st.markdown("### 3️⃣ Error Details")
         
         # Create a glowing box for the error name
@@ -768,94 +418,62 @@ def show_pms_troubleshooting():
             <div class="glow"></div>
             <div class="content">
                 <h3>{selected_error}</h3>
-                <p><strong>Indication:</strong> {error_details[selected_error]['indication']}</p>
+                <p><strong>Indication:</strong> {details.indication}</p>
             </div>
         </div>
         """, unsafe_allow_html=True)
         
         # Display causes in collapsible section
         with st.expander("Possible Causes"):
-            for cause in error_details[selected_error]['causes']:
+            for cause in details.causes:
                 st.markdown(f"- {cause}")
         
         # Display impact
-        st.markdown(f"**Impact:** {error_details[selected_error]['impact']}")
+        st.markdown(f"**Impact:** {details.impact}")
         
         # Display steps
         st.markdown("### 4️⃣ Troubleshooting Steps")
-        for i, step in enumerate(error_details[selected_error]['steps'], 1):
-            # Animate the appearance of each step
-            with st.empty():
-                time.sleep(0.1)  # Small delay for animation effect
-                st.markdown(f"""
-                <div class="step-box animated-step">
-                    <div class="step-number">Step {i}</div>
-                    <div class="step-content">{step}</div>
-                </div>
-                """, unsafe_allow_html=True)
+        # Optionally put the steps that most often fixed this alarm first
+        steps = details.steps
+        if st.toggle("Most likely fix first", key="fix_first", help="Order the steps by how often each one was reported as the fix"):
+            steps = get_resolution_stats().ordered_steps("PMS", selected_category, selected_error, steps)
+        # Steps are revealed one after another by the CSS animation delay
+        render_step_list("PMS", selected_error, steps, STEP_REVEAL_DELAY)
         
         # Interactive troubleshooting
         st.markdown("---")
         show_detailed = st.checkbox("Show interactive troubleshooting guide", value=False)
         
         if show_detailed:
-            # Determine which procedures to show based on selected error
-            related_procedures = []
-            
-            if selected_category == "Power Supply Errors":
-                related_procedures.append("power_cycle")
-                related_procedures.append("connections_check")
-            
-            elif selected_category == "Temperature-Related Errors":
-                related_procedures.append("system_check")
-                related_procedures.append("connections_check")
+            # Procedures and their step offsets are computed once per category
+            plan = get_pms_plan(selected_category)
             
-            elif selected_category == "Current & Load-Related Errors":
-                related_procedures.append("power_cycle")
-                related_procedures.append("system_check")
+            # Progress tracking (one bitset per machine, alarm and plan)
+            progress = checklist_progress()
+            plan_key = ("PMS", selected_error, plan.procedure_keys)
             
-            elif selected_category == "System Control & Communication Errors":
-                related_procedures.append("power_cycle")
-                related_procedures.append("connections_check")
-            
-            elif selected_category == "Network/Remote Monitoring Errors":
-                related_procedures.append("connections_check")
-                related_procedures.append("system_check")
-            
-            else:
-                related_procedures.append("system_check")
-                related_procedures.append("safety_systems")
-            
-            # Add safety check for all procedures
-            if "safety_systems" not in related_procedures:
-                related_procedures.append("safety_systems")
-            
-            # Progress tracking
-            current_step = st.session_state.get("troubleshoot_step", 0)
-            max_steps = sum([len(common_procedures[p]["steps"]) for p in related_procedures])
-            
-            # Progress bar
-            progress_bar = st.progress(current_step / max_steps if max_steps > 0 else 0)
             # Progress bar
-            progress_bar = st.progress(current_step / max_steps if max_steps > 0 else 0)
+            progress_bar = st.progress(plan.progress(progress.completed(plan_key)))
             
             # Display procedures
-            for proc_name in related_procedures:
-                proc = common_procedures[proc_name]
-                st.markdown(f"### {proc['title']}")
+            for section in plan.sections:
+                st.markdown(f"### {section.title}")
                 
-                for i, step in enumerate(proc['steps']):
-                    step_index = sum([len(common_procedures[p]["steps"]) for p in related_procedures[:related_procedures.index(proc_name)]]) + i
+                for i, step in enumerate(section.steps):
+                    step_index = section.offset + i
                     
                     # Create a checkbox for each step
-                    if st.checkbox(f"{step}", value=step_index < current_step, key=f"step_{proc_name}_{i}"):
-                        if step_index >= current_step:
-                            st.session_state.troubleshoot_step = step_index + 1
-                            progress_bar.progress(st.session_state.troubleshoot_step / max_steps if max_steps > 0 else 0)
+                    step_done = progress.is_done(plan_key, step_index)
+                    step_complete = st.checkbox(f"{step}", value=step_done, key=progress.widget_key(plan_key, step_index))
+                    if step_complete != step_done:
+                        progress.mark(plan_key, step_index, step_complete)
+                        log_event("step", "PMS", selected_category, selected_error, step=step_index, text=step, done=step_complete)
+                        progress_bar.progress(plan.progress(progress.completed(plan_key)))
             
             # Reset progress button
             if st.button("Reset Progress"):
-                st.session_state.troubleshoot_step = 0
+                progress.reset(plan_key)
+                log_event("reset", "PMS", selected_category, selected_error)
                 st.rerun()
         
         # Resolution confirmation
@@ -865,11 +483,15 @@ def show_pms_troubleshooting():
         resolution_status = st.radio(
             "Has the issue been resolved?",
             ["Select an option", "Yes, issue resolved", "No, issue persists"],
-            index=0
+            index=0,
+            key="resolution_status",
+            on_change=log_resolution,
+            args=("resolution_status", "PMS", selected_category, selected_error)
         )
         
         if resolution_status == "Yes, issue resolved":
             st.success("Great! The issue has been resolved. Remember to document this incident in your maintenance log.")
+            ask_fixing_step("PMS", selected_category, selected_error, details.steps)
             if st.button("Start New Troubleshooting Session"):
                 reset_state()
                 st.rerun()
@@ -883,337 +505,41 @@ def show_pms_troubleshooting():
             """)
 
 # ===== HEMODIALYSIS MACHINE TROUBLESHOOTING =====
-def load_hemodialysis_data():
-    # Categories of errors for hemodialysis machines
-    hemo_categories = {
-        "Water System Errors": [
-            "Water Pressure Low",
-            "Water Temperature Error",
-            "Conductivity Error"
-        ],
-        "Blood Circuit Errors": [
-            "Air Detector Alarm",
-            "Venous Pressure Alarm",
-            "Arterial Pressure Alarm",
-            "Blood Leak Detector Alarm"
-        ],
-        "Dialysate Circuit Issues": [
-            "Dialysate Flow Error",
-            "Dialysate Temperature Alarm",
-            "Ultrafiltration Error"
-        ],
-        "Pump and Motor Errors": [
-            "Blood Pump Error",
-            "Dialysate Pump Error",
-            "UF Pump Error"
-        ],
-        "Sensor and Detector Issues": [
-            "Level Detector Error",
-            "Bubbles Detected",
-            "Conductivity Sensor Error"
-        ],
-        "System Control Errors": [
-            "Power Failure",
-            "Battery Error",
-            "Software Error"
-        ]
-    }
-    
-    # Detailed error information
-    error_details = {
-        "Water Pressure Low": {
-            "indication": "Audible alarm, 'Water Pressure Low' message on screen",
-            "causes": [
-                "Water supply disruption",
-                "Clogged pre-filters",
-                "Faulty pressure regulator"
-            ],
-            "impact": "Inability to produce dialysate properly",
-            "steps": [
-                "Check water supply to the machine",
-                "Verify pre-filters are clean and not clogged",
-                "Check pressure gauge readings against acceptable range",
-                "Ensure pressure regulator is functioning correctly"
-            ]
-        },
-        "Water Temperature Error": {
-            "indication": "Alarm and error message indicating water temperature out of range",
-            "causes": [
-                "Heater malfunction",
-                "Incoming water temperature too low",
-                "Temperature sensor failure"
-            ],
-            "impact": "Incorrect dialysate temperature may cause patient discomfort or harm",
-            "steps": [
-                "Check temperature sensor readings",
-                "Verify heater operation",
-                "Ensure incoming water temperature meets specifications",
-                "Calibrate temperature sensors if possible"
-            ]
-        },
-        "Conductivity Error": {
-            "indication": "Alarm indicating conductivity out of range",
-            "causes": [
-                "Incorrect concentrate ratio",
-                "Malfunctioning conductivity sensor",
-                "Air in the hydraulic system"
-            ],
-            "impact": "Improper dialysate concentration may cause electrolyte imbalance",
-            "steps": [
-                "Check concentrate containers for proper solutions",
-                "Verify concentrate pump operation",
-                "Calibrate conductivity cells",
-                "Perform rinse cycle to remove air"
-            ]
-        },
-        "Air Detector Alarm": {
-            "indication": "Air detector alarm, machine stops blood pump",
-            "causes": [
-                "Air bubbles in blood line",
-                "Improper tubing placement in detector",
-                "Faulty air detector"
-            ],
-            "impact": "Risk of air embolism if ignored",
-            "steps": [
-                "Check for air bubbles in venous line",
-                "Ensure tubing is properly positioned in air detector",
-                "Verify connections are secure",
-                "Reset alarm only after confirming air is removed"
-            ]
-        },
-        "Venous Pressure Alarm": {
-            "indication": "Alarm indicating abnormal venous pressure (high or low)",
-            "causes": [
-                "Patient's venous access issues",
-                "Kinked blood tubing",
-                "Clotting in the venous chamber",
-                "Incorrect pressure transducer connection"
-            ],
-            "impact": "Improper blood return to patient",
-            "steps": [
-                "Check venous access and cannula position",
-                "Inspect blood tubing for kinks or obstruction",
-                "Verify venous chamber level",
-                "Ensure pressure transducer protector is dry and properly connected"
-            ]
-        },
-        "Arterial Pressure Alarm": {
-            "indication": "Alarm indicating abnormal arterial pressure (usually low)",
-            "causes": [
-                "Access needle position issues",
-                "Occlusion in arterial line",
-                "Blood pump speed too high",
-                "Pressure transducer issue"
-            ],
-            "impact": "Inadequate blood flow to the dialyzer",
-            "steps": [
-                "Check arterial access and needle position",
-                "Inspect arterial line for kinks",
-                "Adjust blood pump speed if necessary",
-                "Verify arterial transducer connection"
-            ]
-        },
-        "Blood Leak Detector Alarm": {
-            "indication": "Blood leak alarm, machine may stop",
-            "causes": [
-                "Actual blood leak in dialyzer",
-                "Air bubbles in dialysate line",
-                "Detector malfunction",
-                "Contamination in optical system"
-            ],
-            "impact": "Blood loss into dialysate",
-            "steps": [
-                "Check dialysate line for visible blood",
-                "Inspect dialyzer for potential rupture",
-                "Verify detector function with test",
-                "Clean optical detector if necessary"
-            ]
-        },
-        "Dialysate Flow Error": {
-            "indication": "Dialysate flow rate error message",
-            "causes": [
-                "Restricted flow path",
-                "Pump malfunction",
-                "Flow meter inaccuracy"
-            ],
-            "impact": "Suboptimal dialysis efficiency",
-            "steps": [
-                "Check for restrictions in dialysate pathway",
-                "Verify pump operation",
-                "Calibrate flow meter",
-                "Ensure proper drain function"
-            ]
-        },
-        "Dialysate Temperature Alarm": {
-            "indication": "Temperature out of range alarm for dialysate",
-            "causes": [
-                "Heater malfunction",
-                "Temperature sensor failure",
-                "Control board issue"
-            ],
-            "impact": "Patient discomfort, potential hemolysis if too high",
-            "steps": [
-                "Allow system to stabilize",
-                "Verify temperature sensor readings",
-                "Check heater function",
-                "Calibrate temperature sensors"
-            ]
-        },
-        "Ultrafiltration Error": {
-            "indication": "UF rate or volume error message",
-            "causes": [
-                "UF pump malfunction",
-                "Flow balancing system issue",
-                "Pressure transducer problem",
-                "Valve leakage"
-            ],
-            "impact": "Incorrect fluid removal from patient",
-            "steps": [
-                "Verify UF settings",
-                "Check UF pump operation",
-                "Test balancing chamber function",
-                "Calibrate pressure transducers"
-            ]
-        },
-        "Blood Pump Error": {
-            "indication": "Blood pump not running or error message",
-            "causes": [
-                "Pump rotor obstruction",
-                "Motor failure",
-                "Control board issue",
-                "Pump segment improperly loaded"
-            ],
-            "impact": "Unable to circulate blood",
-            "steps": [
-                "Check pump segment loading",
-                "Inspect rotor for free movement",
-                "Test pump motor function",
-                "Verify control signals to pump"
-            ]
-        },
-        "Dialysate Pump Error": {
-            "indication": "Dialysate flow issues or pump error message",
-            "causes": [
-                "Pump mechanism failure",
-                "Control issue",
-                "Obstruction in flow path"
-            ],
-            "impact": "Inadequate dialysate flow",
-            "steps": [
-                "Check for restrictions in dialysate pathway",
-                "Verify pump operation",
-                "Test motor and control circuits",
-                "Inspect for leaks or air in system"
-            ]
-        },
-        "UF Pump Error": {
-            "indication": "UF pump error or UF goal not achievable",
-            "causes": [
-                "UF pump malfunction",
-                "Control system issue",
-                "Calibration error"
-            ],
-            "impact": "Inability to achieve ultrafiltration goals",
-            "steps": [
-                "Verify UF pump operation",
-                "Check control signals to pump",
-                "Run pump calibration test",
-                "Inspect for mechanical issues"
-            ]
-        },
-        "Level Detector Error": {
-            "indication": "Level detector alarm or error",
-            "causes": [
-                "Incorrect level in chambers",
-                "Detector malfunction",
-                "Contamination on optical sensors"
-            ],
-            "impact": "Improper fluid management",
-            "steps": [
-                "Check fluid levels in chambers",
-                "Clean optical detectors if applicable",
-                "Verify detector operation with test",
-                "Adjust levels manually if necessary"
-            ]
-        },
-        "Bubbles Detected": {
-            "indication": "Bubble detector alarm",
-            "causes": [
-                "Actual air in blood circuit",
-                "Sensor misalignment",
-                "Ultrasonic coupling issue"
-            ],
-            "impact": "Risk of air embolism",
-            "steps": [
-                "Check for visible air bubbles",
-                "Verify sensor position and coupling",
-                "Check for proper priming of circuit",
-                "Ensure venous chamber level is appropriate"
-            ]
-        },
-        "Conductivity Sensor Error": {
-            "indication": "Conductivity sensor failure message",
-            "causes": [
-                "Sensor malfunction",
-                "Calibration drift",
-                "Contaminants on sensor"
-            ],
-            "impact": "Unable to verify dialysate composition",
-            "steps": [
-                "Clean sensors according to manufacturer guidance",
-                "Calibrate sensors if possible",
-                "Check reference values with external meter",
-                "Verify sensor connections"
-            ]
-        },
-        "Power Failure": {
-            "indication": "Machine shuts down or switches to battery",
-            "causes": [
-                "Power supply interruption",
-                "Internal power supply failure",
-                "Circuit breaker trip"
-            ],
-            "impact": "Interruption of treatment",
-            "steps": [
-                "Check power source and connections",
-                "Verify circuit breakers",
-                "Switch to battery operation if available",
-                "Follow emergency procedures for returning blood"
-            ]
-        },
-        "Battery Error": {
-            "indication": "Battery warning or failure message",
-            "causes": [
-                "Battery charge depleted",
-                "Battery failing to hold charge",
-                "Charging circuit issue"
-            ],
-            "impact": "No backup power during outages",
-            "steps": [
-                "Check battery charge status",
-                "Ensure proper charging",
-                "Test battery under load",
-                "Replace battery if necessary"
-            ]
-        },
-        "Software Error": {
-            "indication": "Software crash, freeze, or error code",
-            "causes": [
-                "Software bug",
-                "Memory corruption",
-                "Processing overload"
-            ],
-            "impact": "Machine malfunction or shutdown",
-            "steps": [
-                "Record error code",
-                "Perform controlled shutdown",
-                "Restart system",
-                "Contact technical support if persistent"
-            ]
-        }
-    }
+# Procedure plan for a hemodialysis error category, built once and shared across reruns and sessions
+@st.cache_resource
+def get_hemodialysis_plan(selected_category):
+    # Determine which procedures to show based on selected error
+    related_procedures = []
+
+    if selected_category == "Water System Errors":
+        related_procedures.append("system_check")
+        related_procedures.append("connections_check")
+
+    elif selected_category == "Blood Circuit Errors":
+        related_procedures.append("safety_systems")
+        related_procedures.append("connections_check")
+
+    elif selected_category == "Dialysate Circuit Issues":
+        related_procedures.append("system_check")
+        related_procedures.append("connections_check")
+
+    elif selected_category == "Pump and Motor Errors":
+        related_procedures.append("power_cycle")
+        related_procedures.append("system_check")
+
+    elif selected_category == "Sensor and Detector Issues":
+        related_procedures.append("connections_check")
+        related_procedures.append("system_check")
+
+    else:
+        related_procedures.append("power_cycle")
+        related_procedures.append("system_check")
+
+    # Add safety check for all procedures
+    if "safety_systems" not in related_procedures:
+        related_procedures.append("safety_systems")
     
-    return hemo_categories, error_details
+    return ProcedurePlan(related_procedures, common_procedures)
 
 def show_hemodialysis_troubleshooting():
     st.markdown("""
@@ -1223,8 +549,8 @@ def show_hemodialysis_troubleshooting():
     </div>
     """, unsafe_allow_html=True)
     
-    # Load hemodialysis data
-    hemo_categories, error_details = load_hemodialysis_data()
+    # Hemodialysis catalogue, queried from the knowledge store as needed
+    store = get_knowledge_store()
     
     # Sidebar for navigation
     with st.sidebar:
@@ -1253,11 +579,14 @@ def show_hemodialysis_troubleshooting():
             reset_state()
             st.rerun()
     
+    # Symptom / error-code search
+    show_error_search("Hemodialysis")
+    
     # Error category selection
     st.markdown("### 1️⃣ Select Error Category")
     selected_category = st.selectbox(
         "Choose the error category:",
-        list(hemo_categories.keys()),
+        store.categories("Hemodialysis"),
         index=0,
         key="category_select"
     )
@@ -1266,13 +595,17 @@ def show_hemodialysis_troubleshooting():
     st.markdown("### 2️⃣ Select Specific Error")
     selected_error = st.selectbox(
         "Choose the specific error:",
-        hemo_categories[selected_category],
+        store.alarms("Hemodialysis", selected_category),
         index=0,
         key="error_select"
     )
     
+    # Record the selected alarm in the event log
+    log_selection("Hemodialysis", selected_category, selected_error)
+    
     # Display error details
-    if selected_error in error_details:
+    details = store.details("Hemodialysis", selected_category, selected_error)
+    if details is not None:
         st.markdown("### 3️⃣ Error Details")
         
         # Create a glowing box for the error name
@@ -1281,20 +614,20 @@ def show_hemodialysis_troubleshooting():
             <div class="glow"></div>
             <div class="content">
                 <h3>{selected_error}</h3>
-                <p><strong>Indication:</strong> {error_details[selected_error]['indication']}</p>
+                <p><strong>Indication:</strong> {details.indication}</p>
             </div>
         </div>
         """, unsafe_allow_html=True)
         
         # Display causes in collapsible section
         with st.expander("Possible Causes"):
-            for cause in error_details[selected_error]['causes']:
+            for cause in details.causes:
                 st.markdown(f"- {cause}")
         
         # Display impact - with warning styling for hemodialysis issues
         st.markdown(f"""
         <div class="warning-box">
-            <strong>⚠️ Clinical Impact:</strong> {error_details[selected_error]['impact']}
+            <strong>⚠️ Clinical Impact:</strong> {details.impact}
         </div>
         """, unsafe_allow_html=True)
         
@@ -1308,77 +641,47 @@ def show_hemodialysis_troubleshooting():
         </div>
         """, unsafe_allow_html=True)
         
-        for i, step in enumerate(error_details[selected_error]['steps'], 1):
-            # Animate the appearance of each step
-            with st.empty():
-                time.sleep(0.1)  # Small delay for animation effect
-                st.markdown(f"""
-                <div class="step-box animated-step red-theme">
-                    <div class="step-number">Step {i}</div>
-                    <div class="step-content">{step}</div>
-                </div>
-                """, unsafe_allow_html=True)
+        # Optionally put the steps that most often fixed this alarm first
+        steps = details.steps
+        if st.toggle("Most likely fix first", key="fix_first", help="Order the steps by how often each one was reported as the fix"):
+            steps = get_resolution_stats().ordered_steps("Hemodialysis", selected_category, selected_error, steps)
+        # Steps are revealed one after another by the CSS animation delay
+        render_step_list("Hemodialysis", selected_error, steps, STEP_REVEAL_DELAY, theme="red-theme")
         
         # Interactive troubleshooting
         st.markdown("---")
         show_detailed = st.checkbox("Show interactive troubleshooting guide", value=False)
         
         if show_detailed:
-            # Determine which procedures to show based on selected error
-            related_procedures = []
-            
-            if selected_category == "Water System Errors":
-                related_procedures.append("system_check")
-                related_procedures.append("connections_check")
-            
-            elif selected_category == "Blood Circuit Errors":
-                related_procedures.append("safety_systems")
-                related_procedures.append("connections_check")
-            
-            elif selected_category == "Dialysate Circuit Issues":
-                related_procedures.append("system_check")
-                related_procedures.append("connections_check")
+            # Procedures and their step offsets are computed once per category
+            plan = get_hemodialysis_plan(selected_category)
             
-            elif selected_category == "Pump and Motor Errors":
-                related_procedures.append("power_cycle")
-                related_procedures.append("system_check")
-            
-            elif selected_category == "Sensor and Detector Issues":
-                related_procedures.append("connections_check")
-                related_procedures.append("system_check")
-            
-            else:
-                related_procedures.append("power_cycle")
-                related_procedures.append("system_check")
-            
-            # Add safety check for all procedures
-            if "safety_systems" not in related_procedures:
-                related_procedures.append("safety_systems")
-            
-            # Progress tracking
-            current_step = st.session_state.get("troubleshoot_step", 0)
-            max_steps = sum([len(common_procedures[p]["steps"]) for p in related_procedures])
+            # Progress tracking (one bitset per machine, alarm and plan)
+            progress = checklist_progress()
+            plan_key = ("Hemodialysis", selected_error, plan.procedure_keys)
             
             # Progress bar
-            progress_bar = st.progress(current_step / max_steps if max_steps > 0 else 0)
+            progress_bar = st.progress(plan.progress(progress.completed(plan_key)))
             
             # Display procedures
-            for proc_name in related_procedures:
-                proc = common_procedures[proc_name]
-                st.markdown(f"### {proc['title']}")
+            for section in plan.sections:
+                st.markdown(f"### {section.title}")
                 
-                for i, step in enumerate(proc['steps']):
-                    step_index = sum([len(common_procedures[p]["steps"]) for p in related_procedures[:related_procedures.index(proc_name)]]) + i
+                for i, step in enumerate(section.steps):
+                    step_index = section.offset + i
                     
                     # Create a checkbox for each step
-                    if st.checkbox(f"{step}", value=step_index < current_step, key=f"step_{proc_name}_{i}"):
-                        if step_index >= current_step:
-                            st.session_state.troubleshoot_step = step_index + 1
-                            progress_bar.progress(st.session_state.troubleshoot_step / max_steps if max_steps > 0 else 0)
+                    step_done = progress.is_done(plan_key, step_index)
+                    step_complete = st.checkbox(f"{step}", value=step_done, key=progress.widget_key(plan_key, step_index))
+                    if step_complete != step_done:
+                        progress.mark(plan_key, step_index, step_complete)
+                        log_event("step", "Hemodialysis", selected_category, selected_error, step=step_index, text=step, done=step_complete)
+                        progress_bar.progress(plan.progress(progress.completed(plan_key)))
             
             # Reset progress button
             if st.button("Reset Progress"):
-                st.session_state.troubleshoot_step = 0
+                progress.reset(plan_key)
+                log_event("reset", "Hemodialysis", selected_category, selected_error)
                 st.rerun()
         
         # Resolution confirmation
@@ -1388,11 +691,15 @@ def show_hemodialysis_troubleshooting():
         resolution_status = st.radio(
             "Has the issue been resolved?",
             ["Select an option", "Yes, issue resolved", "No, issue persists"],
-            index=0
+            index=0,
+            key="resolution_status",
+            on_change=log_resolution,
+            args=("resolution_status", "Hemodialysis", selected_category, selected_error)
         )
         
         if resolution_status == "Yes, issue resolved":
             st.success("Great! The issue has been resolved. Remember to document this incident in your maintenance log.")
+            ask_fixing_step("Hemodialysis", selected_category, selected_error, details.steps)
             
             # Additional clinical safety check
             st.markdown("""
@@ -1422,6 +729,46 @@ def show_hemodialysis_troubleshooting():
             5. In case of patient emergency, follow clinical protocol for returning blood and discontinuing treatment
             """)
 
+# Procedure plan for a UP-7000 error category, built once and shared across reruns and sessions
+@st.cache_resource
+def get_up7000_plan(selected_category):
+    # Determine which procedures to show based on selected error
+    related_procedures = []
+
+    if selected_category == "Display Issues":
+        related_procedures.append("power_cycle")
+        related_procedures.append("connections_check")
+
+    elif selected_category == "ECG Issues":
+        related_procedures.append("connections_check")
+        related_procedures.append("system_check")
+
+    elif selected_category == "NIBP (Blood Pressure) Issues":
+        related_procedures.append("connections_check")
+        related_procedures.append("system_check")
+
+    elif selected_category == "SpO₂ (Oxygen Saturation) Issues":
+        related_procedures.append("connections_check")
+        related_procedures.append("system_check")
+
+    elif selected_category == "CO₂ Monitoring Issues":
+        related_procedures.append("connections_check")
+        related_procedures.append("system_check")
+
+    elif selected_category == "Printer Issues":
+        related_procedures.append("power_cycle")
+        related_procedures.append("connections_check")
+
+    else:
+        related_procedures.append("system_check")
+        related_procedures.append("connections_check")
+
+    # Add safety check for all procedures
+    if "safety_systems" not in related_procedures:
+        related_procedures.append("safety_systems")
+    
+    return ProcedurePlan(related_procedures, common_procedures)
+
 def show_up7000_troubleshooting():
     st.markdown("""
     <div class="header">
@@ -1430,8 +777,8 @@ def show_up7000_troubleshooting():
     </div>
     """, unsafe_allow_html=True)
     
-    # Load UP-7000 data
-    up7000_categories, error_details = load_up7000_data()
+    # UP-7000 catalogue, queried from the knowledge store as needed
+    store = get_knowledge_store()
     
     # Sidebar for navigation
     with st.sidebar:
@@ -1459,12 +806,28 @@ def show_up7000_troubleshooting():
         if st.button("Change Machine"):
             reset_state()
             st.rerun()
+        
+        # Signal problems found in the monitor's waveforms
+        if st.toggle("🫀 Analyse monitor signals", key="signal_check"):
+            waveform_path = st.text_input(
+                "Waveform file (blank for a simulated monitor):",
+                key="waveform_path",
+                placeholder="e.g. waveforms/bed-04.csv"
+            )
+            waveform_file = resolve_log_path(waveform_path, WAVEFORM_DIR) if waveform_path else None
+            if waveform_path and waveform_file is None:
+                st.error(f"Waveforms can only be read from {WAVEFORM_DIR}")
+            else:
+                show_signal_findings(get_waveform_feed(waveform_file))
+    
+    # Symptom / error-code search
+    show_error_search("UP7000")
     
     # Error category selection
     st.markdown("### 1️⃣ Select Error Category")
     selected_category = st.selectbox(
         "Choose the error category:",
-        list(up7000_categories.keys()),
+        store.categories("UP7000"),
         index=0,
         key="category_select"
     )
@@ -1473,13 +836,17 @@ def show_up7000_troubleshooting():
     st.markdown("### 2️⃣ Select Specific Error")
     selected_error = st.selectbox(
         "Choose the specific error:",
-        up7000_categories[selected_category],
+        store.alarms("UP7000", selected_category),
         index=0,
         key="error_select"
     )
     
+    # Record the selected alarm in the event log
+    log_selection("UP7000", selected_category, selected_error)
+    
     # Display error details
-    if selected_error in error_details:
+    details = store.details("UP7000", selected_category, selected_error)
+    if details is not None:
         st.markdown("### 3️⃣ Error Details")
         
         # Create a glowing box for the error name
@@ -1488,100 +855,66 @@ def show_up7000_troubleshooting():
             <div class="glow"></div>
             <div class="content">
                 <h3>{selected_error}</h3>
-                <p><strong>Indication:</strong> {error_details[selected_error]['indication']}</p>
+                <p><strong>Indication:</strong> {details.indication}</p>
             </div>
         </div>
         """, unsafe_allow_html=True)
         
         # Display causes in collapsible section
         with st.expander("Possible Causes"):
-            for cause in error_details[selected_error]['causes']:
+            for cause in details.causes:
                 st.markdown(f"- {cause}")
         
         # Display impact
         st.markdown(f"""
         <div class="info-box">
-            <strong>📈 Clinical Impact:</strong> {error_details[selected_error]['impact']}
+            <strong>📈 Clinical Impact:</strong> {details.impact}
         </div>
         """, unsafe_allow_html=True)
         
         # Display steps
         st.markdown("### 4️⃣ Troubleshooting Steps")
-        for i, step in enumerate(error_details[selected_error]['steps'], 1):
-            # Animate the appearance of each step
-            with st.empty():
-                time.sleep(0.1)  # Small delay for animation effect
-                st.markdown(f"""
-                <div class="step-box animated-step blue-theme">
-                    <div class="step-number">Step {i}</div>
-                    <div class="step-content">{step}</div>
-                </div>
-                """, unsafe_allow_html=True)
+        # Optionally put the steps that most often fixed this alarm first
+        steps = details.steps
+        if st.toggle("Most likely fix first", key="fix_first", help="Order the steps by how often each one was reported as the fix"):
+            steps = get_resolution_stats().ordered_steps("UP7000", selected_category, selected_error, steps)
+        # Steps are revealed one after another by the CSS animation delay
+        render_step_list("UP7000", selected_error, steps, STEP_REVEAL_DELAY, theme="blue-theme")
         
         # Interactive troubleshooting
         st.markdown("---")
         show_detailed = st.checkbox("Show interactive troubleshooting guide", value=False)
         
         if show_detailed:
-            # Determine which procedures to show based on selected error
-            related_procedures = []
-            
-            if selected_category == "Display Issues":
-                related_procedures.append("power_cycle")
-                related_procedures.append("connections_check")
-            
-            elif selected_category == "ECG Issues":
-                related_procedures.append("connections_check")
-                related_procedures.append("system_check")
+            # Procedures and their step offsets are computed once per category
+            plan = get_up7000_plan(selected_category)
             
-            elif selected_category == "NIBP (Blood Pressure) Issues":
-                related_procedures.append("connections_check")
-                related_procedures.append("system_check")
-            
-            elif selected_category == "SpO₂ (Oxygen Saturation) Issues":
-                related_procedures.append("connections_check")
-                related_procedures.append("system_check")
-            
-            elif selected_category == "CO₂ Monitoring Issues":
-                related_procedures.append("connections_check")
-                related_procedures.append("system_check")
-            
-            elif selected_category == "Printer Issues":
-                related_procedures.append("power_cycle")
-                related_procedures.append("connections_check")
-            
-            else:
-                related_procedures.append("system_check")
-                related_procedures.append("connections_check")
-            
-            # Add safety check for all procedures
-            if "safety_systems" not in related_procedures:
-                related_procedures.append("safety_systems")
-            
-            # Progress tracking
-            current_step = st.session_state.get("troubleshoot_step", 0)
-            max_steps = sum([len(common_procedures[p]["steps"]) for p in related_procedures])
+            # Progress tracking (one bitset per machine, alarm and plan)
+            progress = checklist_progress()
+            plan_key = ("UP7000", selected_error, plan.procedure_keys)
             
             # Progress bar
-            progress_bar = st.progress(current_step / max_steps if max_steps > 0 else 0)
+            progress_bar = st.progress(plan.progress(progress.completed(plan_key)))
             
             # Display procedures
-            for proc_name in related_procedures:
-                proc = common_procedures[proc_name]
-                st.markdown(f"### {proc['title']}")
+            for section in plan.sections:
+                st.markdown(f"### {section.title}")
                 
-                for i, step in enumerate(proc['steps']):
-                    step_index = sum([len(common_procedures[p]["steps"]) for p in related_procedures[:related_procedures.index(proc_name)]]) + i
+                for i, step in enumerate(section.steps):
+                    step_index = section.offset + i
                     
                     # Create a checkbox for each step
-                    if st.checkbox(f"{step}", value=step_index < current_step, key=f"step_{proc_name}_{i}"):
-                        if step_index >= current_step:
-                            st.session_state.troubleshoot_step = step_index + 1
-                            progress_bar.progress(st.session_state.troubleshoot_step / max_steps if max_steps > 0 else 0)
+                    step_done = progress.is_done(plan_key, step_index)
+                    step_complete = st.checkbox(f"{step}", value=step_done, key=progress.widget_key(plan_key, step_index))
+                    if step_complete != step_done:
+                        progress.mark(plan_key, step_index, step_complete)
+                        log_event("step", "UP7000", selected_category, selected_error, step=step_index, text=step, done=step_complete)
+                        progress_bar.progress(plan.progress(progress.completed(plan_key)))
             
             # Reset progress button
             if st.button("Reset Progress"):
-                st.session_state.troubleshoot_step = 0
+                progress.reset(plan_key)
+                log_event("reset", "UP7000", selected_category, selected_error)
                 st.rerun()
         
         # Resolution confirmation
@@ -1591,11 +924,15 @@ def show_up7000_troubleshooting():
         resolution_status = st.radio(
             "Has the issue been resolved?",
             ["Select an option", "Yes, issue resolved", "No, issue persists"],
-            index=0
+            index=0,
+            key="resolution_status",
+            on_change=log_resolution,
+            args=("resolution_status", "UP7000", selected_category, selected_error)
         )
         
         if resolution_status == "Yes, issue resolved":
             st.success("Great! The issue has been resolved. Remember to document this incident in your maintenance log.")
+            ask_fixing_step("UP7000", selected_category, selected_error, details.steps)
             
             # Additional clinical safety check
             st.markdown("""
@@ -1628,166 +965,10 @@ def show_up7000_troubleshooting():
 # Main app logic
 # Main app logic
 def main():
-    # Apply custom CSS if available
-    st.markdown("""
-    <style>
-    .main-header {
-        text-align: center;
-        padding: 20px;
-        margin-bottom: 20px;
-    }
-    .subheader {
-        font-size: 1.2em;
-        color: #555;
-    }
-    .machine-selection {
-        margin-top: 30px;
-    }
-    .machine-card {
-        border: 1px solid #ddd;
-        border-radius: 10px;
-        padding: 15px;
-        margin-bottom: 20px;
-        transition: all 0.3s;
-        background-color: #f9f9f9;
-    }
-    .machine-card:hover {
-        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
-        transform: translateY(-5px);
-    }
-    .machine-card img {
-        width: 100%;
-        border-radius: 8px;
-        margin-bottom: 10px;
-    }
-    .footer {
-        text-align: center;
-        padding: 20px;
-        color: #666;
-        font-size: 0.8em;
-        margin-top: 50px;
-    }
-    .glowing-box {
-        position: relative;
-        padding: 20px;
-        border-radius: 10px;
-        border: 1px solid #4CAF50;
-        margin-bottom: 20px;
-        background-color: rgba(76, 175, 80, 0.05);
-        overflow: hidden;
-    }
-    .red-glow {
-        border: 1px solid #e74c3c;
-        background-color: rgba(231, 76, 60, 0.05);
-    }
-    .blue-glow {
-        border: 1px solid #3498db;
-        background-color: rgba(52, 152, 219, 0.05);
-    }
-    .glow {
-        position: absolute;
-        top: 0;
-        left: 0;
-        width: 100%;
-        height: 5px;
-        background: linear-gradient(90deg, #4CAF50, #8BC34A);
-        animation: glow 1.5s infinite alternate;
-    }
-    .red-glow .glow {
-        background: linear-gradient(90deg, #e74c3c, #ff9b95);
-    }
-    .blue-glow .glow {
-        background: linear-gradient(90deg, #3498db, #85c1e9);
-    }
-    @keyframes glow {
-        from {
-            opacity: 0.8;
-        }
-        to {
-            opacity: 0.3;
-        }
-    }
-    .step-box {
-        display: flex;
-        margin-bottom: 15px;
-        border-radius: 8px;
-        overflow: hidden;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-    }
-    .step-number {
-        background-color: #4CAF50;
-        color: white;
-        padding: 10px 15px;
-        font-weight: bold;
-        display: flex;
-        align-items: center;
-        min-width: 80px;
-        justify-content: center;
-    }
-    .red-theme .step-number {
-        background-color: #e74c3c;
-    }
-    .blue-theme .step-number {
-        background-color: #3498db;
-    }
-    .step-content {
-        padding: 10px 15px;
-        background-color: #f9f9f9;
-        flex-grow: 1;
-    }
-    .animated-step {
-        animation: fadeIn 0.5s;
-    }
-    @keyframes fadeIn {
-        from {
-            opacity: 0;
-            transform: translateY(10px);
-        }
-        to {
-            opacity: 1;
-            transform: translateY(0);
-        }
-    }
-    .warning-box {
-        background-color: #fff3cd;
-        border-left: 5px solid #ffc107;
-        padding: 15px;
-        margin-bottom: 20px;
-        border-radius: 5px;
-    }
-    .info-box {
-        background-color: #d1ecf1;
-        border-left: 5px solid #17a2b8;
-        padding: 15px;
-        margin-bottom: 20px;
-        border-radius: 5px;
-    }
-    .critical-reminder {
-        background-color: #f8d7da;
-        border: 2px dashed #dc3545;
-        padding: 15px;
-        margin-bottom: 20px;
-        border-radius: 5px;
-        font-weight: bold;
-    }
-    .clinical-safety-check {
-        background-color: #e9ecef;
-        border: 2px solid #495057;
-        padding: 15px;
-        margin: 20px 0;
-        border-radius: 5px;
-    }
-    .blue-border {
-        border-color: #3498db;
-    }
-    .sidebar-section {
-        background-color: #f8f9fa;
-        padding: 15px;
-        border-radius: 5px;
-        margin-bottom: 20px;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    # Live alarms from the machines connected to the fleet gateway
+    if FLEET_GATEWAY:
+        with st.sidebar:
+            show_fleet_alarms(FLEET_GATEWAY)
     
     # Check which machine is selected and display appropriate page
     if st.session_state.machine_selected is None:
@@ -1798,6 +979,8 @@ def main():
         show_hemodialysis_troubleshooting()
     elif st.session_state.machine_selected == "UP7000":
         show_up7000_troubleshooting()
+    elif st.session_state.machine_selected == "Analytics":
+        show_alarm_analytics()
 
 if __name__ == "__main__":
     main()
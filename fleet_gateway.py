@@ -0,0 +1,370 @@
+import argparse
+import asyncio
+import random
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from datetime import datetime
+
+from fuzzy_match import build_fuzzy_matcher, normalize
+from machine_log import ALARM, MAX_LINE, parse_record
+from pms_health import PmsAlert, PmsHealthScorer, format_telemetry, parse_telemetry, simulated_unit
+
+# Gateway between a fleet of machines and the troubleshooting sessions.
+#
+# Devices (PMS units, hemodialysis machines, UP-7000 monitors) connect over
+# TCP, serial links through a serial-to-TCP adapter, and send the same line
+# records as machine_log.py, starting with the machine type:
+#
+#   2025-03-01T10:15:02.123 UP-03 HELLO UP7000
+#   2025-03-01T10:15:09.551 UP-03 ALARM Lead Off Message
+#
+# One asyncio loop serves every connection. ALARM records are matched to
+# the machine's catalogue (category, error) and fanned out to subscriptions,
+# as are the predictive alerts of PMS units, scored from their TELEMETRY
+# records (pms_health.py):
+#
+#   subscribe()  for sessions: a bounded buffer read from any thread; a
+#                slow session loses its oldest events, never holds others up
+#   events()     for in-loop consumers that must see every event; when one
+#                falls behind, the dispatcher waits for it
+#
+# The dispatcher reads from a bounded queue, so when it falls behind the
+# device reads pause and TCP flow control slows the devices down.
+#
+#   python fleet_gateway.py serve --port 7700
+#   python fleet_gateway.py simulate --port 7700 --devices 20 --rate 5
+
+HOST = "127.0.0.1"
+PORT = 7700
+HELLO = "HELLO"
+TELEMETRY = "TELEMETRY"
+MACHINE_TYPES = ("PMS", "Hemodialysis", "UP7000")
+DEFAULT_MACHINE = "Hemodialysis"
+# Alarm records waiting for the dispatcher; device reads pause when full
+QUEUE_SIZE = 1024
+# Events buffered per session subscription
+SUBSCRIPTION_BUFFER = 100
+MATCH_CACHE = 4096
+# Fuzzy matches scoring lower than this are ignored
+MIN_SCORE = 0.75
+
+# seq numbers the gateway's events from 1 and identifies them (events can
+# be equal); machine is the machine type; category/error the catalogue
+# keys; text the alarm as sent
+FleetEvent = namedtuple("FleetEvent", ["seq", "timestamp", "device", "machine", "category", "error", "text"])
+
+
+# Maps alarms sent by a machine type to its catalogue's (category, error):
+# error names and PMS error codes exactly, anything else through the fuzzy
+# matcher. Used on the gateway's loop only.
+class CatalogueMatcher:
+    def __init__(self, fuzzy_matcher, min_score=MIN_SCORE):
+        self.fuzzy_matcher = fuzzy_matcher
+        self.min_score = min_score
+        self._exact = {}
+        for entry in fuzzy_matcher.entries:
+            if entry.kind in ("name", "code"):
+                self._exact.setdefault((entry.source, normalize(entry.text)), (entry.group, entry.name))
+        # (machine, text) -> key or None, most recently used last
+        self._memo = OrderedDict()
+
+    def match(self, machine, text):
+        memo_key = (machine, text)
+        if memo_key in self._memo:
+            self._memo.move_to_end(memo_key)
+            return self._memo[memo_key]
+        key = self._exact.get((machine, normalize(text)))
+        if key is None:
+            hits = self.fuzzy_matcher.match(text, limit=1, sources=[machine])
+            if hits and hits[0].score >= self.min_score:
+                key = (hits[0].group, hits[0].name)
+        self._memo[memo_key] = key
+        if len(self._memo) > MATCH_CACHE:
+            self._memo.popitem(last=False)
+        return key
+
+
+# Events of some machine types and/or devices (all if None)
+class Subscription:
+    def __init__(self, gateway, machines=None, devices=None, buffer=SUBSCRIPTION_BUFFER):
+        self._gateway = gateway
+        self.machines = frozenset(machines) if machines is not None else None
+        self.devices = frozenset(devices) if devices is not None else None
+        self._events = deque(maxlen=buffer)
+        self.dropped = 0
+
+    def accepts(self, event):
+        return ((self.machines is None or event.machine in self.machines)
+                and (self.devices is None or event.device in self.devices))
+
+    def offer(self, event):
+        if len(self._events) == self._events.maxlen:
+            self.dropped += 1
+        self._events.append(event)
+
+    # Events since the last call, oldest first; safe from any thread
+    def drain(self):
+        events = []
+        while True:
+            try:
+                events.append(self._events.popleft())
+            except IndexError:
+                return events
+
+    def close(self):
+        self._gateway.unsubscribe(self)
+
+
+class _Stream(Subscription):
+    def __init__(self, gateway, machines, devices, maxsize):
+        super().__init__(gateway, machines, devices, buffer=0)
+        self.queue = asyncio.Queue(maxsize)
+
+
+class FleetGateway:
+    def __init__(self, matcher, host=HOST, port=PORT, queue_size=QUEUE_SIZE, health=None):
+        self.matcher = matcher
+        # PmsHealthScorer of the PMS units' telemetry, if scored
+        self.health = health
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        # device id -> machine type, for the connected devices
+        self.devices = {}
+        self.received = 0
+        self.dispatched = 0
+        self.unmatched = 0
+        self.loop = None
+        # Replaced, never mutated, so the dispatcher can iterate them while
+        # sessions subscribe from other threads
+        self._subscriptions = ()
+        self._streams = ()
+        self._lock = threading.Lock()
+        self._queue = None
+        self._server = None
+        self._dispatcher = None
+        self._writers = set()
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.queue_size)
+        self._server = await asyncio.start_server(self._serve_device, self.host, self.port, limit=MAX_LINE)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        return self
+
+    async def close(self):
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
+        self._dispatcher.cancel()
+
+    # Function to subscribe a session; safe from any thread
+    def subscribe(self, machines=None, devices=None, buffer=SUBSCRIPTION_BUFFER):
+        subscription = Subscription(self, machines, devices, buffer)
+        with self._lock:
+            self._subscriptions += (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not subscription)
+            self._streams = tuple(s for s in self._streams if s is not subscription)
+
+    # Every matching event, in order, for consumers on the gateway's loop
+    async def events(self, machines=None, devices=None):
+        stream = _Stream(self, machines, devices, self.queue_size)
+        with self._lock:
+            self._streams += (stream,)
+        try:
+            while True:
+                yield await stream.queue.get()
+        finally:
+            self.unsubscribe(stream)
+
+    async def _serve_device(self, reader, writer):
+        self._writers.add(writer)
+        device = None
+        machine = DEFAULT_MACHINE
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Over MAX_LINE: dropped by the reader
+                    continue
+                if not line:
+                    break
+                record = parse_record(line.decode("utf-8", "replace"))
+                if record is None:
+                    continue
+                self.received += 1
+                if record.kind == ALARM:
+                    # Waits while the dispatcher is behind
+                    await self._queue.put((machine, record))
+                elif record.kind == TELEMETRY and machine == "PMS" and self.health is not None:
+                    for alert in self._score(record):
+                        await self._queue.put((machine, alert))
+                elif record.kind == HELLO:
+                    device = record.machine
+                    if record.text in MACHINE_TYPES:
+                        machine = record.text
+                    self.devices[device] = machine
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.discard(writer)
+            if device is not None:
+                self.devices.pop(device, None)
+            writer.close()
+
+    # Predictive alerts raised by a PMS unit's telemetry record
+    def _score(self, record):
+        try:
+            t = datetime.fromisoformat(record.timestamp).timestamp()
+        except ValueError:
+            return []
+        return self.health.update(record.machine, t, parse_telemetry(record.text), record.timestamp)
+
+    async def _dispatch(self):
+        while True:
+            item = await self._queue.get()
+            # Handle a burst without going back to the loop for each record
+            while item is not None:
+                await self._publish(*item)
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    item = None
+
+    async def _publish(self, machine, record):
+        if isinstance(record, PmsAlert):
+            key = (record.category, record.error)
+        else:
+            key = self.matcher.match(machine, record.text)
+        if key is None:
+            self.unmatched += 1
+            return
+        self.dispatched += 1
+        event = FleetEvent(self.dispatched, record.timestamp, record.machine, machine, key[0], key[1], record.text)
+        for subscription in self._subscriptions:
+            if subscription.accepts(event):
+                subscription.offer(event)
+        for stream in self._streams:
+            if stream.accepts(event):
+                await stream.queue.put(event)
+
+
+# Function to run a gateway on its own event loop in a daemon thread;
+# returns once it accepts connections
+def start_gateway_thread(gateway):
+    started = threading.Event()
+    failure = []
+
+    def run():
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(gateway.start())
+        except Exception as e:
+            failure.append(e)
+            started.set()
+            return
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name="fleet-gateway", daemon=True).start()
+    started.wait()
+    if failure:
+        raise failure[0]
+    return gateway
+
+
+# Gateway matching against the machine catalogues and scoring PMS telemetry
+def build_gateway(host=HOST, port=PORT, fuzzy_matcher=None):
+    return FleetGateway(CatalogueMatcher(fuzzy_matcher or build_fuzzy_matcher()), host, port,
+                        health=PmsHealthScorer())
+
+
+# ===== DEVICE STAND-IN =====
+def _timestamp():
+    now = time.time()
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now)) + f".{int(now % 1 * 1000):03d}"
+
+
+# Lines of a simulated device: its HELLO, then alarms of its catalogue
+# (one in five) between routine INFO records, TELEMETRY records for PMS units
+def simulated_lines(device, machine, errors, seed=None):
+    rng = random.Random(seed)
+    unit = simulated_unit(seed) if machine == "PMS" else None
+    yield f"{_timestamp()} {device} {HELLO} {machine}"
+    while True:
+        if rng.random() < 0.2:
+            yield f"{_timestamp()} {device} {ALARM} {rng.choice(errors)}"
+        elif unit is not None:
+            yield f"{_timestamp()} {device} {TELEMETRY} {format_telemetry(next(unit))}"
+        else:
+            yield f"{_timestamp()} {device} INFO uptime {rng.randint(1, 10**6)} s"
+
+
+# Error names of each machine type's catalogue
+def catalogue_errors(fuzzy_matcher):
+    errors = {machine: [] for machine in MACHINE_TYPES}
+    for entry in fuzzy_matcher.entries:
+        if entry.kind == "name" and entry.source in errors:
+            errors[entry.source].append(entry.name)
+    return errors
+
+
+# One device connection sending rate lines per second (as fast as the
+# gateway accepts them if rate is None); stops after count records
+# following its HELLO if count is given
+async def simulate_device(host, port, device, machine, errors, rate=None, count=None, seed=None):
+    _, writer = await asyncio.open_connection(host, port)
+    try:
+        for n, line in enumerate(simulated_lines(device, machine, errors, seed), 1):
+            writer.write(line.encode("utf-8") + b"\n")
+            # Honours the gateway's backpressure
+            await writer.drain()
+            if count is not None and n > count:
+                break
+            if rate is not None:
+                await asyncio.sleep(1 / rate)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def simulate_fleet(host, port, devices, rate):
+    errors = catalogue_errors(build_fuzzy_matcher())
+    prefixes = {"PMS": "PMS", "Hemodialysis": "HD", "UP7000": "UP"}
+    await asyncio.gather(*(
+        simulate_device(host, port, f"{prefixes[machine]}-{i:02d}", machine, errors[machine], rate, seed=i)
+        for machine in MACHINE_TYPES
+        for i in range(1, devices + 1)
+    ))
+
+
+async def serve(host, port):
+    gateway = await build_gateway(host, port).start()
+    print(f"Listening on {gateway.host}:{gateway.port}")
+    async for event in gateway.events():
+        print(f"{event.timestamp} {event.device}: {event.machine} / {event.category} / {event.error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fleet telemetry gateway and device simulator")
+    parser.add_argument("command", choices=["serve", "simulate"])
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--devices", type=int, default=10, help="simulated devices per machine type")
+    parser.add_argument("--rate", type=float, default=5.0, help="lines per second per simulated device")
+    args = parser.parse_args()
+    try:
+        if args.command == "serve":
+            asyncio.run(serve(args.host, args.port))
+        else:
+            asyncio.run(simulate_fleet(args.host, args.port, args.devices, args.rate))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,238 @@
+import heapq
+import re
+from collections import namedtuple
+
+from catalogues import (
+    HEMO_CATEGORIES,
+    HEMO_ERROR_DETAILS,
+    PMS_CATEGORIES,
+    PMS_ERROR_CODE_ERRORS,
+    PMS_ERROR_CODES,
+    PMS_ERROR_DETAILS,
+    UP7000_CATEGORIES,
+    UP7000_ERROR_DETAILS,
+)
+
+# Typo-tolerant matching of what a technician reads off the machine screen
+# ("E05", "comm err", "venus presure") against alarm names, error codes and
+# indications.
+#
+# A trigram index (bigrams for very short input) narrows the catalogue down
+# to the few candidates sharing the most n-grams with the query; only those
+# are scored with an edit distance (bit-parallel, Myers/Hyyrö) against the
+# best-matching part of their text, so partial input is not penalised for
+# the characters not yet typed.
+
+# Candidates taken from the n-gram index and scored by edit distance
+MAX_CANDIDATES = 16
+DEFAULT_LIMIT = 5
+# Queries shorter than this are not matched
+MIN_QUERY = 2
+# Queries shorter than this are looked up by bigrams ("e5" for "E05")
+SHORT_QUERY = 4
+
+_SPACES = re.compile(r"\s+")
+_WORDS = re.compile(r"\w+")
+# Leading zeros of a number, dropped when comparing words ("e5" is "E05")
+_LEADING_ZEROS = re.compile(r"(?<![0-9])0+(?=[0-9])")
+
+# kind:   "name", "code" or "indication" - which text of the entry matched
+# source/group/name identify the entry as in kb_search.SearchHit
+FuzzyEntry = namedtuple("FuzzyEntry", ["text", "kind", "source", "group", "name"])
+FuzzyCandidate = namedtuple(
+    "FuzzyCandidate", ["distance", "score", "text", "kind", "source", "group", "name"]
+)
+
+
+def normalize(text):
+    return _SPACES.sub(" ", str(text).lower()).strip()
+
+
+# n-grams of a text, padded so word starts/ends form their own n-grams.
+# Queries are padded at the start only: the last word may still be partial.
+def ngrams(text, n=3, pad_end=True):
+    padded = " " + text + (" " if pad_end else "")
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+# Bit masks of the positions of every character of a pattern
+def pattern_masks(pattern):
+    peq = {}
+    for i, ch in enumerate(pattern):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+    return peq
+
+
+# Smallest edit distance between pattern and any substring of text
+# (approximate substring matching, bit-parallel over the pattern)
+def partial_distance(pattern, text, peq=None):
+    m = len(pattern)
+    if m == 0:
+        return 0
+    if peq is None:
+        peq = pattern_masks(pattern)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv = mask
+    mv = 0
+    score = m
+    best = m
+    for ch in text:
+        eq = peq.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        # A match may start anywhere in the text, so no carry into bit 0
+        ph = (ph << 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+        if score < best:
+            best = score
+            if best == 0:
+                break
+    return best
+
+
+# Edit distance of a query against a text: the whole query as one substring,
+# or each of its words matched on its own ("screen blank" against "screen
+# remains black or blank"), whichever needs fewer edits.
+# patterns holds (text, masks) for the query followed by each of its words.
+def query_distance(patterns, text):
+    query, masks = patterns[0]
+    distance = partial_distance(query, text, masks)
+    if len(patterns) > 2 and distance > 0:
+        words = sum(partial_distance(word, text, word_masks) for word, word_masks in patterns[1:])
+        distance = min(distance, words)
+    return distance
+
+
+# Text and words of a normalised text as compared by affinity(): numbers
+# without leading zeros
+def affinity_key(text):
+    text = _LEADING_ZEROS.sub("", text)
+    return text, tuple(_WORDS.findall(text))
+
+
+# Tie-break between candidates at the same edit distance: 2 if the query is
+# the whole text or one of its words, 1 if the text or one of its words
+# starts with it, else 0. query and key as from affinity_key().
+def affinity(query, key):
+    text, words = key
+    if query not in text:
+        return 0
+    if text == query or query in words:
+        return 2
+    if text.startswith(query) or any(word.startswith(query) for word in words):
+        return 1
+    return 0
+
+
+# Entries for every error of a machine catalogue (see catalogues.py)
+def catalogue_entries(source, categories, error_details, error_codes=None, code_errors=None):
+    category_of = {error: category for category, errors in categories.items() for error in errors}
+    for error, category in category_of.items():
+        yield FuzzyEntry(error, "name", source, category, error)
+        indication = error_details.get(error, {}).get("indication")
+        if indication:
+            yield FuzzyEntry(indication, "indication", source, category, error)
+    for code, error in (code_errors or {}).items():
+        if error in category_of:
+            yield FuzzyEntry(code, "code", source, category_of[error], error)
+            description = (error_codes or {}).get(code)
+            if description:
+                yield FuzzyEntry(description, "code", source, category_of[error], error)
+
+
+# Entries for every alarm of an AlarmIndex
+def workbook_entries(alarm_index, source="workbook"):
+    for state in alarm_index.states():
+        for alarm in alarm_index.alarms(state):
+            yield FuzzyEntry(str(alarm), "name", source, state, alarm)
+
+
+def catalogue_corpus():
+    yield from catalogue_entries(
+        "PMS", PMS_CATEGORIES, PMS_ERROR_DETAILS, PMS_ERROR_CODES, PMS_ERROR_CODE_ERRORS
+    )
+    yield from catalogue_entries("Hemodialysis", HEMO_CATEGORIES, HEMO_ERROR_DETAILS)
+    yield from catalogue_entries("UP7000", UP7000_CATEGORIES, UP7000_ERROR_DETAILS)
+
+
+class FuzzyMatcher:
+    def __init__(self, entries):
+        self.entries = tuple(entries)
+        self._texts = tuple(normalize(entry.text) for entry in self.entries)
+        self._keys = tuple(affinity_key(text) for text in self._texts)
+        self._trigrams = self._build_index(3)
+        self._bigrams = self._build_index(2)
+
+    def _build_index(self, n):
+        index = {}
+        for entry_id, text in enumerate(self._texts):
+            for gram in ngrams(text, n):
+                index.setdefault(gram, []).append(entry_id)
+        return {gram: tuple(ids) for gram, ids in index.items()}
+
+    def __len__(self):
+        return len(self.entries)
+
+    # Best candidates for a (possibly misspelt or partial) query, fewest
+    # edits first, then exact words and prefixes of the query (see
+    # affinity), then the most shared n-grams. score is 1.0 for an exact (sub)match and falls towards 0
+    # as the edits approach the query length. One candidate per entry.
+    def match(self, query, limit=DEFAULT_LIMIT, sources=None, max_distance=None):
+        query = normalize(query)
+        if len(query) < MIN_QUERY:
+            return []
+        if max_distance is None:
+            max_distance = max(1, len(query) // 3)
+
+        if len(query) < SHORT_QUERY:
+            index, n = self._bigrams, 2
+        else:
+            index, n = self._trigrams, 3
+        shared = {}
+        for gram in ngrams(query, n, pad_end=False):
+            for entry_id in index.get(gram, ()):
+                shared[entry_id] = shared.get(entry_id, 0) + 1
+        if sources is not None:
+            shared = {i: n for i, n in shared.items() if self.entries[i].source in sources}
+        candidates = heapq.nlargest(MAX_CANDIDATES, shared.items(), key=lambda item: item[1])
+        # Entries sharing under half the n-grams of the closest one are
+        # rarely within max_distance; skip scoring them
+        min_shared = (candidates[0][1] + 1) // 2 if candidates else 0
+
+        patterns = [(text, pattern_masks(text)) for text in [query] + query.split(" ")]
+        query_key = affinity_key(query)[0]
+        best = {}
+        for entry_id, n_shared in candidates:
+            if n_shared < min_shared:
+                break
+            distance = query_distance(patterns, self._texts[entry_id])
+            if distance > max_distance:
+                continue
+            entry = self.entries[entry_id]
+            target = (entry.source, entry.group, entry.name)
+            rank = (distance, -affinity(query_key, self._keys[entry_id]), -n_shared, len(self._texts[entry_id]))
+            if target not in best or rank < best[target][0]:
+                best[target] = (rank, entry, distance)
+
+        ranked = sorted(best.values(), key=lambda item: item[0])[:limit]
+        return [
+            FuzzyCandidate(distance, 1 - distance / len(query), *entry)
+            for _, entry, distance in ranked
+        ]
+
+
+# Matcher over the catalogues, plus the workbook when its AlarmIndex is given
+def build_fuzzy_matcher(alarm_index=None):
+    entries = list(catalogue_corpus())
+    if alarm_index is not None:
+        entries.extend(workbook_entries(alarm_index))
+    return FuzzyMatcher(entries)
@@ -0,0 +1,146 @@
+import argparse
+import os
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from alarm_index import AlarmIndex
+from catalogues import (
+    HEMO_CATEGORIES,
+    HEMO_ERROR_DETAILS,
+    PMS_CATEGORIES,
+    PMS_ERROR_DETAILS,
+    UP7000_CATEGORIES,
+    UP7000_ERROR_DETAILS,
+)
+from kb_store import WORKBOOK_MACHINE
+from knowledge_base import load_knowledge_base
+
+# Columnar export of the troubleshooting knowledge base for analytics.
+#
+# One row per step: (machine, state, alarm, step_no, text). Workbook sheets
+# are read through the same loader as the app (header names stripped,
+# all-empty rows dropped, the "Issues" section folded in by AlarmIndex)
+# and exported under machine "workbook", as in the knowledge store and
+# search; the machine catalogues are added with their category as the state.
+#
+# Two formats, picked by file suffix:
+#   .arrow / .feather  Arrow IPC file, uncompressed, so open_export() can
+#                      memory-map it and hand out zero-copy columns
+#   .parquet           compressed and smaller on disk; decoded on read
+#
+#   python kb_export.py MachineDataAnalytics.xlsx -o knowledge_base.arrow
+
+ARROW_SUFFIXES = (".arrow", ".feather")
+PARQUET_SUFFIXES = (".parquet",)
+DEFAULT_OUTPUT = "knowledge_base.arrow"
+
+# machine/state/alarm repeat on every step, so they are dictionary-encoded
+SCHEMA = pa.schema([
+    pa.field("machine", pa.dictionary(pa.int32(), pa.string()), nullable=False),
+    pa.field("state", pa.dictionary(pa.int32(), pa.string()), nullable=False),
+    pa.field("alarm", pa.dictionary(pa.int32(), pa.string()), nullable=False),
+    pa.field("step_no", pa.int16(), nullable=False),
+    pa.field("text", pa.string(), nullable=False),
+])
+
+
+# (machine, state, alarm, step_no, text) for every step of an AlarmIndex
+def workbook_rows(alarm_index, machine=WORKBOOK_MACHINE):
+    for state in alarm_index.states():
+        for alarm in alarm_index.alarms(state):
+            for step_no, text in enumerate(alarm_index.steps(state, alarm), 1):
+                yield machine, str(state), str(alarm), step_no, str(text)
+
+
+# Rows for a machine catalogue (see catalogues.py), by category and error
+def catalogue_rows(machine, categories, error_details):
+    for category, errors in categories.items():
+        for error in errors:
+            for step_no, text in enumerate(error_details.get(error, {}).get("steps", ()), 1):
+                yield machine, category, error, step_no, text
+
+
+def catalogue_corpus():
+    yield from catalogue_rows("PMS", PMS_CATEGORIES, PMS_ERROR_DETAILS)
+    yield from catalogue_rows("Hemodialysis", HEMO_CATEGORIES, HEMO_ERROR_DETAILS)
+    yield from catalogue_rows("UP7000", UP7000_CATEGORIES, UP7000_ERROR_DETAILS)
+
+
+def rows_to_table(rows):
+    columns = list(zip(*rows)) or [()] * len(SCHEMA)
+    arrays = [
+        pa.array(values, type=field.type.value_type).dictionary_encode()
+        if pa.types.is_dictionary(field.type) else pa.array(values, type=field.type)
+        for field, values in zip(SCHEMA, columns)
+    ]
+    return pa.Table.from_arrays(arrays, schema=SCHEMA)
+
+
+# Knowledge base table: the workbook, plus the catalogues unless disabled
+def build_table(workbook_path=None, catalogues=True):
+    rows = []
+    if workbook_path is not None:
+        data_dict, _ = load_knowledge_base(workbook_path)
+        rows.extend(workbook_rows(AlarmIndex(data_dict)))
+    if catalogues:
+        rows.extend(catalogue_corpus())
+    return rows_to_table(rows)
+
+
+def _format_of(path):
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in ARROW_SUFFIXES:
+        return "arrow"
+    if suffix in PARQUET_SUFFIXES:
+        return "parquet"
+    raise ValueError(f"Unknown export format for {path} (use .arrow, .feather or .parquet)")
+
+
+# Write atomically so readers that memory-map the file never see it half-written
+def write_export(table, path):
+    fmt = _format_of(path)
+    tmp_path = path + ".tmp"
+    try:
+        if fmt == "arrow":
+            with pa.OSFile(tmp_path, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Open an export. Arrow files are memory-mapped: the columns point into the
+# page cache, so opening costs no parsing and every process shares the pages.
+def open_export(path, memory_map=True):
+    if _format_of(path) == "arrow":
+        source = pa.memory_map(path, "r") if memory_map else pa.OSFile(path, "rb")
+        return ipc.open_file(source).read_all()
+    return pq.read_table(path, memory_map=memory_map)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the troubleshooting knowledge base as Arrow/Parquet")
+    parser.add_argument("workbook", nargs="?", default="MachineDataAnalytics.xlsx")
+    parser.add_argument("-o", "--output", action="append",
+                        help=f"output file, .arrow/.feather or .parquet (repeatable, default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--no-catalogues", action="store_true",
+                        help="export the workbook only, without the PMS/Hemodialysis/UP7000 catalogues")
+    args = parser.parse_args()
+    outputs = args.output or [DEFAULT_OUTPUT]
+    for output in outputs:
+        try:
+            _format_of(output)
+        except ValueError as e:
+            parser.error(str(e))
+
+    table = build_table(args.workbook, catalogues=not args.no_catalogues)
+    for output in outputs:
+        write_export(table, output)
+        print(f"Wrote {output} ({os.path.getsize(output)} bytes, {table.num_rows} steps, "
+              f"{len(set(table.column('machine').to_pylist()))} machines)")
@@ -0,0 +1,275 @@
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from alarm_index import AlarmIndex
+from kb_store import update_workbook_states
+from knowledge_base import (
+    SKIPPED_SHEETS,
+    encode_snapshot,
+    load_knowledge_base,
+    read_sheet,
+    share_knowledge_base,
+    snapshot_path_for,
+    write_snapshot,
+)
+from xlsx_reader import XlsxReader
+
+logger = logging.getLogger(__name__)
+
+SHARED_STRINGS_PART = "xl/sharedStrings.xml"
+
+# Seconds to wait after the last file event before reloading, so that a
+# save made of several writes/renames is picked up once, complete
+RELOAD_DELAY = 1.0
+# Seconds before a failed write-through to the store is retried
+STORE_RETRY = 30.0
+
+# Filesystem events that can change the workbook's contents (opening or
+# reading the file, which we do ourselves, must not trigger a reload)
+CHANGE_EVENTS = ("created", "modified", "moved", "closed")
+
+# One immutable published state of the knowledge base (read-only mapping
+# of frames shared by every session, see share_knowledge_base).
+# sheet_parts/parts record which zip part each sheet came from and the
+# (CRC, size) of every part, so the next reload can tell what changed.
+# sheet_strings maps each sheet parsed by a reload to the shared strings its
+# cells used ({index: text}); sheets loaded from the snapshot are absent.
+KnowledgeBaseVersion = namedtuple(
+    "KnowledgeBaseVersion",
+    ["data_dict", "sheet_names", "index", "sheet_parts", "parts", "sheet_strings", "generation"],
+)
+
+
+# Shared strings a sheet used, as {index: text}
+def used_strings(reader, sheet):
+    strings = reader.shared_strings
+    return {i: strings[i] for i in reader.string_refs.get(sheet, ())}
+
+
+# True if every string a sheet used still has the same text at the same index
+def strings_unchanged(used, strings):
+    return all(i < len(strings) and strings[i] == text for i, text in used.items())
+
+
+# Knowledge base that follows edits to the workbook while the server runs.
+#
+# Readers take `kb.current` once per rerun and use that version throughout;
+# publishing a reload is a single reference assignment, so readers never
+# lock and never observe a half-built version. Reloads themselves are
+# serialised by a lock that readers do not touch.
+#
+# With a store_path, re-parsed states are also written through to that
+# SQLite knowledge store (see kb_store.py) before the version is published.
+# The pages keep their store open for the life of the process, so states
+# that fail to be written are kept and retried, STORE_RETRY seconds later
+# and on every reload, until a write succeeds.
+class LiveKnowledgeBase:
+    def __init__(self, file_path, reload_delay=RELOAD_DELAY, store_path=None):
+        self.file_path = os.path.abspath(file_path)
+        self.snapshot_path = snapshot_path_for(self.file_path)
+        self.store_path = store_path
+        self.reload_delay = reload_delay
+        self._reload_lock = threading.Lock()
+        self._timer_lock = threading.Lock()
+        self._timer = None
+        self._observer = None
+        # States whose write-through to the store failed
+        self._store_pending = ()
+
+        # Manifest first: if the file changes while the snapshot is loaded,
+        # the next reload sees a mismatch and re-reads the affected sheets
+        with XlsxReader(self.file_path) as reader:
+            sheet_parts = dict(reader.sheet_parts)
+            parts = reader.part_manifest()
+        data_dict, sheet_names = share_knowledge_base(
+            *load_knowledge_base(self.file_path, self.snapshot_path)
+        )
+        self._current = KnowledgeBaseVersion(
+            data_dict, sheet_names, AlarmIndex(data_dict), sheet_parts, parts, {}, 0
+        )
+
+    @property
+    def current(self):
+        return self._current
+
+    # Re-read the workbook and publish a new version if anything changed.
+    # Only sheets whose worksheet part changed are parsed again; the other
+    # DataFrames are carried over from the current version as they are.
+    # A changed shared string table (Excel rewrites it on almost every
+    # text edit) only re-parses the sheets whose strings actually changed.
+    # Returns the names of the re-parsed sheets.
+    def reload(self):
+        with self._reload_lock:
+            current = self._current
+
+            # Work from one in-memory copy so that the parsed data, the
+            # manifest and the snapshot hash all describe the same bytes
+            with open(self.file_path, "rb") as f:
+                buf = f.read()
+
+            with XlsxReader(io.BytesIO(buf)) as reader:
+                parts = reader.part_manifest()
+                sheet_names = reader.sheet_names
+                # Cells hold indices into the shared string table, so a
+                # changed table can change a sheet whose own part did not
+                strings_changed = (
+                    parts.get(SHARED_STRINGS_PART) != current.parts.get(SHARED_STRINGS_PART)
+                )
+
+                data_dict = {}
+                sheet_strings = {}
+                changed = []
+                for sheet in sheet_names:
+                    if sheet in SKIPPED_SHEETS:
+                        continue
+                    part = reader.sheet_parts[sheet]
+                    unchanged = (
+                        sheet in current.data_dict
+                        and current.sheet_parts.get(sheet) == part
+                        and current.parts.get(part) == parts.get(part)
+                    )
+                    if unchanged and strings_changed:
+                        # Same part, so the same string indices: compare
+                        # their texts (unknown for snapshot-loaded sheets)
+                        used = current.sheet_strings.get(sheet)
+                        unchanged = used is not None and strings_unchanged(used, reader.shared_strings)
+                    if unchanged:
+                        data_dict[sheet] = current.data_dict.frames[sheet]
+                        if sheet in current.sheet_strings:
+                            sheet_strings[sheet] = current.sheet_strings[sheet]
+                    else:
+                        data_dict[sheet] = read_sheet(reader, sheet)
+                        sheet_strings[sheet] = used_strings(reader, sheet)
+                        changed.append(sheet)
+                sheet_parts = dict(reader.sheet_parts)
+
+            source_hash = hashlib.sha256(buf).digest()
+            if not changed and tuple(sheet_names) == current.sheet_names and data_dict.keys() == current.data_dict.keys():
+                self._write_through(current.index, [], source_hash)
+                return []
+
+            data_dict, sheet_names = share_knowledge_base(data_dict, sheet_names)
+            index = current.index.updated(data_dict, changed)
+            removed = [sheet for sheet in current.data_dict if sheet not in data_dict]
+            self._write_through(index, changed + removed, source_hash)
+            self._current = KnowledgeBaseVersion(
+                data_dict, sheet_names, index, sheet_parts, parts,
+                sheet_strings, current.generation + 1,
+            )
+
+            # Keep the snapshot in step so a restart starts from this version.
+            # Encoding covers the whole workbook, so it runs off the reload
+            # path; a snapshot left behind by an older reload only fails the
+            # hash check on restart and is rebuilt.
+            threading.Thread(
+                target=self._write_snapshot, args=(data_dict, sheet_names, source_hash), daemon=True
+            ).start()
+            return changed
+
+    # Write states to the store, with those a failed write left behind; on
+    # failure they are all kept for the next reload, scheduled to retry
+    def _write_through(self, index, states, source_hash):
+        if self.store_path is None:
+            return
+        states = list(dict.fromkeys([*self._store_pending, *states]))
+        if not states:
+            return
+        try:
+            update_workbook_states(self.store_path, index, states, source_hash)
+        except sqlite3.Error:
+            logger.warning("Updating %s failed, retrying in %.0f s", self.store_path, STORE_RETRY, exc_info=True)
+            self._store_pending = tuple(states)
+            self.schedule_reload(STORE_RETRY)
+            return
+        self._store_pending = ()
+
+    def _write_snapshot(self, data_dict, sheet_names, source_hash):
+        try:
+            write_snapshot(self.snapshot_path, encode_snapshot(data_dict, sheet_names, source_hash))
+        except OSError:
+            pass
+
+    # Debounced reload on a timer thread; the current version keeps being
+    # served if the file cannot be read (e.g. caught mid-save)
+    def schedule_reload(self, delay=None):
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.reload_delay if delay is None else delay, self._reload_quietly)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _reload_quietly(self):
+        try:
+            changed = self.reload()
+        except Exception:
+            logger.warning("Reloading %s failed, keeping the current version", self.file_path, exc_info=True)
+            return
+        if changed:
+            logger.info("Reloaded %s: %s", self.file_path, ", ".join(changed))
+
+    # Record which shared strings each snapshot-loaded sheet uses, so the
+    # first string table change does not have to re-parse every sheet.
+    # Only the string references are collected; the frames stay as loaded.
+    def learn_sheet_strings(self):
+        with self._reload_lock:
+            current = self._current
+            with XlsxReader(self.file_path) as reader:
+                if reader.part_manifest() != current.parts:
+                    # Changed since it was loaded: the next reload re-parses
+                    return
+                sheet_strings = dict(current.sheet_strings)
+                for sheet in current.data_dict:
+                    if sheet not in sheet_strings:
+                        for _ in reader.iter_rows(sheet):
+                            pass
+                        sheet_strings[sheet] = used_strings(reader, sheet)
+            self._current = current._replace(sheet_strings=sheet_strings)
+
+    def _learn_sheet_strings_quietly(self):
+        try:
+            self.learn_sheet_strings()
+        except Exception:
+            logger.warning("Scanning %s for shared strings failed", self.file_path, exc_info=True)
+
+    def start_watching(self):
+        if self._observer is not None:
+            return
+        observer = Observer()
+        observer.schedule(_WorkbookEventHandler(self), os.path.dirname(self.file_path), recursive=False)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
+        threading.Thread(target=self._learn_sheet_strings_quietly, daemon=True).start()
+
+    def stop_watching(self):
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+
+class _WorkbookEventHandler(FileSystemEventHandler):
+    def __init__(self, knowledge_base):
+        self.knowledge_base = knowledge_base
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in CHANGE_EVENTS:
+            return
+        # Editors often save to a temporary file and rename it over the
+        # workbook, so the workbook may only appear as the move target
+        paths = [event.src_path, getattr(event, "dest_path", "")]
+        if any(path and os.path.abspath(os.fsdecode(path)) == self.knowledge_base.file_path for path in paths):
+            self.knowledge_base.schedule_reload()
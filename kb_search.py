@@ -0,0 +1,207 @@
+import math
+import re
+from bisect import bisect_left
+from collections import Counter, namedtuple
+
+import numpy as np
+
+from catalogues import (
+    HEMO_CATEGORIES,
+    HEMO_ERROR_DETAILS,
+    PMS_CATEGORIES,
+    PMS_ERROR_CODE_ERRORS,
+    PMS_ERROR_CODES,
+    PMS_ERROR_DETAILS,
+    UP7000_CATEGORIES,
+    UP7000_ERROR_DETAILS,
+)
+
+# Full-text search over every alarm the assistant knows about: the workbook's
+# (state, alarm) rows and the PMS / Hemodialysis / UP-7000 catalogues.
+#
+# Documents are tokenised once into an inverted index whose postings already
+# hold each document's BM25 contribution for the term, so a query is a few
+# vectorised adds into a score array plus a partial sort.
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Field weights: a word in the alarm name counts for more than one in a step
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "code": 3.0,
+    "indication": 1.5,
+    "causes": 1.0,
+    "impact": 0.5,
+    "steps": 1.0,
+}
+
+# Query words shorter than this only match whole terms
+MIN_PREFIX = 2
+# Terms a single prefix may expand to (the most frequent ones are kept)
+MAX_PREFIX_EXPANSIONS = 64
+# Prefix-only matches count for less than the exact term
+PREFIX_WEIGHT = 0.7
+
+DEFAULT_LIMIT = 10
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# source: "workbook" or the machine catalogue ("PMS", "Hemodialysis", "UP7000")
+# group:  machine state (workbook) or error category (catalogues)
+# name:   alarm / error name as shown in the selectboxes
+SearchDocument = namedtuple("SearchDocument", ["source", "group", "name", "fields"])
+SearchHit = namedtuple("SearchHit", ["score", "source", "group", "name"])
+
+
+def tokenize(text):
+    return _TOKEN.findall(str(text).lower())
+
+
+# Documents for every (state, alarm) of an AlarmIndex
+def workbook_documents(alarm_index, source="workbook"):
+    for (state, alarm), steps in alarm_index.items():
+        yield SearchDocument(source, state, alarm, {"name": alarm, "steps": " ".join(map(str, steps))})
+
+
+# Documents for a machine catalogue (categories + error details, see catalogues.py);
+# error codes, when the machine has them, are searchable on their error
+def catalogue_documents(source, categories, error_details, error_codes=None, code_errors=None):
+    codes = {}
+    for code, error in (code_errors or {}).items():
+        description = (error_codes or {}).get(code, "")
+        codes.setdefault(error, []).append(f"{code} {description}")
+
+    for category, errors in categories.items():
+        for error in errors:
+            details = error_details.get(error, {})
+            fields = {"name": error}
+            if error in codes:
+                fields["code"] = " ".join(codes[error])
+            if "indication" in details:
+                fields["indication"] = details["indication"]
+            if "causes" in details:
+                fields["causes"] = " ".join(details["causes"])
+            if "impact" in details:
+                fields["impact"] = details["impact"]
+            if "steps" in details:
+                fields["steps"] = " ".join(details["steps"])
+            yield SearchDocument(source, category, error, fields)
+
+
+# All static machine catalogues shipped with the app
+def catalogue_corpus():
+    yield from catalogue_documents(
+        "PMS", PMS_CATEGORIES, PMS_ERROR_DETAILS, PMS_ERROR_CODES, PMS_ERROR_CODE_ERRORS
+    )
+    yield from catalogue_documents("Hemodialysis", HEMO_CATEGORIES, HEMO_ERROR_DETAILS)
+    yield from catalogue_documents("UP7000", UP7000_CATEGORIES, UP7000_ERROR_DETAILS)
+
+
+# Immutable inverted index with BM25 ranking and prefix matching
+class SearchIndex:
+    def __init__(self, documents):
+        self.documents = tuple(documents)
+
+        term_freqs = []
+        lengths = np.zeros(len(self.documents), dtype=np.float64)
+        doc_freq = Counter()
+        for doc_id, doc in enumerate(self.documents):
+            freqs = Counter()
+            for field, text in doc.fields.items():
+                weight = FIELD_WEIGHTS.get(field, 1.0)
+                for token in tokenize(text):
+                    freqs[token] += weight
+            term_freqs.append(freqs)
+            lengths[doc_id] = sum(freqs.values())
+            doc_freq.update(freqs.keys())
+
+        n_docs = len(self.documents)
+        avg_length = lengths.mean() if n_docs else 0.0
+        norms = K1 * (1 - B + B * lengths / avg_length) if n_docs else lengths
+
+        postings = {}
+        for doc_id, freqs in enumerate(term_freqs):
+            for term, tf in freqs.items():
+                postings.setdefault(term, ([], []))
+                ids, weights = postings[term]
+                ids.append(doc_id)
+                weights.append(tf * (K1 + 1) / (tf + norms[doc_id]))
+
+        self._postings = {}
+        for term, (ids, weights) in postings.items():
+            df = doc_freq[term]
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            self._postings[term] = (
+                np.array(ids, dtype=np.int32),
+                np.array(weights, dtype=np.float32) * np.float32(idf),
+            )
+        self._vocabulary = sorted(self._postings)
+        self._doc_freq = doc_freq
+
+        # Source of every document as a small integer, for filtered queries
+        self._source_ids = {}
+        self._doc_sources = np.array(
+            [self._source_ids.setdefault(doc.source, len(self._source_ids)) for doc in self.documents],
+            dtype=np.int16,
+        )
+
+    def __len__(self):
+        return len(self.documents)
+
+    # Vocabulary terms starting with prefix, most frequent first
+    def _expand(self, prefix):
+        start = bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        if len(terms) > MAX_PREFIX_EXPANSIONS:
+            terms.sort(key=self._doc_freq.__getitem__, reverse=True)
+            terms = terms[:MAX_PREFIX_EXPANSIONS]
+        return terms
+
+    # Ranked hits for a free-text query. Every query word matches the term
+    # itself and, from MIN_PREFIX characters on, the terms it is a prefix of
+    # (so "pres" finds "pressure" while the user is still typing).
+    def search(self, query, limit=DEFAULT_LIMIT, sources=None):
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self.documents:
+            return []
+
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for token in tokens:
+            if token in self._postings:
+                ids, weights = self._postings[token]
+                scores[ids] += weights
+            if len(token) >= MIN_PREFIX:
+                best = np.zeros_like(scores)
+                for term in self._expand(token):
+                    if term != token:
+                        ids, weights = self._postings[term]
+                        best[ids] = np.maximum(best[ids], weights)
+                scores += PREFIX_WEIGHT * best
+
+        if sources is not None:
+            wanted = [self._source_ids[source] for source in sources if source in self._source_ids]
+            scores[~np.isin(self._doc_sources, wanted)] = 0
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(scores[candidates], -limit)[-limit:]]
+        ranked = sorted(candidates, key=lambda doc_id: (-scores[doc_id], doc_id))
+        hits = []
+        for doc_id in ranked:
+            doc = self.documents[doc_id]
+            hits.append(SearchHit(float(scores[doc_id]), doc.source, doc.group, doc.name))
+        return hits
+
+
+# Index over the catalogues, plus the workbook when its AlarmIndex is given
+def build_search_index(alarm_index=None):
+    documents = list(catalogue_corpus())
+    if alarm_index is not None:
+        documents.extend(workbook_documents(alarm_index))
+    return SearchIndex(documents)
@@ -0,0 +1,404 @@
+import argparse
+import hashlib
+import os
+import queue
+import sqlite3
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager
+from urllib.parse import quote
+
+import catalogues
+from alarm_index import AlarmIndex
+from catalogues import (
+    HEMO_CATEGORIES,
+    HEMO_ERROR_DETAILS,
+    PMS_CATEGORIES,
+    PMS_ERROR_CODE_ERRORS,
+    PMS_ERROR_CODES,
+    PMS_ERROR_DETAILS,
+    UP7000_CATEGORIES,
+    UP7000_ERROR_DETAILS,
+)
+from knowledge_base import load_knowledge_base, workbook_hash
+
+# On-disk SQLite store holding every machine's knowledge base.
+#
+# The workbook states and the PMS / Hemodialysis / UP-7000 catalogues are
+# compiled into one file, indexed on (machine, category, alarm), and the
+# pages query only what they show: the categories of a machine, the alarms
+# of a category, the details of one alarm. Nothing is loaded up front, so
+# the store can grow to many device models without slowing page loads.
+#
+# Reads go through a pool of read-only connections shared by all sessions.
+# sqlite3 keeps a per-connection cache of prepared statements keyed by the
+# SQL text, so each query below is compiled once per pooled connection.
+#
+# The store is rebuilt when the workbook's content hash or catalogues.py
+# changes (as with the .kbsnap snapshot):
+#
+#   python kb_store.py MachineDataAnalytics.xlsx
+
+STORE_SUFFIX = ".sqlite"
+STORE_VERSION = 1
+# Machine name of the workbook's states (the "workbook" source of kb_search)
+WORKBOOK_MACHINE = "workbook"
+POOL_SIZE = 8
+STATEMENT_CACHE = 64
+
+# Kinds of text rows stored per alarm
+STEP = 0
+CAUSE = 1
+
+SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE categories (
+    machine TEXT NOT NULL,
+    category TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (machine, category)
+) WITHOUT ROWID;
+CREATE TABLE alarms (
+    id INTEGER PRIMARY KEY,
+    machine TEXT NOT NULL,
+    category TEXT NOT NULL,
+    alarm TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    indication TEXT,
+    impact TEXT
+);
+CREATE UNIQUE INDEX alarms_by_key ON alarms (machine, category, alarm);
+CREATE INDEX alarms_in_order ON alarms (machine, category, position, alarm);
+CREATE TABLE texts (
+    alarm_id INTEGER NOT NULL REFERENCES alarms (id) ON DELETE CASCADE,
+    kind INTEGER NOT NULL,
+    number INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (alarm_id, kind, number)
+) WITHOUT ROWID;
+CREATE TABLE error_codes (
+    machine TEXT NOT NULL,
+    code TEXT NOT NULL,
+    description TEXT,
+    alarm TEXT,
+    PRIMARY KEY (machine, code)
+) WITHOUT ROWID;
+"""
+
+# Queries run by the pages; constant SQL so the statement cache hits
+SELECT_MACHINES = "SELECT DISTINCT machine FROM categories ORDER BY machine"
+SELECT_CATEGORIES = "SELECT category FROM categories WHERE machine = ? ORDER BY position"
+SELECT_ALARMS = "SELECT alarm FROM alarms WHERE machine = ? AND category = ? ORDER BY position"
+SELECT_ALARM = (
+    "SELECT id, indication, impact FROM alarms WHERE machine = ? AND category = ? AND alarm = ?"
+)
+SELECT_TEXTS = "SELECT text FROM texts WHERE alarm_id = ? AND kind = ? ORDER BY number"
+SELECT_ALL_STEPS = (
+    "SELECT a.category, a.alarm, t.text FROM alarms a LEFT JOIN texts t"
+    " ON t.alarm_id = a.id AND t.kind = 0"
+    " WHERE a.machine = ? ORDER BY a.category, a.position, t.number"
+)
+SELECT_COUNT = "SELECT count(*) FROM alarms WHERE machine = ?"
+SELECT_ERROR_CODES = "SELECT code, description, alarm FROM error_codes WHERE machine = ? ORDER BY code"
+SELECT_META = "SELECT value FROM meta WHERE key = ?"
+
+# Details of one alarm, in the shape of the catalogue entries
+AlarmDetails = namedtuple("AlarmDetails", ["indication", "causes", "impact", "steps"])
+ErrorCode = namedtuple("ErrorCode", ["code", "description", "alarm"])
+
+
+def store_path_for(file_path):
+    return os.path.splitext(file_path)[0] + STORE_SUFFIX
+
+
+# Hash of the catalogue definitions, so edits to catalogues.py rebuild the store
+def catalogues_hash():
+    with open(catalogues.__file__, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# ===== WRITING =====
+def _insert_alarm(conn, machine, category, alarm, position, indication=None, impact=None,
+                  steps=(), causes=()):
+    cursor = conn.execute(
+        "INSERT INTO alarms (machine, category, alarm, position, indication, impact)"
+        " VALUES (?, ?, ?, ?, ?, ?)",
+        (machine, category, alarm, position, indication, impact),
+    )
+    alarm_id = cursor.lastrowid
+    conn.executemany(
+        "INSERT INTO texts (alarm_id, kind, number, text) VALUES (?, ?, ?, ?)",
+        [(alarm_id, STEP, i, str(text)) for i, text in enumerate(steps, 1)]
+        + [(alarm_id, CAUSE, i, str(text)) for i, text in enumerate(causes, 1)],
+    )
+
+
+def _set_category(conn, machine, category, position):
+    conn.execute(
+        "INSERT OR REPLACE INTO categories (machine, category, position) VALUES (?, ?, ?)",
+        (machine, category, position),
+    )
+
+
+# Import a machine catalogue (see catalogues.py)
+def import_catalogue(conn, machine, categories, error_details, error_codes=None, code_errors=None):
+    for category_pos, (category, errors) in enumerate(categories.items()):
+        _set_category(conn, machine, category, category_pos)
+        for position, error in enumerate(errors):
+            details = error_details.get(error, {})
+            _insert_alarm(
+                conn, machine, category, error, position,
+                details.get("indication"), details.get("impact"),
+                details.get("steps", ()), details.get("causes", ()),
+            )
+    for code, description in (error_codes or {}).items():
+        conn.execute(
+            "INSERT INTO error_codes (machine, code, description, alarm) VALUES (?, ?, ?, ?)",
+            (machine, code, description, (code_errors or {}).get(code)),
+        )
+
+
+# Replace the given states of a machine with their alarms from an
+# AlarmIndex (all of its states by default); state order follows the index
+def import_states(conn, alarm_index, machine=WORKBOOK_MACHINE, states=None):
+    all_states = alarm_index.states()
+    for state in all_states if states is None else states:
+        conn.execute("DELETE FROM alarms WHERE machine = ? AND category = ?", (machine, str(state)))
+        if state not in all_states:
+            conn.execute("DELETE FROM categories WHERE machine = ? AND category = ?", (machine, str(state)))
+            continue
+        for position, alarm in enumerate(alarm_index.alarms(state)):
+            _insert_alarm(conn, machine, str(state), str(alarm), position,
+                          steps=alarm_index.steps(state, alarm))
+    for position, state in enumerate(all_states):
+        _set_category(conn, machine, str(state), position)
+
+
+def _set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def _connect_writable(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+# Compile the store from the catalogues and, if given, the workbook.
+# Written to a temporary file and renamed over db_path.
+def build_store(db_path, workbook_path=None):
+    directory = os.path.dirname(os.path.abspath(db_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".kbstore-", dir=directory)
+    os.close(fd)
+    try:
+        conn = _connect_writable(tmp_path)
+        try:
+            with conn:
+                conn.executescript(SCHEMA)
+                import_catalogue(conn, "PMS", PMS_CATEGORIES, PMS_ERROR_DETAILS,
+                                 PMS_ERROR_CODES, PMS_ERROR_CODE_ERRORS)
+                import_catalogue(conn, "Hemodialysis", HEMO_CATEGORIES, HEMO_ERROR_DETAILS)
+                import_catalogue(conn, "UP7000", UP7000_CATEGORIES, UP7000_ERROR_DETAILS)
+                source_hash = ""
+                if workbook_path is not None and os.path.exists(workbook_path):
+                    data_dict, _ = load_knowledge_base(workbook_path)
+                    import_states(conn, AlarmIndex(data_dict))
+                    source_hash = workbook_hash(workbook_path).hex()
+                _set_meta(conn, "version", str(STORE_VERSION))
+                _set_meta(conn, "workbook_hash", source_hash)
+                _set_meta(conn, "catalogues_hash", catalogues_hash())
+            conn.execute("ANALYZE")
+        finally:
+            conn.close()
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Write re-parsed workbook states into an existing store in place (one
+# transaction; readers see either the old or the new states)
+def update_workbook_states(db_path, alarm_index, states, source_hash):
+    conn = _connect_writable(db_path)
+    try:
+        with conn:
+            import_states(conn, alarm_index, WORKBOOK_MACHINE, states)
+            _set_meta(conn, "workbook_hash", source_hash.hex())
+    finally:
+        conn.close()
+
+
+def _read_meta(db_path):
+    try:
+        conn = sqlite3.connect(f"file:{quote(os.path.abspath(db_path))}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return {}
+    try:
+        return dict(conn.execute("SELECT key, value FROM meta"))
+    except sqlite3.Error:
+        return {}
+    finally:
+        conn.close()
+
+
+def store_is_current(db_path, workbook_path=None):
+    meta = _read_meta(db_path)
+    expected = ""
+    if workbook_path is not None and os.path.exists(workbook_path):
+        expected = workbook_hash(workbook_path).hex()
+    return (
+        meta.get("version") == str(STORE_VERSION)
+        and meta.get("workbook_hash") == expected
+        and meta.get("catalogues_hash") == catalogues_hash()
+    )
+
+
+# ===== READING =====
+class KnowledgeStore:
+    def __init__(self, db_path, pool_size=POOL_SIZE):
+        self.db_path = os.path.abspath(db_path)
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            f"file:{quote(self.db_path)}?mode=ro", uri=True,
+            check_same_thread=False, cached_statements=STATEMENT_CACHE,
+        )
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    # Borrow a pooled connection; every session thread may hold one at a
+    # time, and at most pool_size idle ones are kept open
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if self._pool.qsize() < self.pool_size:
+                self._pool.put(conn)
+            else:
+                conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _column(self, sql, params):
+        with self.connection() as conn:
+            return tuple(row[0] for row in conn.execute(sql, params))
+
+    def machines(self):
+        return self._column(SELECT_MACHINES, ())
+
+    def categories(self, machine):
+        return self._column(SELECT_CATEGORIES, (machine,))
+
+    def alarms(self, machine, category):
+        return self._column(SELECT_ALARMS, (machine, category))
+
+    # Steps of an alarm, or None when the alarm is unknown
+    def steps(self, machine, category, alarm):
+        with self.connection() as conn:
+            row = conn.execute(SELECT_ALARM, (machine, category, alarm)).fetchone()
+            if row is None:
+                return None
+            return tuple(text for (text,) in conn.execute(SELECT_TEXTS, (row[0], STEP)))
+
+    # AlarmDetails of an alarm, or None when the alarm is unknown
+    def details(self, machine, category, alarm):
+        with self.connection() as conn:
+            row = conn.execute(SELECT_ALARM, (machine, category, alarm)).fetchone()
+            if row is None:
+                return None
+            alarm_id, indication, impact = row
+            steps = tuple(text for (text,) in conn.execute(SELECT_TEXTS, (alarm_id, STEP)))
+            causes = tuple(text for (text,) in conn.execute(SELECT_TEXTS, (alarm_id, CAUSE)))
+            return AlarmDetails(indication, causes, impact, steps)
+
+    def error_codes(self, machine):
+        with self.connection() as conn:
+            return tuple(ErrorCode(*row) for row in conn.execute(SELECT_ERROR_CODES, (machine,)))
+
+    def count(self, machine):
+        with self.connection() as conn:
+            return conn.execute(SELECT_COUNT, (machine,)).fetchone()[0]
+
+    def index(self, machine=WORKBOOK_MACHINE):
+        return StoreIndex(self, machine)
+
+    # Hash of the workbook the states were last written from; anything built
+    # from the workbook states is current as long as it is unchanged
+    def workbook_version(self):
+        with self.connection() as conn:
+            row = conn.execute(SELECT_META, ("workbook_hash",)).fetchone()
+            return row[0] if row is not None else ""
+
+
+# AlarmIndex interface (states -> alarms -> steps) over one machine of a
+# store, for the pages and search builders written against AlarmIndex
+class StoreIndex:
+    def __init__(self, store, machine):
+        self.store = store
+        self.machine = machine
+
+    def states(self):
+        return self.store.categories(self.machine)
+
+    def alarms(self, state):
+        return self.store.alarms(self.machine, state)
+
+    def steps(self, state, alarm):
+        return self.store.steps(self.machine, state, alarm)
+
+    def __contains__(self, key):
+        return self.steps(*key) is not None
+
+    def __len__(self):
+        return self.store.count(self.machine)
+
+    def items(self):
+        with self.store.connection() as conn:
+            rows = conn.execute(SELECT_ALL_STEPS, (self.machine,)).fetchall()
+        steps = {}
+        for state, alarm, text in rows:
+            texts = steps.setdefault((state, alarm), [])
+            if text is not None:
+                texts.append(text)
+        order = {state: i for i, state in enumerate(self.states())}
+        keys = sorted(steps, key=lambda key: order.get(key[0], len(order)))
+        return [(key, tuple(steps[key])) for key in keys]
+
+
+# Open the store next to the workbook, rebuilding it first if the workbook
+# or the catalogues changed since it was compiled
+def open_store(workbook_path, db_path=None, pool_size=POOL_SIZE):
+    if db_path is None:
+        db_path = store_path_for(workbook_path)
+    if not store_is_current(db_path, workbook_path):
+        build_store(db_path, workbook_path)
+    return KnowledgeStore(db_path, pool_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile the troubleshooting knowledge base into SQLite")
+    parser.add_argument("workbook", nargs="?", default="MachineDataAnalytics.xlsx")
+    parser.add_argument("store", nargs="?")
+    args = parser.parse_args()
+
+    target = args.store or store_path_for(args.workbook)
+    build_store(target, args.workbook)
+    store = KnowledgeStore(target)
+    counts = ", ".join(f"{machine} {store.count(machine)}" for machine in store.machines())
+    print(f"Wrote {target} ({os.path.getsize(target)} bytes; alarms: {counts})")
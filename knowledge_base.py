@@ -0,0 +1,304 @@
+import argparse
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections.abc import Mapping
+from types import MappingProxyType
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pickle import PicklingError
+
+import pandas as pd
+
+from xlsx_reader import XlsxReader
+
+# Snapshot file format
+#   header: magic, format version, SHA-256 of the source workbook
+#   body:   string table, sheet names, then one alarm table per machine state
+# Every cell is stored as an index into the string table so repeated step
+# strings ("Connector issue", "Main CPU issue", ...) are written only once.
+SNAPSHOT_MAGIC = b"HDKB"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".kbsnap"
+HEADER = struct.Struct("<4sH32s")
+EMPTY_CELL = 0xFFFFFFFF
+MISSING = float("nan")
+
+# Sheets that describe the workbook itself rather than alarms
+SKIPPED_SHEETS = ("States",)
+
+# Function to compute the content hash used to invalidate snapshots
+def workbook_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def snapshot_path_for(file_path):
+    return os.path.splitext(file_path)[0] + SNAPSHOT_SUFFIX
+
+
+# Clean up a parsed sheet the same way for every loader
+def clean_sheet(df):
+    df.columns = [col.strip() if isinstance(col, str) else col for col in df.columns]
+    return df.dropna(how='all')
+
+
+# Build the DataFrame for one alarm sheet from the streaming reader
+def read_sheet(reader, sheet):
+    columns, labels, rows = reader.read_table(sheet)
+    df = pd.DataFrame(rows, columns=columns, index=labels)
+    return clean_sheet(df)
+
+
+# Worker entry point: each process opens its own reader for one sheet
+def _parse_sheet_in_worker(file_path, sheet):
+    with XlsxReader(file_path) as reader:
+        return read_sheet(reader, sheet)
+
+
+def _parse_sheets_parallel(file_path, sheets, workers):
+    with ProcessPoolExecutor(max_workers=min(workers, len(sheets))) as pool:
+        # map() hands results back in submission order, so the merged
+        # data_dict keeps the workbook's sheet order
+        frames = pool.map(_parse_sheet_in_worker, [file_path] * len(sheets), sheets)
+        return dict(zip(sheets, frames))
+
+
+# Number of worker processes used to parse sheets; 0 or 1 parses serially
+def default_workers():
+    try:
+        return int(os.environ.get("KB_LOAD_WORKERS", "0"))
+    except ValueError:
+        return 0
+
+
+# Parse every alarm sheet of the workbook (used to build snapshots)
+def parse_workbook(file_path, workers=None):
+    if workers is None:
+        workers = default_workers()
+
+    with XlsxReader(file_path) as reader:
+        sheet_names = reader.sheet_names
+        sheets = [sheet for sheet in sheet_names if sheet not in SKIPPED_SHEETS]
+
+        if workers > 1 and len(sheets) > 1:
+            try:
+                return _parse_sheets_parallel(file_path, sheets, workers), sheet_names
+            except (OSError, NotImplementedError, BrokenProcessPool, PicklingError):
+                # No usable process pool here (sandbox, missing semaphores,
+                # killed worker): fall back to the serial path below
+                pass
+
+        data_dict = {}
+        for sheet in sheets:
+            data_dict[sheet] = read_sheet(reader, sheet)
+
+    return data_dict, sheet_names
+
+
+# Read-only mapping of sheet name -> DataFrame, held once per server
+# process and shared by every session. Lookups, the pages' path, return a
+# copy, so a caller may edit the frame it got (in place or through a view)
+# without changing what other sessions read, whatever pandas' copy-on-write
+# mode. frames is a read-only view of the shared frames themselves, for the
+# internal readers that must not pay for copies (AlarmIndex, reloads carrying
+# unchanged sheets over, the snapshot encoder); they never modify a frame.
+class SharedFrames(Mapping):
+    __slots__ = ("_frames", "frames")
+
+    def __init__(self, frames):
+        self._frames = dict(frames)
+        self.frames = MappingProxyType(self._frames)
+
+    def __getitem__(self, sheet):
+        return self._frames[sheet].copy()
+
+    def __contains__(self, sheet):
+        return sheet in self._frames
+
+    def __iter__(self):
+        return iter(self._frames)
+
+    def __len__(self):
+        return len(self._frames)
+
+
+# Read-only view of a loaded knowledge base, for caching with
+# st.cache_resource: the frames are stored once instead of the per-caller
+# copy st.cache_data would unpickle (see SharedFrames)
+def share_knowledge_base(data_dict, sheet_names):
+    return SharedFrames(data_dict), tuple(sheet_names)
+
+
+# ===== SNAPSHOT ENCODING =====
+def _u32_array(values):
+    arr = array("I", values)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _i64_array(values):
+    arr = array("q", values)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _read_array(typecode, buf, offset, count):
+    arr = array(typecode)
+    end = offset + count * arr.itemsize
+    arr.frombytes(buf[offset:end])
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr, end
+
+
+def encode_snapshot(data_dict, sheet_names, source_hash):
+    data_dict = getattr(data_dict, "frames", data_dict)
+    strings = []
+    string_ids = {}
+
+    def intern(value):
+        text = str(value)
+        if text not in string_ids:
+            string_ids[text] = len(strings)
+            strings.append(text)
+        return string_ids[text]
+
+    sheet_ids = [intern(sheet) for sheet in sheet_names]
+    tables = []
+    for sheet, df in data_dict.items():
+        column_ids = [intern(col) for col in df.columns]
+        cells = []
+        for row in df.itertuples(index=False, name=None):
+            cells.extend(EMPTY_CELL if pd.isna(value) else intern(value) for value in row)
+        tables.append((intern(sheet), column_ids, [int(label) for label in df.index], cells))
+
+    encoded = [s.encode("utf-8") for s in strings]
+    parts = [
+        HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, source_hash),
+        struct.pack("<I", len(encoded)),
+        _u32_array(len(b) for b in encoded),
+        b"".join(encoded),
+        struct.pack("<I", len(sheet_ids)),
+        _u32_array(sheet_ids),
+        struct.pack("<I", len(tables)),
+    ]
+    for name_id, column_ids, labels, cells in tables:
+        parts.append(struct.pack("<III", name_id, len(column_ids), len(labels)))
+        parts.append(_u32_array(column_ids))
+        parts.append(_i64_array(labels))
+        parts.append(_u32_array(cells))
+    return b"".join(parts)
+
+
+# Returns the source hash stored in a snapshot, or None if it is not one of ours
+def read_snapshot_hash(buf):
+    if len(buf) < HEADER.size:
+        return None
+    magic, version, source_hash = HEADER.unpack_from(buf, 0)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        return None
+    return source_hash
+
+
+def decode_snapshot(buf):
+    offset = HEADER.size
+    (n_strings,) = struct.unpack_from("<I", buf, offset)
+    lengths, offset = _read_array("I", buf, offset + 4, n_strings)
+    strings = []
+    for length in lengths:
+        strings.append(buf[offset:offset + length].decode("utf-8"))
+        offset += length
+
+    (n_sheets,) = struct.unpack_from("<I", buf, offset)
+    sheet_ids, offset = _read_array("I", buf, offset + 4, n_sheets)
+    sheet_names = [strings[i] for i in sheet_ids]
+
+    (n_tables,) = struct.unpack_from("<I", buf, offset)
+    offset += 4
+    data_dict = {}
+    for _ in range(n_tables):
+        name_id, n_cols, n_rows = struct.unpack_from("<III", buf, offset)
+        column_ids, offset = _read_array("I", buf, offset + 12, n_cols)
+        labels, offset = _read_array("q", buf, offset, n_rows)
+        cells, offset = _read_array("I", buf, offset, n_rows * n_cols)
+
+        values = [MISSING if i == EMPTY_CELL else strings[i] for i in cells]
+        columns = {
+            strings[col_id]: values[c::n_cols] if n_cols else []
+            for c, col_id in enumerate(column_ids)
+        }
+        data_dict[strings[name_id]] = pd.DataFrame(columns, index=list(labels))
+
+    return data_dict, sheet_names
+
+
+# ===== SNAPSHOT BUILD / LOAD =====
+def write_snapshot(snapshot_path, buf):
+    directory = os.path.dirname(os.path.abspath(snapshot_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".kbsnap-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(buf)
+        os.replace(tmp_path, snapshot_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def compile_snapshot(file_path, snapshot_path=None, source_hash=None, workers=None):
+    if snapshot_path is None:
+        snapshot_path = snapshot_path_for(file_path)
+    if source_hash is None:
+        source_hash = workbook_hash(file_path)
+    data_dict, sheet_names = parse_workbook(file_path, workers)
+    buf = encode_snapshot(data_dict, sheet_names, source_hash)
+    try:
+        write_snapshot(snapshot_path, buf)
+    except OSError:
+        # A read-only install can still serve the freshly parsed data
+        pass
+    return buf
+
+
+# Load the knowledge base, rebuilding the snapshot only when the workbook changed
+def load_knowledge_base(file_path, snapshot_path=None, workers=None):
+    if snapshot_path is None:
+        snapshot_path = snapshot_path_for(file_path)
+    source_hash = workbook_hash(file_path)
+
+    buf = None
+    try:
+        with open(snapshot_path, "rb") as f:
+            buf = f.read()
+    except OSError:
+        pass
+
+    if buf is None or read_snapshot_hash(buf) != source_hash:
+        buf = compile_snapshot(file_path, snapshot_path, source_hash, workers)
+
+    return decode_snapshot(buf)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile the troubleshooting workbook into a snapshot")
+    parser.add_argument("workbook", nargs="?", default="MachineDataAnalytics.xlsx")
+    parser.add_argument("snapshot", nargs="?")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="parse sheets in this many processes (default: $KB_LOAD_WORKERS or serial)")
+    args = parser.parse_args()
+
+    target = args.snapshot or snapshot_path_for(args.workbook)
+    snapshot = compile_snapshot(args.workbook, target, workers=args.workers)
+    data, names = decode_snapshot(snapshot)
+    print(f"Wrote {target} ({len(snapshot)} bytes, {len(data)} states, "
+          f"{sum(len(df) for df in data.values())} rows)")
@@ -0,0 +1,347 @@
+import argparse
+import itertools
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+
+from fuzzy_match import normalize
+
+# Alarms read off hemodialysis machine logs, matched to workbook alarms.
+#
+# A device log is plain text, one record per line:
+#
+#   2025-03-01T10:15:02.123 HD-07 STATE Normal dialysis
+#   2025-03-01T10:15:09.551 HD-07 ALARM Blue probe open
+#   2025-03-01T10:15:12.000 HD-07 INFO Blood flow 300 ml/min
+#   2025-03-01T10:17:40.310 HD-07 CLEAR Blue probe open
+#
+# STATE records set the machine state (a workbook sheet), ALARM records are
+# matched against that state's alarms: exactly after normalising case and
+# spaces, else through the fuzzy matcher. CLEAR records (an alarm resolved)
+# are kept for the history analytics (alarm_analytics.py). The stages are
+# generators:
+#
+#   follow(path) -> parse_records() -> match_alarms() -> LogAlarm
+#
+# and memory stays bounded however long the log: reads are CHUNK_SIZE at a
+# time, over-long lines are cut, and the match memo, per-machine states and
+# recent alarms are capped.
+#
+# The apps only open logs under MACHINE_LOG_DIR (the environment variable,
+# else "logs" in the working directory): a path typed into a page is
+# resolved, symlinks included, and refused if it lands anywhere else.
+#
+#   python machine_log.py simulate machine.log --rate 20   # device stand-in
+#   python machine_log.py follow machine.log               # print matched alarms
+
+CHUNK_SIZE = 64 * 1024
+MAX_LINE = 4096
+# Bytes of an existing log read on start, enough to pick up the current state
+BACKLOG_BYTES = 256 * 1024
+POLL_INTERVAL = 0.2
+MATCH_CACHE = 1024
+MAX_MACHINES = 256
+RECENT_ALARMS = 50
+# Fuzzy matches scoring lower than this are ignored
+MIN_SCORE = 0.75
+MACHINE_LOG_DIR = os.path.realpath(os.environ.get("MACHINE_LOG_DIR", "logs"))
+
+STATE, ALARM, CLEAR = "STATE", "ALARM", "CLEAR"
+
+LogRecord = namedtuple("LogRecord", ["timestamp", "machine", "kind", "text"])
+# state/alarm are the workbook keys; text is the alarm as logged
+LogAlarm = namedtuple("LogAlarm", ["timestamp", "machine", "state", "alarm", "text"])
+
+
+# Real path of a log typed into a page, or None if it is outside root
+def resolve_log_path(path, root=MACHINE_LOG_DIR):
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(path)
+    if os.path.commonpath([root, resolved]) != root:
+        return None
+    return resolved
+
+
+# Complete lines of a binary file from its current position to EOF, on each
+# call to lines(). An unfinished last line is left unread; lines over
+# MAX_LINE bytes are cut, and the rest of a cut line is skipped even when it
+# is only written after the call that cut it.
+class LineReader:
+    def __init__(self, f):
+        self.f = f
+        self.skipping = False
+
+    def lines(self):
+        pending = b""
+        while True:
+            chunk = self.f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if self.skipping:
+                # Drop the rest of an over-long line
+                newline = chunk.find(b"\n")
+                if newline < 0:
+                    continue
+                chunk = chunk[newline + 1:]
+                self.skipping = False
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                yield line[:MAX_LINE].decode("utf-8", "replace")
+            if len(pending) > MAX_LINE:
+                yield pending[:MAX_LINE].decode("utf-8", "replace")
+                pending = b""
+                self.skipping = True
+        self.f.seek(-len(pending), os.SEEK_CUR)
+
+
+# Complete lines of a file read once to EOF
+def iter_lines(f):
+    return LineReader(f).lines()
+
+
+# Lines appended to a log, like tail -F: waits for the file to appear and
+# reopens it when it is rotated or truncated. Stops once stop is set.
+def follow(path, stop=None, poll_interval=POLL_INTERVAL, backlog=BACKLOG_BYTES):
+    stop = stop or threading.Event()
+    f = None
+    reader = None
+    inode = None
+    try:
+        while not stop.is_set():
+            if f is None:
+                try:
+                    f = open(path, "rb")
+                except FileNotFoundError:
+                    stop.wait(poll_interval)
+                    continue
+                inode = os.fstat(f.fileno()).st_ino
+                size = os.fstat(f.fileno()).st_size
+                if backlog is not None and size > backlog:
+                    # Start on a line boundary within the backlog
+                    f.seek(size - backlog)
+                    f.readline()
+                # Rotated files are read from the start
+                backlog = None
+                reader = LineReader(f)
+            yield from reader.lines()
+
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None
+            if stat is None or stat.st_ino != inode or stat.st_size < f.tell():
+                # Rotated or truncated: finish with what was written, reopen
+                yield from reader.lines()
+                f.close()
+                f = None
+                continue
+            stop.wait(poll_interval)
+    finally:
+        if f is not None:
+            f.close()
+
+
+# Record of a "<timestamp> <machine> <kind> <text>" line, or None if malformed
+def parse_record(line):
+    parts = line.rstrip("\r\n").split(None, 3)
+    if len(parts) == 4:
+        return LogRecord(parts[0], parts[1], parts[2].upper(), parts[3].strip())
+    return None
+
+
+def parse_records(lines):
+    for line in lines:
+        record = parse_record(line)
+        if record is not None:
+            yield record
+
+
+# Maps logged (state, alarm text) to the workbook's (state, alarm) keys
+class LogAlarmMatcher:
+    def __init__(self, alarm_index, fuzzy_matcher=None, min_score=MIN_SCORE):
+        self.fuzzy_matcher = fuzzy_matcher
+        self.min_score = min_score
+        self._states = {normalize(state): state for state in alarm_index.states()}
+        self._alarms = {}
+        for state in alarm_index.states():
+            for alarm in alarm_index.alarms(state):
+                self._alarms.setdefault((normalize(state), normalize(alarm)), (state, alarm))
+        # (state, text) -> key or None, most recently used last
+        self._memo = OrderedDict()
+
+    # Workbook name of a logged state, or None
+    def state(self, text):
+        return self._states.get(normalize(text))
+
+    # (state, alarm) of a logged alarm in a workbook state, or None
+    def match(self, state, text):
+        memo_key = (state, text)
+        if memo_key in self._memo:
+            self._memo.move_to_end(memo_key)
+            return self._memo[memo_key]
+        key = self._alarms.get((normalize(state), normalize(text)))
+        if key is None and self.fuzzy_matcher is not None:
+            for hit in self.fuzzy_matcher.match(text, sources=["workbook"]):
+                if hit.group == state and hit.score >= self.min_score:
+                    key = (hit.group, hit.name)
+                    break
+        self._memo[memo_key] = key
+        if len(self._memo) > MATCH_CACHE:
+            self._memo.popitem(last=False)
+        return key
+
+
+# Matched alarms of a record stream. Each machine's state is the last STATE
+# record seen for it; alarms before any state, or not matching an alarm of
+# that state, are passed to unmatched if given.
+def match_alarms(records, matcher, unmatched=None):
+    states = OrderedDict()
+    for record in records:
+        if record.kind == STATE:
+            states[record.machine] = matcher.state(record.text)
+            states.move_to_end(record.machine)
+            if len(states) > MAX_MACHINES:
+                states.popitem(last=False)
+        elif record.kind == ALARM:
+            state = states.get(record.machine)
+            key = matcher.match(state, record.text) if state is not None else None
+            if key is None:
+                if unmatched is not None:
+                    unmatched(record)
+                continue
+            yield LogAlarm(record.timestamp, record.machine, key[0], key[1], record.text)
+
+
+# Follows one log on a background thread and keeps the latest matched
+# alarms for the UI to pick up. Each feed has its own matcher (the memo is
+# not shared between threads), rebuilt when the workbook is reloaded.
+class MachineLogFeed:
+    def __init__(self, path, matcher, generation=None, poll_interval=POLL_INTERVAL):
+        self.path = path
+        self.matcher = matcher
+        self.generation = generation
+        self.poll_interval = poll_interval
+        # (sequence number, LogAlarm); the number grows with every match
+        self.latest = None
+        self.recent = deque(maxlen=RECENT_ALARMS)
+        self.lines = 0
+        self.unmatched = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"machine-log {self.path}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    # Match against another version of the knowledge base
+    def use_index(self, alarm_index, fuzzy_matcher, generation):
+        if generation != self.generation:
+            self.matcher = LogAlarmMatcher(alarm_index, fuzzy_matcher)
+            self.generation = generation
+
+    def _counted(self, lines):
+        for line in lines:
+            self.lines += 1
+            yield line
+
+    def _count_unmatched(self, record):
+        self.unmatched += 1
+
+    def _run(self):
+        lines = self._counted(follow(self.path, self._stop, self.poll_interval))
+        matcher = _SwappableMatcher(self)
+        for seq, alarm in enumerate(match_alarms(parse_records(lines), matcher, self._count_unmatched), 1):
+            self.recent.append(alarm)
+            self.latest = (seq, alarm)
+
+
+# Forwards to the feed's current matcher
+class _SwappableMatcher:
+    __slots__ = ("feed",)
+
+    def __init__(self, feed):
+        self.feed = feed
+
+    def state(self, text):
+        return self.feed.matcher.state(text)
+
+    def match(self, state, text):
+        return self.feed.matcher.match(state, text)
+
+
+# ===== DEVICE STAND-IN =====
+# Lines of a simulated machine: a state change now and then, alarms of the
+# current state (some with odd case or spacing), their CLEAR records, and
+# routine INFO records. Timestamps are read off clock (seconds since the epoch).
+def simulated_lines(alarm_index, machine="HD-01", seed=None, clock=time.time):
+    rng = random.Random(seed)
+    states = [state for state in alarm_index.states() if alarm_index.alarms(state)]
+    state = rng.choice(states)
+    active = deque(maxlen=8)
+    yield f"{_timestamp(clock())} {machine} {STATE} {state}"
+    for n in itertools.count(1):
+        roll = rng.random()
+        if roll < 0.05:
+            state = rng.choice(states)
+            yield f"{_timestamp(clock())} {machine} {STATE} {state}"
+        elif roll < 0.3:
+            alarm = str(rng.choice(alarm_index.alarms(state)))
+            if rng.random() < 0.2:
+                alarm = alarm.upper() if rng.random() < 0.5 else alarm.replace(" ", "  ")
+            active.append(alarm)
+            yield f"{_timestamp(clock())} {machine} {ALARM} {alarm}"
+        elif roll < 0.6 and active:
+            yield f"{_timestamp(clock())} {machine} {CLEAR} {active.popleft()}"
+        else:
+            yield f"{_timestamp(clock())} {machine} INFO Blood flow {rng.randint(200, 400)} ml/min, record {n}"
+
+
+def _timestamp(now):
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now)) + f".{int(now % 1 * 1000):03d}"
+
+
+def simulate(path, alarm_index, machine, rate, count=None):
+    lines = simulated_lines(alarm_index, machine)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for n, line in enumerate(lines, 1):
+            f.write(line + "\n")
+            f.flush()
+            if count is not None and n >= count:
+                break
+            time.sleep(1 / rate)
+
+
+if __name__ == "__main__":
+    from alarm_index import AlarmIndex
+    from fuzzy_match import build_fuzzy_matcher
+    from knowledge_base import load_knowledge_base
+
+    parser = argparse.ArgumentParser(description="Simulate or follow a hemodialysis machine log")
+    parser.add_argument("command", choices=["simulate", "follow"])
+    parser.add_argument("log")
+    parser.add_argument("--workbook", default="MachineDataAnalytics.xlsx")
+    parser.add_argument("--machine", default="HD-01", help="machine id written by simulate")
+    parser.add_argument("--rate", type=float, default=10.0, help="lines per second written by simulate")
+    parser.add_argument("--count", type=int, help="lines written by simulate before it stops")
+    args = parser.parse_args()
+
+    data_dict, _ = load_knowledge_base(args.workbook)
+    alarm_index = AlarmIndex(data_dict)
+    try:
+        if args.command == "simulate":
+            simulate(args.log, alarm_index, args.machine, args.rate, args.count)
+        else:
+            matcher = LogAlarmMatcher(alarm_index, build_fuzzy_matcher(alarm_index))
+            for alarm in match_alarms(parse_records(follow(args.log)), matcher):
+                print(f"{alarm.timestamp} {alarm.machine}: {alarm.state} / {alarm.alarm}")
+    except KeyboardInterrupt:
+        pass
@@ -1,32 +1,37 @@
 import streamlit as st
 import pandas as pd
-import time
+from knowledge_base import load_knowledge_base, share_knowledge_base
+from alarm_index import AlarmIndex
+from procedure_plan import ProcedurePlan
+from static_assets import inject_stylesheet
+from step_list import render_step_list
+from checklist_progress import checklist_progress
+from kb_store import open_store
+from event_log import ask_fixing_step, log_event, log_resolution, log_selection
+from resolution_stats import get_resolution_stats
+from catalogues import COMMON_PROCEDURES
+
+# Seconds between successive step reveals (CSS animation delay, no server-side wait)
+STEP_REVEAL_DELAY = 0.1
+HEMO_STEP_REVEAL_DELAY = 0.3
+
+# Workbook compiled into the knowledge store next to it (catalogues only if missing)
+WORKBOOK_PATH = "MachineDataAnalytics.xlsx"
 
 # App title and header
 st.set_page_config(page_title="Medical Equipment Troubleshooter", layout="wide", initial_sidebar_state="expanded")
 
-# Custom CSS for styling
-def local_css(file_name):
-    with open(file_name) as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
-
-# Try to load custom CSS if available
-try:
-    local_css("style.css")
-except:
-    pass
+# Custom CSS for styling (minified, content-hashed and served as a static
+# file; only a one-line @import is sent per rerun)
+inject_stylesheet("style.css", "main.css")
 
 # Initialize state if not already done
 if 'machine_selected' not in st.session_state:
     st.session_state.machine_selected = None
-    
-if 'troubleshoot_step' not in st.session_state:
-    st.session_state.troubleshoot_step = 0
 
 # Function to reset session state
 def reset_state():
     st.session_state.machine_selected = None
-    st.session_state.troubleshoot_step = 0
 
 # ===== MACHINE SELECTION PAGE =====
 def show_machine_selection():
@@ -76,269 +81,52 @@ def show_machine_selection():
     </div>
     """, unsafe_allow_html=True)
 
+# ===== KNOWLEDGE STORE =====
+# Function to open the SQLite knowledge store once per server process; every
+# session queries it through the store's pool of read-only connections
+@st.cache_resource
+def get_knowledge_store():
+    return open_store(WORKBOOK_PATH)
+
 # ===== PMS MACHINE TROUBLESHOOTING =====
-def load_pms_data():
-    # In a real app, this would load from a database or file
-    # For this example, we'll create a structured dictionary
-    pms_categories = {
-        "Power Supply Errors": [
-            "Low Battery Voltage",
-            "AC Power Failure",
-            "Overvoltage / Undervoltage"
-        ],
-        "Temperature-Related Errors": [
-            "Over Temperature Warning",
-            "Temperature Sensor Failure"
-        ],
-        "Current & Load-Related Errors": [
-            "Overload Detection",
-            "Short Circuit at Output",
-            "Current Imbalance"
-        ],
-        "System Control & Communication Errors": [
-            "Microcontroller Failure",
-            "Communication Loss (CAN/RS485)"
-        ],
-        "Network/Remote Monitoring Errors": [
-            "Modbus/SCADA Link Down",
-            "Sensor Data Missing"
-        ],
-        "Maintenance & Predictive Alerts": [
-            "Battery Health Warning",
-            "Maintenance Due Reminder"
-        ]
-    }
-    
-    # Create a mapping of error codes to descriptions
-    error_codes = {
-        "E01": "Low Battery",
-        "E02": "AC Power Failure",
-        "E03": "Over Temperature",
-        "E04": "Short Circuit Output",
-        "E05": "Comm Error (CAN/RS485)",
-        "E06": "MCU Crash"
-    }
-    
-    # Create a detailed error information dictionary
-    error_details = {
-        "Low Battery Voltage": {
-            "indication": "Red LED indicator, audible intermittent beeps, display message: 'Low Battery Voltage'",
-            "causes": [
-                "Aging or degraded battery",
-                "Incomplete charging cycles",
-                "Loose or corroded battery terminals"
-            ],
-            "impact": "Risk of system shutdown during AC power failure",
-            "steps": [
-                "Test voltage with multimeter",
-                "Replace battery if below threshold",
-                "Ensure tight and clean terminal connections"
-            ]
-        },
-        "AC Power Failure": {
-            "indication": "Blinking red LED, continuous alarm tone, display message: 'AC Mains Failure'",
-            "causes": [
-                "Power grid failure",
-                "Damaged or disconnected AC input",
-                "Blown AC input fuse"
-            ],
-            "impact": "Triggers battery backup; system shutdown if battery fails",
-            "steps": [
-                "Verify AC input source",
-                "Inspect fuse and AC cord integrity",
-                "Restore mains power supply"
-            ]
-        },
-        "Overvoltage / Undervoltage": {
-            "indication": "Beep + message: 'Voltage Out of Range'",
-            "causes": [
-                "Surge or sag in input power",
-                "Faulty voltage regulator"
-            ],
-            "impact": "Internal component damage or malfunction",
-            "steps": [
-                "Monitor input voltage",
-                "Stabilize source voltage using AVR or UPS"
-            ]
-        },
-        "Over Temperature Warning": {
-            "indication": "Continuous high-pitched alarm, red LED, message: 'System Overheat'",
-            "causes": [
-                "Blocked air vents",
-                "Faulty cooling fan",
-                "High ambient temperature"
-            ],
-            "impact": "Thermal shutdown or component damage",
-            "steps": [
-                "Clear obstructions",
-                "Replace malfunctioning fans",
-                "Improve cooling/ventilation"
-            ]
-        },
-        "Temperature Sensor Failure": {
-            "indication": "Amber LED, screen: 'Sensor Fault'",
-            "causes": [
-                "Broken or disconnected sensor",
-                "Open/short circuit in sensor line"
-            ],
-            "impact": "Incorrect temperature regulation",
-            "steps": [
-                "Inspect sensor wiring",
-                "Replace damaged sensors"
-            ]
-        },
-        "Overload Detection": {
-            "indication": "Red LED, beeping, display: 'Load Exceeded Limit'",
-            "causes": [
-                "Excessive connected load",
-                "Faulty devices drawing high current"
-            ],
-            "impact": "Auto shutdown to prevent damage",
-            "steps": [
-                "Reduce load to within rated capacity",
-                "Test individual connected devices"
-            ]
-        },
-        "Short Circuit at Output": {
-            "indication": "Loud alarm, system shutdown, screen: 'Output Short Detected'",
-            "causes": [
-                "Direct short in connected equipment",
-                "Crossed wiring"
-            ],
-            "impact": "Damage to switching components (MOSFETs, IGBTs)",
-            "steps": [
-                "Isolate and test output branches",
-                "Repair damaged circuits"
-            ]
-        },
-        "Current Imbalance": {
-            "indication": "Warning message, irregular load readings",
-            "causes": [
-                "Uneven load across phases",
-                "Faulty sensor"
-            ],
-            "impact": "Reduced efficiency, potential overheating",
-            "steps": [
-                "Balance loads",
-                "Check CT sensors"
-            ]
-        },
-        "Microcontroller Failure": {
-            "indication": "Frozen or blank screen, error code (e.g., E01)",
-            "causes": [
-                "Firmware crash",
-                "Clock failure"
-            ],
-            "impact": "Full system halt",
-            "steps": [
-                "Reset system",
-                "Reprogram controller or replace MCU"
-            ]
-        },
-        "Communication Loss (CAN/RS485)": {
-            "indication": "'Comm Error' message, yellow LED",
-            "causes": [
-                "Faulty communication cable",
-                "Incorrect baud rate"
-            ],
-            "impact": "Module syncing fails",
-            "steps": [
-                "Verify cable connections",
-                "Match communication settings"
-            ]
-        },
-        "Modbus/SCADA Link Down": {
-            "indication": "Icon with red cross, 'Network Lost'",
-            "causes": [
-                "Disconnected network cable",
-                "Transceiver failure"
-            ],
-            "impact": "Remote monitoring inoperative",
-            "steps": [
-                "Replace or reconfigure communication module",
-                "Restart SCADA/PLC systems"
-            ]
-        },
-        "Sensor Data Missing": {
-            "indication": "'No Signal from Sensor' alert",
-            "causes": [
-                "Broken sensor cable",
-                "Sensor powered off"
-            ],
-            "impact": "Incorrect readings and control behavior",
-            "steps": [
-                "Replace or reconnect sensors"
-            ]
-        },
-        "Battery Health Warning": {
-            "indication": "'Battery Health Degraded' or 'Replace Battery Soon'",
-            "causes": [
-                "High internal resistance",
-                "Battery age exceeds threshold"
-            ],
-            "impact": "Reduced backup time",
-            "steps": [
-                "Replace battery"
-            ]
-        },
-        "Maintenance Due Reminder": {
-            "indication": "Wrench icon, message: 'Service Due'",
-            "causes": [
-                "Predefined service interval reached"
-            ],
-            "impact": "Potential for future failures",
-            "steps": [
-                "Perform full system check",
-                "Log service activity and reset maintenance timer"
-            ]
-        }
-    }
-    
-    return pms_categories, error_codes, error_details
+# Common troubleshooting procedures dictionary (shared, read-only)
+common_procedures = COMMON_PROCEDURES
+
+# Procedure plan for a PMS error category, built once and shared across reruns and sessions
+@st.cache_resource
+def get_pms_plan(selected_category):
+    # Determine which procedures to show based on selected error
+    related_procedures = []
 
-# Common troubleshooting procedures dictionary
-common_procedures = {
-    "power_cycle": {
-        "title": "Power Cycling Procedure",
-        "steps": [
-            "Ensure the machine is safe to restart",
-            "Power off the machine using the main power switch",
-            "Wait 30 seconds for capacitors to discharge",
-            "Turn the machine back on and observe the boot sequence",
-            "Check if the alarm persists after restart"
-        ]
-    },
-    "system_check": {
-        "title": "System Diagnostic Check",
-        "steps": [
-            "Enter diagnostic mode (if applicable)",
-            "Run system self-test",
-            "Check for error codes or messages",
-            "Verify sensor readings against normal ranges",
-            "Document all abnormal values"
-        ]
-    },
-    "connections_check": {
-        "title": "Connection Verification",
-        "steps": [
-            "Inspect all cable connections",
-            "Check for loose or damaged connectors",
-            "Verify proper seating of all modular components",
-            "Test continuity of suspect cables with multimeter",
-            "Clean connectors if needed"
-        ]
-    },
-    "safety_systems": {
-        "title": "Safety Systems Check",
-        "steps": [
-            "Verify safety systems are functioning",
-            "Test alarm functionality",
-            "Check sensor calibration",
-            "Verify bypass mechanisms work correctly",
-            "Ensure all indicators and displays function properly"
-        ]
-    }
-}
+    if selected_category == "Power Supply Errors":
+        related_procedures.append("power_cycle")
+        related_procedures.append("connections_check")
+
+    elif selected_category == "Temperature-Related Errors":
+        related_procedures.append("system_check")
+        related_procedures.append("connections_check")
+
+    elif selected_category == "Current & Load-Related Errors":
+        related_procedures.append("power_cycle")
+        related_procedures.append("system_check")
+
+    elif selected_category == "System Control & Communication Errors":
+        related_procedures.append("power_cycle")
+        related_procedures.append("connections_check")
+
+    elif selected_category == "Network/Remote Monitoring Errors":
+        related_procedures.append("connections_check")
+        related_procedures.append("system_check")
+
+    else:
+        related_procedures.append("system_check")
+        related_procedures.append("safety_systems")
+
+    # Add safety check for all procedures
+    if "safety_systems" not in related_procedures:
+        related_procedures.append("safety_systems")
+    
+    return ProcedurePlan(related_procedures, common_procedures)
 
 def show_pms_troubleshooting():
     st.markdown("""
@@ -348,8 +136,8 @@ def show_pms_troubleshooting():
     </div>
     """, unsafe_allow_html=True)
     
-    # Load PMS data
-    pms_categories, error_codes, error_details = load_pms_data()
+    # PMS catalogue, queried from the knowledge store as needed
+    store = get_knowledge_store()
     
     # Sidebar for navigation
     with st.sidebar:
@@ -383,7 +171,7 @@ def show_pms_troubleshooting():
     st.markdown("### 1️⃣ Select Error Category")
     selected_category = st.selectbox(
         "Choose the error category:",
-        list(pms_categories.keys()),
+        store.categories("PMS"),
         index=0,
         key="category_select"
     )
@@ -392,13 +180,17 @@ def show_pms_troubleshooting():
     st.markdown("### 2️⃣ Select Specific Error")
     selected_error = st.selectbox(
         "Choose the specific error:",
-        pms_categories[selected_category],
+        store.alarms("PMS", selected_category),
         index=0,
         key="error_select"
     )
     
+    # Record the selected alarm in the event log
+    log_selection("PMS", selected_category, selected_error)
+    
     # Display error details
-    if selected_error in error_details:
+    details = store.details("PMS", selected_category, selected_error)
+    if details is not None:
         st.markdown("### 3️⃣ Error Details")
         
         # Create a glowing box for the error name
@@ -407,118 +199,88 @@ def show_pms_troubleshooting():
             <div class="glow"></div>
             <div class="content">
                 <h3>{selected_error}</h3>
-                <p><strong>Indication:</strong> {error_details[selected_error]['indication']}</p>
+                <p><strong>Indication:</strong> {details.indication}</p>
             </div>
         </div>
         """, unsafe_allow_html=True)
         
         # Display causes in collapsible section
         with st.expander("Possible Causes"):
-            for cause in error_details[selected_error]['causes']:
+            for cause in details.causes:
                 st.markdown(f"- {cause}")
         
         # Display impact
-        st.markdown(f"**Impact:** {error_details[selected_error]['impact']}")
+        st.markdown(f"**Impact:** {details.impact}")
         
         # Display steps
         st.markdown("### 4️⃣ Troubleshooting Steps")
-        for i, step in enumerate(error_details[selected_error]['steps'], 1):
-            # Animate the appearance of each step
-            with st.empty():
-                time.sleep(0.1)  # Small delay for animation effect
-                st.markdown(f"""
-                <div class="step-box animated-step">
-                    <div class="step-number">Step {i}</div>
-                    <div class="step-content">{step}</div>
-                </div>
-                """, unsafe_allow_html=True)
+        # Optionally put the steps that most often fixed this alarm first
+        steps = details.steps
+        if st.toggle("Most likely fix first", key="fix_first", help="Order the steps by how often each one was reported as the fix"):
+            steps = get_resolution_stats().ordered_steps("PMS", selected_category, selected_error, steps)
+        # Steps are revealed one after another by the CSS animation delay
+        render_step_list("PMS", selected_error, steps, STEP_REVEAL_DELAY)
         
         # Interactive troubleshooting
         st.markdown("---")
         show_detailed = st.checkbox("Show interactive troubleshooting guide", value=False)
         
         if show_detailed:
-            # Determine which procedures to show based on selected error
-            related_procedures = []
-            
-            if selected_category == "Power Supply Errors":
-                related_procedures.append("power_cycle")
-                related_procedures.append("connections_check")
-            
-            elif selected_category == "Temperature-Related Errors":
-                related_procedures.append("system_check")
-                related_procedures.append("connections_check")
-            
-            elif selected_category == "Current & Load-Related Errors":
-                related_procedures.append("power_cycle")
-                related_procedures.append("system_check")
+            # Procedures and their step offsets are computed once per selection
+            plan = get_pms_plan(selected_category)
             
-            elif selected_category == "System Control & Communication Errors":
-                related_procedures.append("power_cycle")
-                related_procedures.append("connections_check")
-            
-            elif selected_category == "Network/Remote Monitoring Errors":
-                related_procedures.append("connections_check")
-                related_procedures.append("system_check")
-            
-            else:
-                related_procedures.append("system_check")
-                related_procedures.append("safety_systems")
-            
-            # Add safety check for all procedures
-            if "safety_systems" not in related_procedures:
-                related_procedures.append("safety_systems")
-            
-            # Progress tracking
-            current_step = st.session_state.get("troubleshoot_step", 0)
-            max_steps = sum([len(common_procedures[p]["steps"]) for p in related_procedures])
+            # Progress tracking (one bitset per machine, alarm and plan)
+            progress = checklist_progress()
+            plan_key = ("PMS", selected_error, plan.procedure_keys)
+            max_steps = plan.total_steps
             
             # Progress bar
-            progress_bar = st.progress(current_step / max_steps if max_steps > 0 else 0)
+            progress_bar = st.progress(plan.progress(progress.completed(plan_key)))
             
             # Show procedure steps with checkboxes
-            overall_step_counter = 0
-            for procedure_key in related_procedures:
-                procedure = common_procedures[procedure_key]
-                
+            for section in plan.sections:
                 st.markdown(f"""
                 <div class="procedure-header">
-                    <h4>{procedure["title"]}</h4>
+                    <h4>{section.title}</h4>
                 </div>
                 """, unsafe_allow_html=True)
                 
-                for i, step in enumerate(procedure["steps"]):
-                    step_key = f"{procedure_key}_step_{i}"
+                for i, step in enumerate(section.steps):
+                    step_index = section.offset + i
+                    step_done = progress.is_done(plan_key, step_index)
                     step_complete = st.checkbox(
                         f"{step}",
-                        key=step_key,
-                        value=overall_step_counter < current_step
+                        key=progress.widget_key(plan_key, step_index),
+                        value=step_done
                     )
                     
-                    # If this checkbox was just checked, increment the step counter
-                    if step_complete and overall_step_counter >= current_step:
-                        st.session_state.troubleshoot_step = overall_step_counter + 1
-                        progress_bar.progress((overall_step_counter + 1) / max_steps)
+                    # If this checkbox was just checked or unchecked, record it
+                    if step_complete != step_done:
+                        progress.mark(plan_key, step_index, step_complete)
+                        log_event("step", "PMS", selected_category, selected_error, step=step_index, text=step, done=step_complete)
+                        progress_bar.progress(plan.progress(progress.completed(plan_key)))
                         
                         # Show a success message for completing a procedure
-                        if overall_step_counter + 1 == sum([len(common_procedures[p]["steps"]) for p in related_procedures[:related_procedures.index(procedure_key)+1]]):
-                            st.success(f"✅ {procedure['title']} completed!")
-                    
-                    overall_step_counter += 1
+                        if step_complete and progress.all_done(plan_key, section.offset, section.end):
+                            st.success(f"✅ {section.title} completed!")
             
             # Final resolution options
-            if current_step >= max_steps:
+            if progress.completed(plan_key) >= max_steps:
                 st.markdown("### 🎯 Issue Resolution")
                 resolution = st.radio(
                     "Did these steps resolve the issue?",
-                    ["Yes, issue resolved", "No, issue persists"],
-                    key="resolution"
+                    ["Select an option", "Yes, issue resolved", "No, issue persists"],
+                    index=0,
+                    key="resolution",
+                    on_change=log_resolution,
+                    args=("resolution", "PMS", selected_category, selected_error)
                 )
                 
                 if resolution == "Yes, issue resolved":
                     st.balloons()
                     st.success("Great job! Please document this repair in the maintenance log.")
-                else:
+                    ask_fixing_step("PMS", selected_category, selected_error, details.steps)
+                elif resolution == "No, issue persists":
                     st.warning("If the issue persists, consider:")
                     st.markdown("""
                     1. Escalating to senior engineer
@@ -528,7 +290,8 @@ def show_pms_troubleshooting():
             
             # Reset button
             if st.button("Reset Troubleshooting Progress"):
-                st.session_state.troubleshoot_step = 0
+                progress.reset(plan_key)
+                log_event("reset", "PMS", selected_category, selected_error)
                 st.rerun()
 
         
@@ -567,7 +330,9 @@ def show_pms_troubleshooting():
 
 # ===== HEMODIALYSIS MACHINE TROUBLESHOOTING =====
 # Function to load Excel data
-@st.cache_data
+# (held once per server process as a read-only resource shared by every
+# session; st.cache_data would hand each caller its own unpickled copy)
+@st.cache_resource
 def load_hemodialysis_data(file_path=None):
     # If no file is provided, create example data
     if file_path is None:
@@ -597,39 +362,51 @@ def load_hemodialysis_data(file_path=None):
         }
         
         sheet_names = list(data_dict.keys())
-        return data_dict, sheet_names
+        return share_knowledge_base(data_dict, sheet_names)
     else:
-        # Load from Excel file
+        # Load from Excel file (via the compiled knowledge-base snapshot)
         try:
-            xls = pd.ExcelFile(file_path)
-            sheet_names = xls.sheet_names
-            data_dict = {}
-            
-            for sheet in sheet_names:
-                if sheet == "States":  # Skip the States sheet
-                    continue
-                df = pd.read_excel(xls, sheet_name=sheet, header=0)
-                # Clean up column names
-                df.columns = [col.strip() if isinstance(col, str) else col for col in df.columns]
-                # Drop empty rows
-                df = df.dropna(how='all')
-                data_dict[sheet] = df
-            
-            return data_dict, sheet_names
+            return share_knowledge_base(*load_knowledge_base(file_path))
         except Exception as e:
             # Return example data if file loading fails
             st.warning(f"Error loading Excel file: {str(e)}. Using example data instead.")
             return load_hemodialysis_data(None)
 
-# Function to get all alarms from a sheet
-def get_alarms_for_sheet(df):
-    alarms = df['Alarms / Reasons'].dropna().unique().tolist()
-    issues = df[df['Alarms / Reasons'] == 'Issues'].index
-    if len(issues) > 0:
-        issue_start = issues[0] + 1
-        additional_issues = df.iloc[issue_start:]['Alarms / Reasons'].dropna().unique().tolist()
-        alarms.extend(additional_issues)
-    return [a for a in alarms if a != 'Issues' and str(a) != 'nan']
+# Function to build the (state, alarm) -> steps lookup once per data load
+@st.cache_resource
+def load_hemodialysis_index(file_path=None):
+    data_dict, _ = load_hemodialysis_data(file_path)
+    return AlarmIndex(data_dict)
+
+# Function to pick the hemodialysis alarms: the workbook states compiled into
+# the knowledge store, or the example data when there is no workbook
+def get_hemodialysis_index():
+    alarm_index = get_knowledge_store().index()
+    if alarm_index.states():
+        return alarm_index
+    return load_hemodialysis_index()
+
+# Procedure plan for a hemodialysis alarm, built once and shared across reruns and sessions
+@st.cache_resource
+def get_hemodialysis_plan(selected_alarm):
+    # Determine which procedures to show based on alarm name (simplified logic)
+    related_procedures = []
+
+    if any(word in selected_alarm.lower() for word in ["pressure", "flow", "leak"]):
+        related_procedures.append("connections_check")
+        related_procedures.append("system_check")
+
+    if any(word in selected_alarm.lower() for word in ["power", "electrical", "display", "system"]):
+        related_procedures.append("power_cycle")
+
+    if any(word in selected_alarm.lower() for word in ["alarm", "safety", "detector", "temp"]):
+        related_procedures.append("safety_systems")
+
+    # If no specific procedures identified, add a default set
+    if not related_procedures:
+        related_procedures = ["connections_check", "system_check", "safety_systems"]
+    
+    return ProcedurePlan(related_procedures, common_procedures)
 
 def show_hemodialysis_troubleshooting():
     st.markdown("""
@@ -670,8 +447,9 @@ def show_hemodialysis_troubleshooting():
     
     # Hemodialysis troubleshooting logic
     try:
-        # Load data (dummy file path since we're using example data)
-        data_dict, sheet_names = load_hemodialysis_data()
+        # Workbook alarms from the knowledge store (example data without a workbook)
+        alarm_index = get_hemodialysis_index()
+        sheet_names = alarm_index.states()
         
         # State selection
         st.markdown("### 1️⃣ Select Machine State")
@@ -683,8 +461,7 @@ def show_hemodialysis_troubleshooting():
         )
         
         # Get alarms for selected sheet
-        df = data_dict[selected_sheet]
-        alarms = get_alarms_for_sheet(df)
+        alarms = alarm_index.alarms(selected_sheet)
         
         if not alarms:
             st.warning("No alarm data found for this state.")
@@ -699,18 +476,13 @@ def show_hemodialysis_troubleshooting():
             key="alarm_select"
         )
         
-        # Find the row with the selected alarm
-        alarm_row = df[df['Alarms / Reasons'] == selected_alarm]
+        # Record the selected alarm in the event log
+        log_selection("workbook", selected_sheet, selected_alarm)
         
-        if alarm_row.empty:
-            # Check if it's in the issues section
-            issues_section = df[df['Alarms / Reasons'] == 'Issues']
-            if not issues_section.empty:
-                issue_start = issues_section.index[0] + 1
-                issue_rows = df.iloc[issue_start:]
-                alarm_row = issue_rows[issue_rows['Alarms / Reasons'] == selected_alarm]
+        # Find the steps for the selected alarm (the Issues section is already folded in)
+        reasons = alarm_index.steps(selected_sheet, selected_alarm)
         
-        if alarm_row.empty:
+        if reasons is None:
             st.error("No troubleshooting information found for this alarm.")
             return
             
@@ -727,28 +499,15 @@ def show_hemodialysis_troubleshooting():
         </div>
         """, unsafe_allow_html=True)
         
-        # Get all reasons (steps)
-        reasons = []
-        for i in range(1, 11):
-            reason_col = f"Reason {i}"
-            if reason_col in alarm_row.columns:
-                reason = alarm_row[reason_col].values[0]
-                if pd.notna(reason):
-                    reasons.append(reason)
-        
         if not reasons:
             st.info("No specific troubleshooting steps documented for this alarm.")
         else:
-            for i, reason in enumerate(reasons, 1):
-                # Animate the appearance of each step
-                with st.empty():
-                    time.sleep(0.3)  # Small delay for animation effect
-                    st.markdown(f"""
-                    <div class="step-box animated-step">
-                        <div class="step-number">Step {i}</div>
-                        <div class="step-content">{reason}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
+            # Optionally put the steps that most often fixed this alarm first
+            steps = reasons
+            if st.toggle("Most likely fix first", key="fix_first", help="Order the steps by how often each one was reported as the fix"):
+                steps = get_resolution_stats().ordered_steps("workbook", selected_sheet, selected_alarm, steps)
+            # Steps are revealed one after another by the CSS animation delay
+            render_step_list("Hemodialysis", (selected_sheet, selected_alarm), steps, HEMO_STEP_REVEAL_DELAY)
             
             # Add some spacing
             st.markdown("<br><br>", unsafe_allow_html=True)
@@ -778,73 +537,61 @@ def show_hemodialysis_troubleshooting():
             </div>
             """, unsafe_allow_html=True)
             
-            # Determine which procedures to show based on alarm name (simplified logic)
-            related_procedures = []
-            
-            if any(word in selected_alarm.lower() for word in ["pressure", "flow", "leak"]):
-                related_procedures.append("connections_check")
-                related_procedures.append("system_check")
-            
-            if any(word in selected_alarm.lower() for word in ["power", "electrical", "display", "system"]):
-                related_procedures.append("power_cycle")
-            
-            if any(word in selected_alarm.lower() for word in ["alarm", "safety", "detector", "temp"]):
-                related_procedures.append("safety_systems")
-            
-            # If no specific procedures identified, add a default set
-            if not related_procedures:
-                related_procedures = ["connections_check", "system_check", "safety_systems"]
+            # Procedures and their step offsets are computed once per selection
+            plan = get_hemodialysis_plan(selected_alarm)
             
-            # Progress tracking
-            current_step = st.session_state.get("troubleshoot_step", 0)
-            max_steps = sum([len(common_procedures[p]["steps"]) for p in related_procedures])
+            # Progress tracking (one bitset per machine, alarm and plan)
+            progress = checklist_progress()
+            plan_key = ("workbook", (selected_sheet, selected_alarm), plan.procedure_keys)
+            max_steps = plan.total_steps
             
             # Progress bar
-            progress_bar = st.progress(current_step / max_steps if max_steps > 0 else 0)
+            progress_bar = st.progress(plan.progress(progress.completed(plan_key)))
             
             # Show procedure steps with checkboxes
-            overall_step_counter = 0
-            for procedure_key in related_procedures:
-                procedure = common_procedures[procedure_key]
-                
+            for section in plan.sections:
                 st.markdown(f"""
                 <div class="procedure-header">
-                    <h4>{procedure["title"]}</h4>
+                    <h4>{section.title}</h4>
                 </div>
                 """, unsafe_allow_html=True)
                 
-                for i, step in enumerate(procedure["steps"]):
-                    step_key = f"{procedure_key}_step_{i}"
+                for i, step in enumerate(section.steps):
+                    step_index = section.offset + i
+                    step_done = progress.is_done(plan_key, step_index)
                     step_complete = st.checkbox(
                         f"{step}",
-                        key=step_key,
-                        value=overall_step_counter < current_step
+                        key=progress.widget_key(plan_key, step_index),
+                        value=step_done
                     )
                     
-                    # If this checkbox was just checked, increment the step counter
-                    if step_complete and overall_step_counter >= current_step:
-                        st.session_state.troubleshoot_step = overall_step_counter + 1
-                        progress_bar.progress((overall_step_counter + 1) / max_steps)
+                    # If this checkbox was just checked or unchecked, record it
+                    if step_complete != step_done:
+                        progress.mark(plan_key, step_index, step_complete)
+                        log_event("step", "workbook", selected_sheet, selected_alarm, step=step_index, text=step, done=step_complete)
+                        progress_bar.progress(plan.progress(progress.completed(plan_key)))
                         
                         # Show a success message for completing a procedure
-                        if overall_step_counter + 1 == sum([len(common_procedures[p]["steps"]) for p in related_procedures[:related_procedures.index(procedure_key)+1]]):
-                            st.success(f"✅ {procedure['title']} completed!")
-                    
-                    overall_step_counter += 1
+                        if step_complete and progress.all_done(plan_key, section.offset, section.end):
+                            st.success(f"✅ {section.title} completed!")
             
             # Final resolution options
-            if current_step >= max_steps:
+            if progress.completed(plan_key) >= max_steps:
                 st.markdown("### 🎯 Issue Resolution")
                 resolution = st.radio(
                     "Did these steps resolve the issue?",
-                    ["Yes, issue resolved", "No, issue persists"],
-                    key="resolution"
+                    ["Select an option", "Yes, issue resolved", "No, issue persists"],
+                    index=0,
+                    key="resolution",
+                    on_change=log_resolution,
+                    args=("resolution", "workbook", selected_sheet, selected_alarm)
                 )
                 
                 if resolution == "Yes, issue resolved":
                     st.balloons()
                     st.success("Great job! Please document this repair in the maintenance log.")
-                else:
+                    ask_fixing_step("workbook", selected_sheet, selected_alarm, reasons)
+                elif resolution == "No, issue persists":
                     st.warning("If the issue persists, consider:")
                     st.markdown("""
                     1. Escalating to senior technician
@@ -854,7 +601,8 @@ def show_hemodialysis_troubleshooting():
             
             # Reset button
             if st.button("Reset Troubleshooting Progress"):
-                st.session_state.troubleshoot_step = 0
+                progress.reset(plan_key)
+                log_event("reset", "workbook", selected_sheet, selected_alarm)
                 st.rerun()
 
         
@@ -895,194 +643,6 @@ def show_hemodialysis_troubleshooting():
 
 # ===== MAIN APP LOGIC =====
 def main():
-    # Apply custom styling
-    st.markdown("""
-    <style>
-    .main-header {
-        text-align: center;
-        padding: 20px;
-        margin-bottom: 30px;
-        background: linear-gradient(to right, #4e54c8, #8f94fb);
-        border-radius: 10px;
-        color: white;
-    }
-    
-    .subheader {
-        font-size: 1.2em;
-        opacity: 0.9;
-    }
-    
-    .machine-selection {
-        display: flex;
-        flex-direction: column;
-        gap: 20px;
-    }
-    
-    .machine-card {
-        background: #fff;
-        border-radius: 10px;
-        padding: 20px;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-        transition: transform 0.3s, box-shadow 0.3s;
-        cursor: pointer;
-        margin-bottom: 20px;
-    }
-    
-    .machine-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 10px 20px rgba(0,0,0,0.15);
-    }
-    
-    .machine-card img {
-        width: 100%;
-        height: 200px;
-        object-fit: cover;
-        border-radius: 5px;
-        margin-bottom: 15px;
-    }
-    
-    .machine-card h3 {
-        color: #333;
-        margin-bottom: 10px;
-    }
-    
-    .machine-card p {
-        color: #666;
-        font-size: 0.9em;
-    }
-    
-    .footer {
-        text-align: center;
-        padding: 20px;
-        margin-top: 40px;
-        color: #888;
-        font-size: 0.8em;
-    }
-    
-    .glowing-box {
-        position: relative;
-        border-radius: 10px;
-        padding: 20px;
-        margin-bottom: 20px;
-        background: rgba(255, 255, 255, 0.1);
-        box-shadow: 0 0 15px rgba(78, 84, 200, 0.5);
-        overflow: hidden;
-    }
-    
-    .glow {
-        position: absolute;
-        width: 100%;
-        height: 100%;
-        top: 0;
-        left: 0;
-        background: linear-gradient(45deg, rgba(78, 84, 200, 0.3), rgba(143, 148, 251, 0.3));
-        z-index: -1;
-        animation: pulse 2s infinite;
-    }
-    
-    @keyframes pulse {
-        0% {
-            opacity: 0.5;
-        }
-        50% {
-            opacity: 0.8;
-        }
-        100% {
-            opacity: 0.5;
-        }
-    }
-    
-    .content {
-        position: relative;
-        z-index: 1;
-    }
-    
-    .step-box {
-        display: flex;
-        background: #f8f9fa;
-        border-radius: 8px;
-        padding: 12px;
-        margin-bottom: 10px;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-    }
-    
-    .step-number {
-        background: #4e54c8;
-        color: white;
-        padding: 8px 12px;
-        border-radius: 6px;
-        margin-right: 15px;
-        font-weight: 600;
-        min-width: 80px;
-        text-align: center;
-    }
-    
-    .step-content {
-        flex: 1;
-        padding: 8px 0;
-    }
-    
-    .animated-step {
-        animation: fadeIn 0.5s ease-in-out;
-    }
-    
-    @keyframes fadeIn {
-        from {
-            opacity: 0;
-            transform: translateY(10px);
-        }
-        to {
-            opacity: 1;
-            transform: translateY(0);
-        }
-    }
-    
-    .procedure-header {
-        background: #eef2ff;
-        padding: 10px 15px;
-        border-radius: 6px;
-        margin: 15px 0 10px 0;
-    }
-    
-    .sidebar-section {
-        background: #f8f9fa;
-        padding: 15px;
-        border-radius: 8px;
-        margin-bottom: 20px;
-    }
-    
-    .notes-box {
-        background: #fff9db;
-        border-left: 4px solid #ffd43b;
-        padding: 15px;
-        border-radius: 0 8px 8px 0;
-    }
-    
-    .animated-notes {
-        animation: slideIn 0.7s ease-in-out;
-    }
-    
-    @keyframes slideIn {
-        from {
-            opacity: 0;
-            transform: translateX(-20px);
-        }
-        to {
-            opacity: 1;
-            transform: translateX(0);
-        }
-    }
-    
-    .interactive-header {
-        background: linear-gradient(to right, #3a7bd5, #00d2ff);
-        padding: 15px;
-        border-radius: 8px;
-        color: white;
-        margin: 20px 0;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-    
     # Check which machine is selected
     if st.session_state.machine_selected is None:
         show_machine_selection()
@@ -0,0 +1,290 @@
+import argparse
+import math
+import random
+import time
+from collections import OrderedDict, namedtuple
+
+# Predictive failure scoring of PMS units from their streamed telemetry.
+#
+# Units report their signals as TELEMETRY records (through the fleet
+# gateway, fleet_gateway.py):
+#
+#   2025-03-01T10:15:02.123 PMS-04 TELEMETRY battery_v=13.41 temp_c=36.2 imbalance_pct=2.1 run_h=1520
+#
+# Each signal of each unit keeps exponentially weighted statistics (mean,
+# variance, and the slope of a weighted linear fit against time), updated
+# in O(1) per sample. They score the two predictive alerts of the PMS
+# catalogue, 0 (healthy) to 1 (failing):
+#
+#   Battery Health Warning    battery voltage trending to the low-battery
+#                             limit within HORIZON_H, or noisy (a sign of
+#                             high internal resistance)
+#   Maintenance Due Reminder  temperature or current imbalance trending to
+#                             their limits within HORIZON_H, or the service
+#                             interval nearly reached
+#
+# An alert is raised when its score reaches RAISE_SCORE and raised again
+# only after it fell below CLEAR_SCORE.
+#
+#   python pms_health.py --units 1000 --hours 4   # simulated fleet, accelerated
+
+CATEGORY = "Maintenance & Predictive Alerts"
+BATTERY_WARNING = "Battery Health Warning"
+MAINTENANCE_DUE = "Maintenance Due Reminder"
+
+# Limits the trends are projected to: E01 Low Battery, E03 Over Temperature
+# and the imbalance at which Current Imbalance is reported
+LOW_BATTERY_V = 11.8
+OVER_TEMPERATURE_C = 60.0
+MAX_IMBALANCE_PCT = 10.0
+# Battery voltage noise (standard deviation) from healthy to failing
+BATTERY_NOISE_V = (0.05, 0.25)
+SERVICE_INTERVAL_H = 4000.0
+# Run hours before the service interval that the reminder ramps up over
+SERVICE_NOTICE_H = 100.0
+
+# Hours ahead a limit must be projected to be reached to raise the score
+HORIZON_H = 24.0
+# Time constant of the statistics, in seconds
+WINDOW = 600.0
+# Seconds of telemetry of a unit before it is scored with the default
+# window (trends over less than a window are mostly noise)
+WARMUP = WINDOW
+RAISE_SCORE = 0.7
+CLEAR_SCORE = 0.4
+MAX_UNITS = 4096
+
+SIGNALS = ("battery_v", "temp_c", "imbalance_pct")
+
+# timestamp as given to update(); machine is the unit id; text the reason
+PmsAlert = namedtuple("PmsAlert", ["timestamp", "machine", "category", "error", "score", "text"])
+
+
+# Exponentially weighted mean, variance and trend of one signal. Weights
+# decay with time (not sample count), so irregular sampling is fine; the
+# first samples are averaged plainly until the window takes over.
+class SignalStats:
+    __slots__ = ("window", "samples", "time", "mean", "var", "time_mean", "time_var", "cov")
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.samples = 0
+        self.time = self.mean = self.var = 0.0
+        self.time_mean = self.time_var = self.cov = 0.0
+
+    def update(self, t, x):
+        self.samples += 1
+        if self.samples == 1:
+            self.time = self.time_mean = t
+            self.mean = x
+            return
+        alpha = max(1 - math.exp(-max(t - self.time, 0.0) / self.window), 1 / self.samples)
+        dt = t - self.time_mean
+        dx = x - self.mean
+        self.time = t
+        self.time_mean += alpha * dt
+        self.mean += alpha * dx
+        self.time_var = (1 - alpha) * (self.time_var + alpha * dt * dt)
+        self.var = (1 - alpha) * (self.var + alpha * dx * dx)
+        self.cov = (1 - alpha) * (self.cov + alpha * dt * dx)
+
+    # Change per second of the weighted linear fit
+    @property
+    def slope(self):
+        return self.cov / self.time_var if self.time_var > 0 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
+
+    # Value of the fit at the latest sample (the mean lags behind a trend)
+    @property
+    def level(self):
+        return self.mean + self.slope * (self.time - self.time_mean)
+
+    # (risk, hours) of the fit reaching limit, rising or falling to it;
+    # risk grows from 0 at horizon_h hours away to 1 at the limit
+    def risk(self, limit, rising, horizon_h=HORIZON_H):
+        gap = limit - self.level if rising else self.level - limit
+        if gap <= 0:
+            return 1.0, 0.0
+        rate = self.slope if rising else -self.slope
+        if rate <= 0:
+            return 0.0, math.inf
+        hours = gap / rate / 3600
+        return max(0.0, 1 - hours / horizon_h), hours
+
+
+class _Unit:
+    __slots__ = ("signals", "first", "latest", "run_hours", "raised")
+
+    def __init__(self, window, t):
+        self.signals = {name: SignalStats(window) for name in SIGNALS}
+        self.first = self.latest = t
+        self.run_hours = None
+        self.raised = set()
+
+
+# Scores the units of a PMS fleet as their telemetry arrives
+class PmsHealthScorer:
+    def __init__(self, horizon_h=HORIZON_H, window=WINDOW, max_units=MAX_UNITS):
+        self.horizon_h = horizon_h
+        self.window = window
+        # Seconds of telemetry of a unit before it is scored: one window
+        self.warmup = window
+        self.max_units = max_units
+        # unit id -> _Unit, least recently reporting first
+        self._units = OrderedDict()
+
+    # Add a sample of a unit (readings by signal name, any subset) taken at
+    # t seconds; returns the alerts it raises
+    def update(self, unit, t, readings, timestamp=None):
+        state = self._units.get(unit)
+        if state is None:
+            state = self._units[unit] = _Unit(self.window, t)
+            if len(self._units) > self.max_units:
+                self._units.popitem(last=False)
+        else:
+            self._units.move_to_end(unit)
+        for name, value in readings.items():
+            stats = state.signals.get(name)
+            if stats is not None:
+                stats.update(t, value)
+        state.run_hours = readings.get("run_h", state.run_hours)
+        state.latest = t
+        if t - state.first < self.warmup:
+            return []
+
+        alerts = []
+        for error, (score, reason) in self._score(state).items():
+            if score >= RAISE_SCORE and error not in state.raised:
+                state.raised.add(error)
+                alerts.append(PmsAlert(timestamp if timestamp is not None else t, unit, CATEGORY, error, score, reason))
+            elif score < CLEAR_SCORE:
+                state.raised.discard(error)
+        return alerts
+
+    # {error: (score, reason)} of a unit, or None before it is warmed up
+    def scores(self, unit):
+        state = self._units.get(unit)
+        if state is None or state.latest - state.first < self.warmup:
+            return None
+        return self._score(state)
+
+    def _score(self, state):
+        battery = state.signals["battery_v"]
+        temperature = state.signals["temp_c"]
+        imbalance = state.signals["imbalance_pct"]
+
+        candidates = []
+        if battery.samples:
+            risk, hours = battery.risk(LOW_BATTERY_V, rising=False, horizon_h=self.horizon_h)
+            candidates.append((risk, f"battery {battery.level:.2f} V, low-battery limit in {_hours(hours)}"))
+            low, high = BATTERY_NOISE_V
+            noise = min(max((battery.std - low) / (high - low), 0.0), 1.0)
+            candidates.append((noise, f"battery voltage unstable (±{battery.std:.2f} V)"))
+        battery_score = max(candidates, default=(0.0, ""))
+
+        candidates = []
+        if temperature.samples:
+            risk, hours = temperature.risk(OVER_TEMPERATURE_C, rising=True, horizon_h=self.horizon_h)
+            candidates.append((risk, f"temperature {temperature.level:.1f} °C, over-temperature in {_hours(hours)}"))
+        if imbalance.samples:
+            risk, hours = imbalance.risk(MAX_IMBALANCE_PCT, rising=True, horizon_h=self.horizon_h)
+            candidates.append((risk, f"current imbalance {imbalance.level:.1f} %, limit in {_hours(hours)}"))
+        if state.run_hours is not None:
+            due = SERVICE_INTERVAL_H - state.run_hours
+            candidates.append((min(max(1 - due / SERVICE_NOTICE_H, 0.0), 1.0),
+                               f"{state.run_hours:.0f} run hours, service due at {SERVICE_INTERVAL_H:.0f}"))
+        maintenance_score = max(candidates, default=(0.0, ""))
+
+        return {BATTERY_WARNING: battery_score, MAINTENANCE_DUE: maintenance_score}
+
+
+def _hours(hours):
+    if hours == 0:
+        return "reached"
+    return f"~{hours:.0f} h" if hours < math.inf else "no trend"
+
+
+# Readings of a TELEMETRY record's "name=value" fields; others are skipped
+def parse_telemetry(text):
+    readings = {}
+    for field in text.split():
+        name, _, value = field.partition("=")
+        try:
+            readings[name] = float(value)
+        except ValueError:
+            continue
+    return readings
+
+
+def format_telemetry(readings):
+    return " ".join(f"{name}={value:.2f}" for name, value in readings.items())
+
+
+# ===== SIMULATED UNITS =====
+# Readings of a simulated PMS unit, one per second from its start. With
+# probability degrading it starts to fail within its first hour: its battery
+# sags and gets noisy, or it runs hot with a growing current imbalance.
+def simulated_unit(seed=None, degrading=0.05):
+    rng = random.Random(seed)
+    voltage = rng.gauss(13.5, 0.1)
+    temperature = rng.gauss(35.0, 3.0)
+    imbalance = abs(rng.gauss(2.0, 1.0))
+    run_hours = rng.uniform(0, SERVICE_INTERVAL_H)
+    fault = rng.choice(["battery", "thermal"]) if rng.random() < degrading else None
+    onset = rng.uniform(0, 3600)
+    # Per second, once failing
+    voltage_drift = -rng.uniform(0.5, 2.0) / 3600
+    temperature_drift = rng.uniform(3.0, 10.0) / 3600
+    imbalance_drift = rng.uniform(0.5, 3.0) / 3600
+    noise = BATTERY_NOISE_V[0] / 2
+    second = 0
+    while True:
+        failing = max(second - onset, 0) if fault is not None else 0
+        if fault == "battery":
+            v = voltage + voltage_drift * failing
+            v_noise = noise * (1 + failing / 1800)
+            t, i = temperature, imbalance
+        elif fault == "thermal":
+            v, v_noise = voltage, noise
+            t = temperature + temperature_drift * failing
+            i = imbalance + imbalance_drift * failing
+        else:
+            v, v_noise, t, i = voltage, noise, temperature, imbalance
+        yield {
+            "battery_v": rng.gauss(v, v_noise),
+            "temp_c": rng.gauss(t, 0.3),
+            "imbalance_pct": max(rng.gauss(i, 0.3), 0.0),
+            "run_h": run_hours + second / 3600,
+        }
+        second += 1
+
+
+# Samples of a simulated fleet of units ("PMS-0001", ...), each reporting
+# once a second: lists of (unit, t, readings), one list per second
+def simulated_fleet(units, seed=0, degrading=0.05, start=0.0):
+    fleet = [(f"PMS-{i:04d}", simulated_unit(seed + i, degrading)) for i in range(1, units + 1)]
+    second = 0
+    while True:
+        yield [(unit, start + second, next(readings)) for unit, readings in fleet]
+        second += 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a simulated PMS fleet for predictive maintenance alerts")
+    parser.add_argument("--units", type=int, default=1000)
+    parser.add_argument("--hours", type=float, default=4.0, help="simulated hours, run as fast as possible")
+    args = parser.parse_args()
+
+    scorer = PmsHealthScorer()
+    start = time.perf_counter()
+    for second, samples in enumerate(simulated_fleet(args.units)):
+        if second >= args.hours * 3600:
+            break
+        for unit, t, readings in samples:
+            for alert in scorer.update(unit, t, readings):
+                print(f"{t / 3600:5.2f} h {alert.machine}: {alert.error} ({alert.score:.2f}) - {alert.text}")
+    seconds = time.perf_counter() - start
+    print(f"{args.units} units x {args.hours * 3600:.0f} s scored in {seconds:.1f} s")
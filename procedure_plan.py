@@ -0,0 +1,39 @@
+from collections import namedtuple
+
+# One procedure inside a plan: its steps occupy the global step indices
+# offset .. end - 1 of the interactive checklist
+PlanSection = namedtuple("PlanSection", ["key", "title", "steps", "offset", "end"])
+
+
+# Ordered list of troubleshooting procedures with precomputed step offsets.
+#
+# The interactive guides used to work out each checkbox's global index with
+# sum(len(...) for p in related_procedures[:related_procedures.index(p)])
+# inside the step loop. A plan does that once, so rendering is linear in the
+# number of steps. Plans are immutable and are cached per selection by the
+# pages (st.cache_resource), i.e. shared by every rerun and session.
+class ProcedurePlan:
+    def __init__(self, procedure_keys, procedures):
+        sections = []
+        offset = 0
+        for key in procedure_keys:
+            procedure = procedures[key]
+            steps = tuple(procedure["steps"])
+            sections.append(PlanSection(key, procedure["title"], steps, offset, offset + len(steps)))
+            offset += len(steps)
+        self.sections = tuple(sections)
+        self.total_steps = offset
+
+    @property
+    def procedure_keys(self):
+        return tuple(section.key for section in self.sections)
+
+    def __len__(self):
+        return self.total_steps
+
+    def __iter__(self):
+        return iter(self.sections)
+
+    # Fraction of the plan completed once `completed` steps are checked
+    def progress(self, completed):
+        return min(completed, self.total_steps) / self.total_steps if self.total_steps > 0 else 0
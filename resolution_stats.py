@@ -0,0 +1,226 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+import streamlit as st
+
+from event_log import EVENT_LOG_PATH, get_event_log
+
+# Which troubleshooting step fixes an alarm most often, from the event log.
+#
+# Each (machine, category, alarm) keeps how often it was reported resolved
+# or persisting and, per step, how often that step was named as the fix.
+# The steps are kept ranked by fix count: a fix moves its step to the
+# front of the block of steps with the same count (the LFU bucket trick),
+# so every event is applied in O(1) and reads never sort.
+#
+# The counters are a view of the log: refresh() applies the lines appended
+# since the last byte offset read. Counters and offset are checkpointed to
+# CHECKPOINT_PATH every CHECKPOINT_INTERVAL seconds, so a restart replays
+# only the tail of the log. RESOLUTION_STATS_PATH in the environment
+# overrides the checkpoint path.
+
+CHECKPOINT_PATH = os.path.abspath(os.environ.get("RESOLUTION_STATS_PATH", "resolution_stats.json"))
+CHECKPOINT_INTERVAL = 60.0
+CHECKPOINT_VERSION = 1
+
+RESOLVED = ("Yes, issue resolved", "Issue resolved")
+PERSISTS = ("No, issue persists",)
+
+logger = logging.getLogger(__name__)
+
+
+class AlarmStats:
+    __slots__ = ("resolved", "persists", "fixes", "_ranking", "_position", "_block_start", "_ordered")
+
+    def __init__(self):
+        self.resolved = 0
+        self.persists = 0
+        # step text -> times named as the fix
+        self.fixes = {}
+        # steps by fix count, highest first; position of each step in it;
+        # index of the first step of each count
+        self._ranking = []
+        self._position = {}
+        self._block_start = {}
+        # (steps, ordered steps) of the last ordered() call
+        self._ordered = None
+
+    def add_fix(self, step):
+        count = self.fixes.get(step)
+        if count is None:
+            count = self.fixes[step] = 0
+            self._position[step] = len(self._ranking)
+            self._ranking.append(step)
+            self._block_start.setdefault(0, len(self._ranking) - 1)
+
+        # Swap the step to the front of its count block, which then shrinks
+        # by one and the block above grows by one
+        pos = self._position[step]
+        start = self._block_start[count]
+        other = self._ranking[start]
+        self._ranking[pos], self._ranking[start] = other, step
+        self._position[other], self._position[step] = pos, start
+        if start + 1 < len(self._ranking) and self.fixes[self._ranking[start + 1]] == count:
+            self._block_start[count] = start + 1
+        else:
+            del self._block_start[count]
+        self.fixes[step] = count + 1
+        self._block_start.setdefault(count + 1, start)
+        self._ordered = None
+
+    # Steps named as fixes, most often first
+    def ranking(self):
+        return tuple(self._ranking)
+
+    # steps with the fixes first, most often first, then the rest in their given order
+    def ordered(self, steps):
+        memo = self._ordered
+        if memo is not None and memo[0] == steps:
+            return memo[1]
+        present = set(steps)
+        first = [step for step in self._ranking if step in present]
+        ranked = set(first)
+        ordered = tuple(first) + tuple(step for step in steps if step not in ranked)
+        self._ordered = (steps, ordered)
+        return ordered
+
+    def to_json(self):
+        return {"resolved": self.resolved, "persists": self.persists,
+                "fixes": [[step, self.fixes[step]] for step in self._ranking]}
+
+    @classmethod
+    def from_json(cls, data):
+        stats = cls()
+        stats.resolved = data["resolved"]
+        stats.persists = data["persists"]
+        for i, (step, count) in enumerate(data["fixes"]):
+            stats.fixes[step] = count
+            stats._position[step] = i
+            stats._ranking.append(step)
+            stats._block_start.setdefault(count, i)
+        return stats
+
+
+class ResolutionStats:
+    def __init__(self, log_path=EVENT_LOG_PATH, checkpoint_path=CHECKPOINT_PATH,
+                 checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.log_path = os.path.abspath(log_path)
+        self.checkpoint_path = os.path.abspath(checkpoint_path)
+        self.checkpoint_interval = checkpoint_interval
+        # (machine, category, alarm) -> AlarmStats
+        self._alarms = {}
+        # Bytes of the log applied so far
+        self.offset = 0
+        self._lock = threading.RLock()
+        self._last_checkpoint = time.monotonic()
+        self._dirty = False
+
+    def _alarm(self, key):
+        stats = self._alarms.get(key)
+        if stats is None:
+            stats = self._alarms[key] = AlarmStats()
+        return stats
+
+    # Count one event of the log; other events than resolutions and fixes are ignored
+    def apply(self, event):
+        kind = event.get("event")
+        if kind not in ("resolution", "fix"):
+            return
+        key = (event.get("machine"), event.get("category"), event.get("alarm"))
+        if kind == "fix":
+            if event.get("text") is None:
+                return
+            self._alarm(key).add_fix(event["text"])
+        elif event.get("outcome") in RESOLVED:
+            self._alarm(key).resolved += 1
+        elif event.get("outcome") in PERSISTS:
+            self._alarm(key).persists += 1
+        else:
+            return
+        self._dirty = True
+
+    # Apply the complete lines appended to the log since the last call
+    def refresh(self):
+        with self._lock:
+            try:
+                with open(self.log_path, "rb") as f:
+                    f.seek(0, os.SEEK_END)
+                    if f.tell() < self.offset:
+                        # The log was truncated or replaced: start over
+                        logger.warning("%s is shorter than the checkpoint, recounting", self.log_path)
+                        self._alarms = {}
+                        self.offset = 0
+                    f.seek(self.offset)
+                    data = f.read()
+            except FileNotFoundError:
+                return
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                try:
+                    self.apply(json.loads(line))
+                except ValueError:
+                    continue
+            self.offset += end
+            if self._dirty and time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+                self.checkpoint()
+
+    def counts(self, machine, category, alarm):
+        with self._lock:
+            return self._alarms.get((machine, category, alarm))
+
+    # Function to order an alarm's steps most-likely-fix first
+    def ordered_steps(self, machine, category, alarm, steps):
+        steps = tuple(steps)
+        with self._lock:
+            stats = self._alarms.get((machine, category, alarm))
+            return steps if stats is None else stats.ordered(steps)
+
+    # Write counters and log offset atomically
+    def checkpoint(self):
+        with self._lock:
+            data = {
+                "version": CHECKPOINT_VERSION,
+                "offset": self.offset,
+                "alarms": [[*key, stats.to_json()] for key, stats in self._alarms.items()],
+            }
+            tmp_path = self.checkpoint_path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.checkpoint_path)
+            except OSError:
+                logger.warning("Writing %s failed", self.checkpoint_path, exc_info=True)
+                return
+            self._last_checkpoint = time.monotonic()
+            self._dirty = False
+
+    # Start from the last checkpoint; a missing or unreadable one counts the whole log
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != CHECKPOINT_VERSION:
+                return False
+            alarms = {(m, c, a): AlarmStats.from_json(s) for m, c, a, s in data["alarms"]}
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        with self._lock:
+            self._alarms = alarms
+            self.offset = data["offset"]
+        return True
+
+
+# Function to load the statistics once per server process. They follow the
+# event log: its writer thread refreshes them after every batch written.
+@st.cache_resource
+def get_resolution_stats():
+    stats = ResolutionStats()
+    stats.load_checkpoint()
+    stats.refresh()
+    get_event_log().add_listener(stats.refresh)
+    atexit.register(stats.checkpoint)
+    return stats
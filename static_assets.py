@@ -0,0 +1,122 @@
+import hashlib
+import os
+import re
+import tempfile
+from collections import namedtuple
+
+import streamlit as st
+
+# Stylesheet pipeline for the Streamlit pages.
+#
+# Streamlit re-sends every element on every rerun, so a <style> block with
+# the whole stylesheet inline costs kilobytes per interaction (plus a file
+# read). Instead the page CSS is combined, minified and written once per
+# process as static/<name>.<content hash>.css; each rerun then only sends a
+# one-line @import of that URL, which the browser fetches once and caches.
+# Without Streamlit's static file serving (server.enableStaticServing) the
+# minified CSS is inlined instead, read from the same in-memory cache.
+
+ASSET_ROOT = os.path.dirname(os.path.abspath(__file__))
+# Served by Streamlit at app/static/ for scripts living in ASSET_ROOT
+STATIC_DIR = os.path.join(ASSET_ROOT, "static")
+STATIC_URL = "app/static"
+HASH_LENGTH = 12
+
+# css:  minified stylesheet text
+# href: URL of the hashed static copy, or None if it could not be written
+Stylesheet = namedtuple("Stylesheet", ["css", "href", "digest"])
+
+# Quoted strings are copied verbatim; everything else is minified
+_CSS_TOKENS = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|([^"'/]+|/)""", re.S)
+_SPACE = re.compile(r"\s+")
+_AROUND_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+_AFTER_COLON = re.compile(r":\s+")
+
+
+def _minify_text(text):
+    text = _SPACE.sub(" ", text)
+    text = _AROUND_PUNCTUATION.sub(r"\1", text)
+    # Only after the colon: "a :hover" and "a:hover" are different selectors
+    return _AFTER_COLON.sub(":", text)
+
+
+def minify_css(css):
+    parts = []
+    pending = []
+    for string, comment, text in _CSS_TOKENS.findall(css):
+        if string:
+            parts.append(_minify_text("".join(pending)))
+            parts.append(string)
+            pending = []
+        elif comment:
+            pending.append(" ")
+        else:
+            pending.append(text)
+    parts.append(_minify_text("".join(pending)))
+    return "".join(parts).replace(";}", "}").strip()
+
+
+def _write_static(name, digest, css, static_dir):
+    os.makedirs(static_dir, exist_ok=True)
+    file_name = f"{name}.{digest}.css"
+    target = os.path.join(static_dir, file_name)
+    if not os.path.exists(target):
+        fd, tmp_path = tempfile.mkstemp(prefix=".css-", dir=static_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(css)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    # Older builds of the same stylesheet are no longer referenced
+    for stale in os.listdir(static_dir):
+        if stale != file_name and stale.startswith(name + ".") and stale.endswith(".css"):
+            try:
+                os.remove(os.path.join(static_dir, stale))
+            except OSError:
+                pass
+    return f"{STATIC_URL}/{file_name}"
+
+
+# Function to combine and minify stylesheets, rebuilt only when a source
+# file changes (the modification times are part of the cache key)
+@st.cache_resource(max_entries=8)
+def build_stylesheet(paths, mtimes, static_dir=STATIC_DIR):
+    sources = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            sources.append(f.read())
+    css = minify_css("\n".join(sources))
+    digest = hashlib.sha256(css.encode("utf-8")).hexdigest()[:HASH_LENGTH]
+    name = "-".join(os.path.splitext(os.path.basename(path))[0] for path in paths)
+    try:
+        href = _write_static(name, digest, css, static_dir)
+    except OSError:
+        # Read-only install: fall back to inlining
+        href = None
+    return Stylesheet(css, href, digest)
+
+
+# Emit the page stylesheet: an @import of its static URL when static
+# serving is on, otherwise the minified CSS. Missing files are skipped,
+# as the pages did when style.css was absent.
+def inject_stylesheet(*file_names):
+    paths = []
+    mtimes = []
+    for file_name in file_names:
+        path = os.path.join(ASSET_ROOT, file_name)
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            continue
+        paths.append(path)
+    if not paths:
+        return
+
+    sheet = build_stylesheet(tuple(paths), tuple(mtimes))
+    if sheet.href is not None and st.get_option("server.enableStaticServing"):
+        st.markdown(f'<style>@import url("{sheet.href}");</style>', unsafe_allow_html=True)
+    else:
+        st.markdown(f"<style>{sheet.css}</style>", unsafe_allow_html=True)
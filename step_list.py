@@ -0,0 +1,41 @@
+import html
+
+import streamlit as st
+
+# Troubleshooting step lists rendered as a single HTML fragment.
+#
+# One st.markdown call per step costs one delta message (and one element
+# for the frontend to diff) per step on every rerun. The whole list is
+# instead built once per (machine, alarm) as one pre-escaped fragment and
+# sent as a single element; the CSS animation delay still reveals the
+# steps one after another.
+
+STEP_TEMPLATE = (
+    '<div class="step-box animated-step{theme}" style="animation-delay: {delay:.1f}s">'
+    '<div class="step-number">Step {number}</div>'
+    '<div class="step-content">{text}</div>'
+    '</div>'
+)
+
+
+# Function to build the step list fragment. The steps are part of the key
+# so a reloaded workbook never serves a stale list for the same alarm.
+@st.cache_resource(max_entries=1024)
+def step_list_html(machine, alarm, steps, reveal_delay, theme=""):
+    theme = f" {theme}" if theme else ""
+    # No blank lines: the fragment must stay one HTML block for markdown
+    return "\n".join(
+        STEP_TEMPLATE.format(
+            theme=theme,
+            delay=i * reveal_delay,
+            number=i + 1,
+            text=html.escape(str(step), quote=False),
+        )
+        for i, step in enumerate(steps)
+    )
+
+
+# Render a step list as one markdown element
+def render_step_list(machine, alarm, steps, reveal_delay, theme=""):
+    fragment = step_list_html(machine, alarm, tuple(steps), reveal_delay, theme)
+    st.markdown(fragment, unsafe_allow_html=True)
@@ -0,0 +1,50 @@
+import numpy as np
+
+from alarm_analytics import alarm_stats, load_history, rolling_rates, ttr_histogram
+
+
+def write_log(tmp_path, lines):
+    path = tmp_path / "machine.log"
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+    return str(path)
+
+
+def test_microsecond_timestamps(tmp_path):
+    path = write_log(tmp_path, [
+        "2026-01-01T00:00:00.123456 HD-01 STATE Priming",
+        "2026-01-01T00:00:01.500000 HD-01 ALARM Blue probe open",
+        "2026-01-01T00:01:01.500000001 HD-01 CLEAR Blue probe open",
+    ])
+    history = load_history(path)
+    assert history.keys == [("Priming", "Blue probe open")]
+    assert history.time.tolist() == [np.datetime64("2026-01-01T00:00:01.500", "ms").astype(np.int64)]
+    assert history.ttr.tolist() == [60.0]
+
+
+def test_time_to_resolution_and_state(tmp_path):
+    path = write_log(tmp_path, [
+        "2026-01-01T00:00:00.000 HD-01 STATE Priming",
+        "2026-01-01T00:00:00.000 HD-02 STATE Rinse",
+        "2026-01-01T00:00:10.000 HD-01 ALARM Blue probe open",
+        "2026-01-01T00:00:20.000 HD-02 ALARM Blue probe open",
+        "2026-01-01T00:00:40.000 HD-01 CLEAR Blue probe open",
+        "2026-01-01T01:00:10.000 HD-01 ALARM Blue probe open",
+    ])
+    history = load_history(path)
+    stats = alarm_stats(history).set_index("machine")
+    assert stats.loc["HD-01", "state"] == "Priming"
+    assert stats.loc["HD-01", "alarms"] == 2
+    assert stats.loc["HD-01", "resolved"] == 1
+    assert stats.loc["HD-01", "ttr_median_min"] == 0.5
+    assert stats.loc["HD-01", "mtbf_hours"] == 1.0
+    assert stats.loc["HD-02", "state"] == "Rinse"
+    assert stats.loc["HD-02", "resolved"] == 0
+
+
+def test_logs_without_records(tmp_path):
+    for lines in ([], [""], ["2026-01-01T00:00:00.000 HD-01 INFO Blood flow 300 ml/min"]):
+        history = load_history(write_log(tmp_path, lines))
+        assert len(history.time) == 0
+        assert alarm_stats(history).empty
+        assert rolling_rates(history).empty
+        assert len(ttr_histogram(history)[0]) == 0
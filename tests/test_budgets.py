@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# The performance budgets of benchmarks/ as tests: each budgeted script runs
+# in its own interpreter (they time whole apps, change directory and set up
+# process-wide caches) and must exit 0, which it does only within budget.
+# They take a few minutes together; deselect them with -m "not budget".
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+TIMEOUT = 600
+
+BUDGETS = [
+    "analytics_bench.py",
+    "fleet_bench.py",
+    "log_ingest_bench.py",
+    "pms_health_bench.py",
+    "render_budget.py",
+    "search_bench.py",
+    "session_memory.py",
+    "signal_bench.py",
+]
+
+
+@pytest.mark.budget
+@pytest.mark.parametrize("script", BUDGETS)
+def test_within_budget(script):
+    result = subprocess.run(
+        [sys.executable, os.path.join(BENCHMARKS, script)],
+        capture_output=True, text=True, timeout=TIMEOUT,
+    )
+    assert result.returncode == 0, f"{script} over budget:\n{result.stdout}{result.stderr[-2000:]}"
+    assert result.stdout.rstrip().endswith("OK"), result.stdout
@@ -0,0 +1,20 @@
+import asyncio
+
+from fleet_gateway import build_gateway
+from machine_log import parse_record
+
+
+# Identical alarms still get distinct sequence numbers, in order
+def test_events_are_numbered():
+    gateway = build_gateway(port=0)
+    subscription = gateway.subscribe()
+    record = parse_record("2026-01-01T00:00:00.000 PMS-01 ALARM E01")
+
+    async def publish():
+        await gateway._publish("PMS", record)
+        await gateway._publish("PMS", record)
+
+    asyncio.run(publish())
+    events = subscription.drain()
+    assert [event.seq for event in events] == [1, 2]
+    assert events[0][1:] == events[1][1:]
@@ -0,0 +1,25 @@
+from fuzzy_match import affinity, affinity_key, build_fuzzy_matcher
+
+
+def top(query, source="PMS"):
+    return build_fuzzy_matcher().match(query, sources=[source])[0]
+
+
+# Codes typed without their leading zero rank their own error first, not
+# whichever code sharing the same number of edits comes first
+def test_partial_codes_rank_their_own_code_first():
+    assert top("e5").text == "E05"
+    assert top("e6").text == "E06"
+    assert top("E05").distance == 0
+
+
+def test_affinity():
+    def score(query, text):
+        return affinity(affinity_key(query)[0], affinity_key(text))
+
+    assert score("e5", "e05") == 2
+    assert score("rs485", "comm error (can/rs485)") == 2
+    assert score("comm err", "comm error (can/rs485)") == 1
+    assert score("batt", "low battery") == 1
+    assert score("e5", "e06") == 0
+    assert score("e1", "e100") == 1
@@ -0,0 +1,13 @@
+import pandas as pd
+
+from alarm_index import AlarmIndex
+from kb_export import build_table, rows_to_table, workbook_rows
+
+
+# Workbook states and catalogue categories stay apart in the export
+def test_workbook_rows_are_labelled_workbook():
+    index = AlarmIndex({"Priming": pd.DataFrame({"Alarms / Reasons": ["Blue probe open"], "Reason 1": ["Check probe"]})})
+    table = rows_to_table(list(workbook_rows(index)))
+    assert table.column("machine").to_pylist() == ["workbook"]
+    machines = set(build_table().column("machine").to_pylist())
+    assert machines == {"PMS", "Hemodialysis", "UP7000"}
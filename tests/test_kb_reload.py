@@ -0,0 +1,44 @@
+import os
+import shutil
+import sqlite3
+
+import openpyxl
+
+import kb_reload
+from kb_reload import LiveKnowledgeBase
+from kb_store import KnowledgeStore, build_store
+from knowledge_base import workbook_hash
+
+WORKBOOK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "MachineDataAnalytics.xlsx")
+
+
+# A write-through that fails is retried by the next reload, even one that
+# finds nothing new in the workbook
+def test_failed_write_through_is_retried(tmp_path, monkeypatch):
+    workbook = str(tmp_path / "MachineDataAnalytics.xlsx")
+    shutil.copy(WORKBOOK, workbook)
+    db_path = str(tmp_path / "kb.sqlite")
+    build_store(db_path, workbook)
+    store = KnowledgeStore(db_path)
+    knowledge_base = LiveKnowledgeBase(workbook, store_path=db_path)
+    scheduled = []
+    monkeypatch.setattr(knowledge_base, "schedule_reload", lambda delay=None: scheduled.append(delay))
+
+    book = openpyxl.load_workbook(workbook)
+    state = knowledge_base.current.sheet_names[1]
+    book[state].append(["Zebra flux alarm", "Check the zebra"])
+    book.save(workbook)
+
+    def fail(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    update = kb_reload.update_workbook_states
+    monkeypatch.setattr(kb_reload, "update_workbook_states", fail)
+    assert knowledge_base.reload()
+    assert "Zebra flux alarm" not in store.index().alarms(state)
+    assert scheduled == [kb_reload.STORE_RETRY]
+
+    monkeypatch.setattr(kb_reload, "update_workbook_states", update)
+    assert knowledge_base.reload() == []
+    assert "Zebra flux alarm" in store.index().alarms(state)
+    assert store.workbook_version() == workbook_hash(workbook).hex()
@@ -0,0 +1,36 @@
+import pandas as pd
+
+from alarm_index import AlarmIndex
+from fuzzy_match import build_fuzzy_matcher
+from kb_search import build_search_index
+from kb_store import KnowledgeStore, build_store, update_workbook_states
+
+
+def workbook_index(alarms):
+    return AlarmIndex({"Priming": pd.DataFrame({"Alarms / Reasons": alarms, "Reason 1": ["Check the lines"] * len(alarms)})})
+
+
+def test_workbook_version_follows_written_states(tmp_path):
+    db_path = str(tmp_path / "kb.sqlite")
+    build_store(db_path)
+    store = KnowledgeStore(db_path)
+    assert store.workbook_version() == ""
+    update_workbook_states(db_path, workbook_index(["Blue probe open"]), ["Priming"], b"\x01")
+    assert store.workbook_version() == "01"
+    assert store.index().alarms("Priming") == ("Blue probe open",)
+
+
+# Search and fuzzy hits built from the store name alarms exactly as the
+# store lists them, numeric workbook cells included
+def test_hits_from_the_store_index_match_its_alarms(tmp_path):
+    db_path = str(tmp_path / "kb.sqlite")
+    build_store(db_path)
+    update_workbook_states(db_path, workbook_index([404, "Blue probe open"]), ["Priming"], b"\x01")
+    alarm_index = KnowledgeStore(db_path).index()
+    alarms = alarm_index.alarms("Priming")
+    assert alarms == ("404", "Blue probe open")
+
+    hits = build_search_index(alarm_index).search("404", sources=["workbook"])
+    assert [(hit.group, hit.name) for hit in hits] == [("Priming", "404")]
+    hits = build_fuzzy_matcher(alarm_index).match("blue probe opn", sources=["workbook"])
+    assert hits[0].name in alarms
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from alarm_index import AlarmIndex
+from knowledge_base import encode_snapshot, share_knowledge_base
+
+
+def shared():
+    frame = pd.DataFrame({"Alarms / Reasons": ["Blue probe open", "Rinse failure"], "Reason 1": ["Check probe", None]})
+    return share_knowledge_base({"Priming": frame}, ["Priming"])
+
+
+def test_edits_to_a_shared_frame_stay_private():
+    data_dict, sheet_names = shared()
+    frame = data_dict["Priming"]
+    frame.loc[0, "Reason 1"] = "Changed"
+    frame.iloc[1, 0] = "Changed"
+    frame["Reason 2"] = "Added"
+    frame.dropna(inplace=True)
+    frame["Alarms / Reasons"].to_numpy()[:] = "Changed"
+
+    assert data_dict["Priming"].equals(shared()[0]["Priming"])
+    assert sheet_names == ("Priming",)
+
+
+def test_shared_mapping_cannot_be_changed():
+    data_dict, _ = shared()
+    with pytest.raises(TypeError):
+        data_dict["Priming"] = pd.DataFrame()
+    with pytest.raises(TypeError):
+        del data_dict["Priming"]
+    assert list(data_dict) == ["Priming"]
+
+
+# The index, the snapshot encoder and reloads read the shared frames
+# themselves; only the page-facing lookups copy
+def test_internal_readers_do_not_copy(monkeypatch):
+    data_dict, sheet_names = shared()
+    copies = []
+    original = pd.DataFrame.copy
+    monkeypatch.setattr(pd.DataFrame, "copy", lambda self, *args, **kwargs: copies.append(1) or original(self, *args, **kwargs))
+
+    index = AlarmIndex(data_dict)
+    index.updated(data_dict, ["Priming"])
+    encode_snapshot(data_dict, sheet_names, bytes(32))
+    assert "Priming" in data_dict
+    assert data_dict.frames["Priming"] is data_dict.frames["Priming"]
+    assert not copies
+    with pytest.raises(TypeError):
+        data_dict.frames["Priming"] = pd.DataFrame()
@@ -0,0 +1,42 @@
+import os
+
+from machine_log import MAX_LINE, LineReader, resolve_log_path
+
+
+def test_log_paths_inside_the_log_directory_resolve(tmp_path):
+    log = tmp_path / "HD-07.log"
+    log.write_text("")
+    assert resolve_log_path(str(log), root=str(tmp_path)) == os.path.realpath(log)
+    assert resolve_log_path(str(tmp_path / "sub" / ".." / "HD-07.log"), root=str(tmp_path)) == os.path.realpath(log)
+
+
+def test_log_paths_outside_the_log_directory_are_refused(tmp_path):
+    root = tmp_path / "logs"
+    root.mkdir()
+    secret = tmp_path / "secrets.toml"
+    secret.write_text("")
+    assert resolve_log_path(str(secret), root=str(root)) is None
+    assert resolve_log_path(str(root / ".." / "secrets.toml"), root=str(root)) is None
+    assert resolve_log_path("/etc/passwd", root=str(root)) is None
+    # A log directory sharing a prefix with another one
+    assert resolve_log_path(str(tmp_path / "logs-old" / "HD-07.log"), root=str(root)) is None
+
+
+def test_symlinks_out_of_the_log_directory_are_refused(tmp_path):
+    root = tmp_path / "logs"
+    root.mkdir()
+    secret = tmp_path / "secrets.toml"
+    secret.write_text("")
+    (root / "HD-07.log").symlink_to(secret)
+    assert resolve_log_path(str(root / "HD-07.log"), root=str(root)) is None
+
+
+def test_rest_of_an_over_long_line_written_later_is_skipped(tmp_path):
+    log = tmp_path / "HD-07.log"
+    log.write_bytes(b"x" * (MAX_LINE + 10))
+    with open(log, "rb") as f:
+        reader = LineReader(f)
+        assert list(reader.lines()) == ["x" * MAX_LINE]
+        with open(log, "ab") as out:
+            out.write(b" HD-07 ALARM Blue probe open\n2025-03-01T10:15:12.000 HD-07 INFO ok\n")
+        assert list(reader.lines()) == ["2025-03-01T10:15:12.000 HD-07 INFO ok"]
@@ -0,0 +1,28 @@
+from pms_health import BATTERY_WARNING, WARMUP, PmsHealthScorer
+
+HEALTHY = {"battery_v": 13.5, "temp_c": 35.0, "imbalance_pct": 2.0, "run_h": 100.0}
+
+
+# A unit is scored once it has reported for the scorer's own window
+def test_warmup_follows_the_window():
+    scorer = PmsHealthScorer(window=60.0)
+    for t in range(60):
+        scorer.update("PMS-01", float(t), HEALTHY)
+    assert scorer.scores("PMS-01") is None
+    scorer.update("PMS-01", 60.0, HEALTHY)
+    assert scorer.scores("PMS-01") is not None
+
+    default = PmsHealthScorer()
+    default.update("PMS-01", 0.0, HEALTHY)
+    default.update("PMS-01", WARMUP - 1, HEALTHY)
+    assert default.scores("PMS-01") is None
+
+
+def test_short_window_raises_alerts_before_the_default_warmup():
+    scorer = PmsHealthScorer(window=60.0)
+    alerts = []
+    for t in range(120):
+        readings = dict(HEALTHY, battery_v=13.5 - t * 0.02)
+        alerts += scorer.update("PMS-01", float(t), readings)
+    assert [alert.error for alert in alerts] == [BATTERY_WARNING]
+    assert alerts[0].timestamp < WARMUP
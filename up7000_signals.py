@@ -0,0 +1,400 @@
+import argparse
+import math
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+import pandas as pd
+from scipy import signal
+
+# Real-time triage of UP-7000 waveforms: suggests the catalogue entry of a
+# signal problem from the raw samples.
+#
+# Samples arrive in chunks, one column per channel, from a CSV file (a
+# header row of channel names, then one row per sample) or a simulated
+# monitor. The first word of a channel name gives its kind:
+#
+#   ECG    ECG lead in mV
+#   PLETH  SpO₂ plethysmogram, normalised to 0..1
+#   NIBP   NIBP cuff pressure oscillation in mmHg (deflation ramp removed)
+#
+# Every channel keeps the last WINDOW seconds in a ring buffer, raw and
+# band-passed to the pulse band (a streaming SOS filter, its state carried
+# from chunk to chunk). Every HOP seconds the windows of all channels go
+# through one Welch PSD (Hann-windowed FFTs), whose band powers and the
+# windows' amplitudes are checked:
+#
+#   ECG    flat or railed                        Lead Off Message
+#          mains, EMG or baseline wander power   Thick Baseline / Interference
+#   PLETH  flat                                  Probe Off Alarm
+#          weak pulse                            No Reading or Low Readings
+#   NIBP   weak oscillation, out-of-band power   Motion Artifact or Signal Weak
+#
+# A finding is reported once it holds for CONFIRM analyses in a row, and
+# again only after it cleared.
+#
+# The apps only read waveform files under WAVEFORM_DIR (the environment
+# variable, else "waveforms" in the working directory).
+#
+#   python up7000_signals.py simulate waveform.csv --seconds 120
+#   python up7000_signals.py analyse waveform.csv
+
+SAMPLE_RATE = 500
+# Seconds of signal analysed, and between analyses
+WINDOW = 4.0
+HOP = 1.0
+CONFIRM = 2
+# Rows read from a file at a time
+CHUNK_ROWS = 5000
+RECENT_FINDINGS = 20
+WAVEFORM_DIR = os.path.realpath(os.environ.get("WAVEFORM_DIR", "waveforms"))
+
+ECG, PLETH, NIBP = "ECG", "PLETH", "NIBP"
+DEFAULT_CHANNELS = ("ECG I", "ECG II", "ECG III", "ECG V", "PLETH", "NIBP")
+
+# Bands in Hz: the diagnostic ECG band, the pulse band of PLETH and NIBP,
+# mains frequencies (and harmonics, within MAINS_WIDTH)
+ECG_BAND = (0.75, 40.0)
+PULSE_BAND = (0.75, 5.0)
+MAINS = (50.0, 60.0)
+MAINS_WIDTH = 1.0
+
+# ECG: standard deviation below which a lead is flat, level beyond which
+# it is railed (mV), and band power ratios to the ECG band
+LEAD_OFF_STD = 0.01
+RAIL_MV = 4.0
+MAINS_RATIO = 0.2
+EMG_RATIO = 0.3
+WANDER_RATIO = 1.0
+# PLETH: flat below PLETH_FLAT, weak pulse below PLETH_WEAK (peak to peak)
+PLETH_FLAT = 0.005
+PLETH_WEAK = 0.05
+# NIBP: weak oscillation below NIBP_WEAK mmHg (peak to peak); motion when
+# the power outside the pulse band exceeds MOTION_RATIO of the power in it
+NIBP_WEAK = 0.3
+MOTION_RATIO = 1.0
+
+# time in seconds from the start of the stream; category/error the UP-7000 catalogue keys
+SignalFinding = namedtuple("SignalFinding", ["time", "channel", "category", "error", "text"])
+
+
+def channel_kind(name):
+    kind = name.split()[0].upper() if name.split() else ""
+    return "PLETH" if kind == "SPO2" else kind
+
+
+# The last size samples of several channels (rows), oldest overwritten first
+class RingBuffer:
+    def __init__(self, channels, size):
+        self.size = size
+        self.filled = 0
+        self._data = np.zeros((channels, size))
+        self._pos = 0
+
+    def extend(self, samples):
+        n = samples.shape[1]
+        if n >= self.size:
+            self._data[:] = samples[:, -self.size:]
+            self._pos = 0
+        else:
+            end = self._pos + n
+            if end <= self.size:
+                self._data[:, self._pos:end] = samples
+            else:
+                split = self.size - self._pos
+                self._data[:, self._pos:] = samples[:, :split]
+                self._data[:, :n - split] = samples[:, split:]
+            self._pos = end % self.size
+        self.filled = min(self.filled + n, self.size)
+
+    # Contents oldest first
+    def window(self):
+        return np.concatenate((self._data[:, self._pos:], self._data[:, :self._pos]), axis=1)
+
+
+# Analyses the channels of one monitor as their samples arrive
+class WaveformMonitor:
+    def __init__(self, channels, fs=SAMPLE_RATE, window=WINDOW, hop=HOP):
+        self.channels = list(channels)
+        self.kinds = [channel_kind(name) for name in self.channels]
+        self.fs = fs
+        self.samples = 0
+        size = int(window * fs)
+        self._raw = RingBuffer(len(self.channels), size)
+        self._pulse = RingBuffer(len(self.channels), size)
+        self._sos = signal.butter(2, PULSE_BAND, btype="bandpass", fs=fs, output="sos")
+        self._zi = np.zeros((self._sos.shape[0], len(self.channels), 2))
+        self._hop = int(hop * fs)
+        self._since_analysis = 0
+        # Welch segments of half the window: 2 / window Hz resolution
+        self._nperseg = size // 2
+        freqs = np.fft.rfftfreq(self._nperseg, 1 / fs)
+        self._bands = {
+            "ecg": _band(freqs, *ECG_BAND),
+            "wander": (freqs > 0) & (freqs < ECG_BAND[0]),
+            "pulse": _band(freqs, *PULSE_BAND),
+            "above_pulse": freqs > PULSE_BAND[1],
+        }
+        mains = np.zeros(len(freqs), dtype=bool)
+        for base in MAINS:
+            for harmonic in range(1, int(fs / 2 // base) + 1):
+                mains |= np.abs(freqs - base * harmonic) <= MAINS_WIDTH
+        self._bands["mains"] = mains
+        self._bands["emg"] = (freqs > ECG_BAND[1]) & ~mains
+        # channel index -> {error: consecutive analyses it held}, and errors reported
+        self._streaks = [{} for _ in self.channels]
+        self._reported = [set() for _ in self.channels]
+
+    # Add samples (one row per sample, one column per channel); returns the
+    # findings reported
+    def feed(self, samples):
+        samples = np.asarray(samples, dtype=np.float64)
+        findings = []
+        # Long chunks (files read in blocks) are analysed hop by hop
+        for start in range(0, len(samples), self._hop):
+            findings += self._feed(samples[start:start + self._hop].T)
+        return findings
+
+    def _feed(self, samples):
+        pulse, self._zi = signal.sosfilt(self._sos, samples, axis=-1, zi=self._zi)
+        self._raw.extend(samples)
+        self._pulse.extend(pulse)
+        self.samples += samples.shape[1]
+        self._since_analysis += samples.shape[1]
+        if self._since_analysis < self._hop or self._raw.filled < self._raw.size:
+            return []
+        self._since_analysis = 0
+        return self._report(self.analyse())
+
+    # {channel index: [(category, error, reason)]} of the current windows
+    def analyse(self):
+        raw = self._raw.window()
+        _, psd = signal.welch(raw, self.fs, nperseg=self._nperseg, axis=-1)
+        power = {name: psd[:, mask].sum(axis=-1) for name, mask in self._bands.items()}
+        # Flat and railed traces are judged on the latest hop: they start and end abruptly
+        recent = raw[:, -self._hop:]
+        std = recent.std(axis=-1)
+        level = np.median(recent, axis=-1)
+        peak = np.abs(raw).max(axis=-1)
+        pulse_amplitude = np.ptp(self._pulse.window()[:, self._pulse.size // 4:], axis=-1)
+
+        problems = {}
+        for i, kind in enumerate(self.kinds):
+            found = []
+            if kind == ECG:
+                ecg = max(power["ecg"][i], 1e-12)
+                if std[i] < LEAD_OFF_STD or abs(level[i]) > RAIL_MV:
+                    found.append(("ECG Issues", "Lead Off Message",
+                                  f"flat trace (±{std[i]:.3f} mV)" if std[i] < LEAD_OFF_STD
+                                  else f"trace railed at {level[i]:.1f} mV"))
+                elif peak[i] <= RAIL_MV:
+                    # Not while the window still holds a railed stretch (a lead just reattached)
+                    reasons = []
+                    if power["mains"][i] / ecg > MAINS_RATIO:
+                        reasons.append(f"mains interference ({power['mains'][i] / ecg:.0%} of ECG power)")
+                    if power["emg"][i] / ecg > EMG_RATIO:
+                        reasons.append(f"high-frequency noise ({power['emg'][i] / ecg:.0%} of ECG power)")
+                    if power["wander"][i] / ecg > WANDER_RATIO:
+                        reasons.append(f"baseline wander ({power['wander'][i] / ecg:.0%} of ECG power)")
+                    if reasons:
+                        found.append(("ECG Issues", "Thick Baseline / Interference", ", ".join(reasons)))
+            elif kind == PLETH:
+                if std[i] < PLETH_FLAT:
+                    found.append(("SpO₂ (Oxygen Saturation) Issues", "Probe Off Alarm", "no pleth signal"))
+                elif pulse_amplitude[i] < PLETH_WEAK:
+                    found.append(("SpO₂ (Oxygen Saturation) Issues", "No Reading or Low Readings",
+                                  f"weak pulse ({pulse_amplitude[i]:.3f} peak to peak)"))
+            elif kind == NIBP:
+                motion = (power["above_pulse"][i] + power["wander"][i]) / max(power["pulse"][i], 1e-12)
+                if pulse_amplitude[i] < NIBP_WEAK:
+                    found.append(("NIBP (Blood Pressure) Issues", "Motion Artifact or Signal Weak",
+                                  f"weak cuff oscillation ({pulse_amplitude[i]:.2f} mmHg peak to peak)"))
+                elif motion > MOTION_RATIO:
+                    found.append(("NIBP (Blood Pressure) Issues", "Motion Artifact or Signal Weak",
+                                  f"motion artifact ({motion:.0%} of the oscillation power outside the pulse band)"))
+            problems[i] = found
+        return problems
+
+    def _report(self, problems):
+        findings = []
+        now = self.samples / self.fs
+        for i, found in problems.items():
+            streaks = self._streaks[i]
+            held = {error: (category, reason) for category, error, reason in found}
+            for error in list(streaks):
+                if error not in held:
+                    del streaks[error]
+                    self._reported[i].discard(error)
+            for error, (category, reason) in held.items():
+                streaks[error] = streaks.get(error, 0) + 1
+                if streaks[error] >= CONFIRM and error not in self._reported[i]:
+                    self._reported[i].add(error)
+                    findings.append(SignalFinding(now, self.channels[i], category, error, reason))
+        return findings
+
+
+def _band(freqs, low, high):
+    return (freqs >= low) & (freqs <= high)
+
+
+# (channel names, chunks of samples) of a CSV waveform file
+def read_waveform(path, chunk_rows=CHUNK_ROWS):
+    reader = pd.read_csv(path, chunksize=chunk_rows, dtype=np.float64)
+    first = next(reader, None)
+    if first is None:
+        return [], iter(())
+
+    def chunks():
+        yield first.to_numpy()
+        for frame in reader:
+            yield frame.to_numpy()
+
+    return list(first.columns), chunks()
+
+
+# ===== SIMULATED MONITOR =====
+# Faults the simulated monitor injects, by channel kind
+FAULTS = {
+    ECG: ("lead_off", "mains", "emg", "wander"),
+    PLETH: ("probe_off", "low_perfusion"),
+    NIBP: ("weak", "motion"),
+}
+
+
+# ECG-like trace (mV) at the given beat phases (0..1): P, QRS and T waves
+def _ecg(phase, gain):
+    waves = ((0.2, 0.15, 0.025), (0.35, -0.1, 0.01), (0.37, 1.2, 0.012), (0.39, -0.25, 0.01), (0.6, 0.3, 0.04))
+    trace = np.zeros_like(phase)
+    for centre, height, width in waves:
+        trace += height * np.exp(-((phase - centre) / width) ** 2)
+    return gain * trace
+
+
+# Chunks of chunk seconds of a simulated monitor's channels. Faults are
+# (start s, end s, channel index, fault) from FAULTS; by default one is
+# drawn every fault_every seconds for a random channel, lasting half that.
+def simulated_monitor(channels=DEFAULT_CHANNELS, fs=SAMPLE_RATE, chunk=0.1, seed=None,
+                      faults=None, fault_every=20.0, heart_rate=72.0):
+    rng = np.random.default_rng(seed)
+    kinds = [channel_kind(name) for name in channels]
+    gains = rng.uniform(0.6, 1.2, len(channels))
+    rows = int(chunk * fs)
+    start = 0
+    while True:
+        t = (start + np.arange(rows)) / fs
+        if faults is None:
+            period = int(t[0] // fault_every)
+            draw = np.random.default_rng([seed or 0, period])
+            i = int(draw.integers(len(channels)))
+            active = [(period * fault_every, (period + 0.5) * fault_every, i, str(draw.choice(FAULTS[kinds[i]])))]
+        else:
+            active = faults
+        phase = (t * heart_rate / 60) % 1
+        columns = []
+        for i, kind in enumerate(kinds):
+            fault = next((f for s, e, c, f in active if c == i and s <= t[0] < e), None)
+            if kind == ECG:
+                x = _ecg(phase, gains[i]) + rng.normal(0, 0.01, rows)
+                if fault == "lead_off":
+                    x = np.full(rows, 5.0) + rng.normal(0, 0.002, rows)
+                elif fault == "mains":
+                    x += 0.3 * np.sin(2 * math.pi * 50 * t)
+                elif fault == "emg":
+                    x += rng.normal(0, 0.2, rows)
+                elif fault == "wander":
+                    x += 1.5 * np.sin(2 * math.pi * 0.3 * t)
+            elif kind == PLETH:
+                pulse = np.exp(-((phase - 0.3) / 0.1) ** 2) + 0.3 * np.exp(-((phase - 0.55) / 0.08) ** 2)
+                x = 0.5 + 0.4 * pulse * (0.05 if fault == "low_perfusion" else 1.0) + rng.normal(0, 0.002, rows)
+                if fault == "probe_off":
+                    x = np.full(rows, 0.02) + rng.normal(0, 0.0005, rows)
+            else:
+                x = 1.5 * np.sin(2 * math.pi * phase) * (0.05 if fault == "weak" else 1.0) + rng.normal(0, 0.02, rows)
+                if fault == "motion":
+                    x += 4.0 * np.sin(2 * math.pi * 8 * t) * (rng.random(rows) < 0.5) + np.cumsum(rng.normal(0, 0.3, rows))
+            columns.append(x)
+        yield np.column_stack(columns)
+        start += rows
+
+
+# Writes seconds of a simulated monitor to a CSV waveform file
+def simulate(path, seconds, channels=DEFAULT_CHANNELS, fs=SAMPLE_RATE, seed=0):
+    chunks = simulated_monitor(channels, fs, chunk=1.0, seed=seed)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(",".join(channels) + "\n")
+        for _ in range(int(seconds)):
+            np.savetxt(f, next(chunks), delimiter=",", fmt="%.4f")
+
+
+# Analyses a waveform file, or a simulated monitor if path is None, on a
+# background thread at the pace of the signal, and keeps the recent
+# findings for the UI to pick up
+class WaveformFeed:
+    def __init__(self, path=None, fs=SAMPLE_RATE):
+        self.path = path
+        self.fs = fs
+        self.channels = []
+        # latest and recent hold (sequence number, SignalFinding); the number
+        # grows with every finding and identifies it (findings can be equal)
+        self.latest = None
+        self.recent = deque(maxlen=RECENT_FINDINGS)
+        self.seconds = 0.0
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"waveform {self.path}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        try:
+            if self.path is None:
+                self.channels, chunks = list(DEFAULT_CHANNELS), simulated_monitor(fs=self.fs)
+            else:
+                self.channels, chunks = read_waveform(self.path, chunk_rows=int(self.fs * HOP))
+            monitor = WaveformMonitor(self.channels, self.fs)
+            started = time.monotonic()
+            seq = 0
+            for chunk in chunks:
+                for finding in monitor.feed(chunk):
+                    seq += 1
+                    self.latest = (seq, finding)
+                    self.recent.append(self.latest)
+                self.seconds = monitor.samples / self.fs
+                # Keep to the signal's own pace
+                if self._stop.wait(max(started + self.seconds - time.monotonic(), 0)):
+                    break
+        except (OSError, ValueError) as e:
+            self.error = str(e)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate or analyse UP-7000 waveforms")
+    parser.add_argument("command", choices=["simulate", "analyse"])
+    parser.add_argument("path", nargs="?", help="CSV waveform file; analyse uses a simulated monitor without one")
+    parser.add_argument("--seconds", type=float, default=120.0, help="seconds simulated")
+    parser.add_argument("--rate", type=int, default=SAMPLE_RATE, help="samples per second per channel")
+    args = parser.parse_args()
+
+    if args.command == "simulate":
+        simulate(args.path, args.seconds, fs=args.rate)
+    else:
+        if args.path is None:
+            channels = DEFAULT_CHANNELS
+            source = simulated_monitor(fs=args.rate, chunk=HOP, seed=0)
+            chunks = (next(source) for _ in range(int(args.seconds / HOP)))
+        else:
+            channels, chunks = read_waveform(args.path)
+        monitor = WaveformMonitor(channels, args.rate)
+        for chunk in chunks:
+            for finding in monitor.feed(chunk):
+                print(f"{finding.time:7.1f} s {finding.channel}: {finding.error} - {finding.text}")
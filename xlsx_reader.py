@@ -0,0 +1,263 @@
+import posixpath
+import re
+import zipfile
+from xml.etree.ElementTree import iterparse
+from xml.parsers import expat
+
+# Streaming reader for the troubleshooting workbook.
+#
+# The alarm sheets carry ~1000 formatted rows of which only a few dozen hold
+# text, so instead of materialising every cell (pandas/openpyxl) the rows are
+# pulled lazily out of the zip member and the scan stops once a long run of
+# blank rows is reached.
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_DOC_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+SHARED_ITEM_TAG = NS_MAIN + "si"
+SHARED_TEXT_TAG = NS_MAIN + "t"
+SHARED_PHONETIC_TAG = NS_MAIN + "rPh"
+
+# Element names as reported by expat with namespace_separator=" "
+_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main "
+ROW_TAG = _MAIN + "row"
+CELL_TAG = _MAIN + "c"
+VALUE_TAG = _MAIN + "v"
+TEXT_TAG = _MAIN + "t"
+PHONETIC_TAG = _MAIN + "rPh"
+
+# Bytes decompressed per parser feed
+CHUNK_SIZE = 8192
+
+# Blank rows tolerated inside a table (e.g. before the "Issues" section)
+# before the rest of the sheet is treated as formatting only
+DEFAULT_BLANK_RUN = 50
+
+# Cell texts read as missing, matching pandas.read_excel's default na_values
+# (the workbook writes "NA" into unused reason cells)
+DEFAULT_NA_VALUES = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+])
+
+_CELL_REF = re.compile(r"([A-Z]+)")
+
+
+# Function to turn the letters of a cell reference ("C7") into a 0-based column
+def column_index(ref):
+    match = _CELL_REF.match(ref)
+    index = 0
+    for ch in match.group(1):
+        index = index * 26 + (ord(ch) - 64)
+    return index - 1
+
+
+def _text_of(elem):
+    # Rich-text items split their text over several <t> runs; phonetic
+    # guides (<rPh>) are not part of the displayed value
+    parts = []
+    for child in elem:
+        if child.tag == SHARED_TEXT_TAG:
+            parts.append(child.text or "")
+        elif child.tag != SHARED_PHONETIC_TAG:
+            parts.extend(t.text or "" for t in child.iter(SHARED_TEXT_TAG))
+    return "".join(parts)
+
+
+def _number(text):
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+# SAX handlers that turn <row>/<c> events into lists of cell values
+class _RowCollector:
+    def __init__(self, shared_strings, na_values):
+        self.shared_strings = shared_strings
+        self.na_values = na_values
+        self.rows = []
+        # Indices of the shared strings the sheet's cells refer to
+        self.string_ids = set()
+        self.row_number = 0
+        self.values = None
+        self.next_col = 0
+        self.col = 0
+        self.cell_type = "n"
+        self.text = None
+        self.parts = None
+        self.phonetic = 0
+
+    def drain(self):
+        rows = self.rows
+        self.rows = []
+        return rows
+
+    def start(self, name, attrs):
+        if name == CELL_TAG:
+            ref = attrs.get("r")
+            self.col = column_index(ref) if ref else self.next_col
+            self.next_col = self.col + 1
+            self.cell_type = attrs.get("t", "n")
+            self.text = None
+        elif name == VALUE_TAG or (name == TEXT_TAG and not self.phonetic):
+            self.parts = []
+        elif name == PHONETIC_TAG:
+            self.phonetic += 1
+        elif name == ROW_TAG:
+            self.row_number = int(attrs.get("r", self.row_number + 1))
+            self.values = []
+            self.next_col = 0
+
+    def characters(self, data):
+        if self.parts is not None:
+            self.parts.append(data)
+
+    def end(self, name):
+        if name == VALUE_TAG or (name == TEXT_TAG and self.parts is not None):
+            text = "".join(self.parts)
+            # Inline strings may be split over several rich-text runs
+            self.text = text if self.text is None or name == VALUE_TAG else self.text + text
+            self.parts = None
+        elif name == PHONETIC_TAG:
+            self.phonetic -= 1
+        elif name == CELL_TAG:
+            value = self._convert()
+            if value is None or (isinstance(value, str) and value in self.na_values):
+                return
+            values = self.values
+            if self.col >= len(values):
+                values.extend([None] * (self.col + 1 - len(values)))
+            values[self.col] = value
+        elif name == ROW_TAG:
+            self.rows.append((self.row_number, self.values))
+
+    def _convert(self):
+        text = self.text
+        if text is None:
+            return None
+        cell_type = self.cell_type
+        if cell_type == "s":
+            index = int(text)
+            self.string_ids.add(index)
+            return self.shared_strings[index]
+        if cell_type in ("inlineStr", "str", "e"):
+            return text
+        if cell_type == "b":
+            return text == "1"
+        return _number(text)
+
+
+class XlsxReader:
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._zip = zipfile.ZipFile(file_path)
+        self._shared_strings = None
+        # Sheet name -> shared string indices used by the rows read so far
+        self.string_refs = {}
+        self.sheet_parts = self._read_sheet_parts()
+        self.sheet_names = list(self.sheet_parts)
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Map sheet names to their worksheet parts, in workbook order
+    def _read_sheet_parts(self):
+        targets = {}
+        with self._zip.open("xl/_rels/workbook.xml.rels") as f:
+            for _, elem in iterparse(f):
+                if elem.tag == NS_PKG_REL + "Relationship":
+                    target = elem.get("Target")
+                    if target.startswith("/"):
+                        target = target.lstrip("/")
+                    else:
+                        target = posixpath.normpath(posixpath.join("xl", target))
+                    targets[elem.get("Id")] = target
+
+        parts = {}
+        with self._zip.open("xl/workbook.xml") as f:
+            for _, elem in iterparse(f):
+                if elem.tag == NS_MAIN + "sheet":
+                    parts[elem.get("name")] = targets[elem.get(NS_DOC_REL + "id")]
+        return parts
+
+    # (CRC-32, uncompressed size) of every part in the package, as recorded
+    # in the zip directory; cheap to read and changes whenever a part does
+    def part_manifest(self):
+        return {info.filename: (info.CRC, info.file_size) for info in self._zip.infolist()}
+
+    # Shared string table, parsed once per reader
+    @property
+    def shared_strings(self):
+        if self._shared_strings is None:
+            strings = []
+            try:
+                f = self._zip.open("xl/sharedStrings.xml")
+            except KeyError:
+                f = None
+            if f is not None:
+                with f:
+                    for _, elem in iterparse(f):
+                        if elem.tag == SHARED_ITEM_TAG:
+                            strings.append(_text_of(elem))
+                            elem.clear()
+            self._shared_strings = strings
+        return self._shared_strings
+
+    # Lazily yield (row_number, values) for every non-blank row of a sheet.
+    # The part is fed to a SAX-style expat parser chunk by chunk, so no
+    # element tree is built and the rest of the part is never decompressed
+    # once more than max_blank_run consecutive blank rows have been seen.
+    def iter_rows(self, sheet_name, max_blank_run=DEFAULT_BLANK_RUN, na_values=DEFAULT_NA_VALUES):
+        part = self.sheet_parts[sheet_name]
+        collector = _RowCollector(self.shared_strings, na_values)
+        parser = expat.ParserCreate(namespace_separator=" ")
+        parser.StartElementHandler = collector.start
+        parser.EndElementHandler = collector.end
+        parser.CharacterDataHandler = collector.characters
+        parser.buffer_text = True
+
+        last_data_row = 0
+        try:
+            with self._zip.open(part) as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    parser.Parse(chunk, not chunk)
+                    for row_number, values in collector.drain():
+                        if values:
+                            last_data_row = row_number
+                            yield row_number, values
+                        elif max_blank_run is not None and row_number - last_data_row > max_blank_run:
+                            return
+                    if not chunk:
+                        return
+        finally:
+            self.string_refs[sheet_name] = frozenset(collector.string_ids)
+
+    # Read a sheet with its first row as header.
+    # Returns (columns, labels, rows) where labels follow pandas' 0-based
+    # numbering of the data rows below the header.
+    def read_table(self, sheet_name, max_blank_run=DEFAULT_BLANK_RUN, na_values=DEFAULT_NA_VALUES):
+        header = []
+        labels = []
+        rows = []
+        for row_number, values in self.iter_rows(sheet_name, max_blank_run, na_values):
+            if row_number == 1:
+                header = values
+                continue
+            labels.append(row_number - 2)
+            rows.append(values)
+
+        width = max([len(header)] + [len(values) for values in rows])
+        columns = [
+            header[i] if i < len(header) and header[i] is not None else f"Unnamed: {i}"
+            for i in range(width)
+        ]
+        rows = [values + [None] * (width - len(values)) for values in rows]
+        return columns, labels, rows